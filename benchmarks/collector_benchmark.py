@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of the collectors and of the system information handler
+
+Times the uncached collection functions, each with its own reader where it
+keeps state between reads, and the /api/system/info handler from the cache
+lookup to the serialized response.
+
+Usage: python3 benchmarks/collector_benchmark.py [--min-time SECONDS] [--output FILE]
+"""
+import argparse
+import io
+import platform
+
+from common import print_results, time_calls, write_results
+
+from api.collector_cache import collector_cache
+from api.disk_usage import get_disk_usage
+from api.memory_usage import get_memory_info
+from api.system_info import get_system_info, handle_system_info_request
+from web.request_handler import RequestHandler
+
+
+class BenchmarkRequestHandler(RequestHandler):
+    """Request handler writing its responses to memory, without a socket or a log"""
+    
+    def __init__(self, path):
+        """Initialize the handler of one GET request
+        
+        Args:
+            path (str): The request path
+        """
+        self.path = path
+        self.command = 'GET'
+        self.request_version = 'HTTP/1.1'
+        self.requestline = f'GET {path} HTTP/1.1'
+        self.client_address = ('127.0.0.1', 0)
+        self.headers = {}
+        self.close_connection = False
+        self.server = self
+        self.wfile = io.BytesIO()
+    
+    def has_pending_requests(self):
+        """Stand-in for the server method called by end_headers"""
+        return False
+    
+    def log_message(self, format, *args):
+        """Skip the access log"""
+    
+    def reset(self):
+        """Drop the previous response"""
+        self.wfile = io.BytesIO()
+        self._headers_buffer = []
+
+
+def get_benchmarks():
+    """Get the benchmarked functions
+    
+    Returns:
+        list: (name, function) pairs
+    """
+    handler = BenchmarkRequestHandler('/api/system/info')
+    
+    def system_info_handler():
+        handler.reset()
+        handle_system_info_request(handler)
+    
+    # Warm the shared entry served by the handler
+    collector_cache.get('system')
+    
+    benchmarks = [
+        ('get_disk_usage', get_disk_usage),
+        ('get_memory_info', get_memory_info),
+        ('get_system_info', get_system_info),
+        ('system_info_handler', system_info_handler),
+    ]
+    
+    if platform.system() == 'Linux':
+        from api.cpu_usage import CpuStatReader
+        from api.disk_io import DiskStatsReader
+        from api.network_usage import NetDevReader
+        from api.processes import ProcessScanner
+        
+        cpu_reader = CpuStatReader()
+        benchmarks += [
+            ('cpu_usage', lambda: cpu_reader.read(per_core=False)),
+            ('cpu_usage_per_core', cpu_reader.read),
+            ('disk_io', DiskStatsReader().read),
+            ('network_usage', NetDevReader().read),
+            ('process_scan', ProcessScanner().scan),
+        ]
+    return benchmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--min-time', type=float, default=1.0, help='minimum seconds per benchmark (default: 1)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+    
+    results = {}
+    for name, function in get_benchmarks():
+        results[name] = time_calls(function, min_time=args.min_time)
+        print_results({name: results[name]})
+    
+    if args.output:
+        write_results(args.output, 'collectors', {'min_time': args.min_time}, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Shared helpers of the benchmark scripts
+
+Timing of repeated calls, latency summaries and the JSON result files read
+by compare_benchmarks.py.
+"""
+import json
+import os
+import platform
+import sys
+import time
+
+from datetime import datetime, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), 'src')
+
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# Version of the result file layout
+RESULTS_FORMAT = 1
+
+
+def percentile(sorted_values, fraction):
+    """Get a percentile of sorted values, with the nearest-rank method
+    
+    Args:
+        sorted_values (list): Values in increasing order
+        fraction (float): The percentile, between 0 and 1
+    
+    Returns:
+        float: The value, or 0 for no values
+    """
+    if not sorted_values:
+        return 0
+    rank = max(int(fraction * len(sorted_values) + 0.5), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(durations, unit='us'):
+    """Summarize the durations of calls
+    
+    Args:
+        durations (list): Durations in seconds
+        unit (str, optional): Unit of the reported times, 'us' or 'ms'
+    
+    Returns:
+        dict: Number of calls, and mean, p50, p99 and max times in the unit
+    """
+    scale = 1e6 if unit == 'us' else 1e3
+    values = sorted(durations)
+    return {
+        'calls': len(values),
+        f'mean_{unit}': round(sum(values) / len(values) * scale, 3) if values else 0,
+        f'p50_{unit}': round(percentile(values, 0.50) * scale, 3),
+        f'p99_{unit}': round(percentile(values, 0.99) * scale, 3),
+        f'max_{unit}': round(values[-1] * scale, 3) if values else 0
+    }
+
+
+def time_calls(function, min_time=1.0, min_calls=10, max_calls=1000000, unit='us'):
+    """Call a function repeatedly and summarize the duration of each call
+    
+    The function is called once before timing, so lazily opened files and
+    caches are warm.
+    
+    Args:
+        function (callable): The function, called without arguments
+        min_time (float, optional): Minimum seconds spent calling
+        min_calls (int, optional): Minimum number of calls
+        max_calls (int, optional): Maximum number of calls
+        unit (str, optional): Unit of the reported times, 'us' or 'ms'
+    
+    Returns:
+        dict: The summary of the calls
+    """
+    function()
+    durations = []
+    clock = time.perf_counter
+    deadline = clock() + min_time
+    while len(durations) < max_calls and (len(durations) < min_calls or clock() < deadline):
+        started = clock()
+        function()
+        durations.append(clock() - started)
+    return summarize(durations, unit)
+
+
+def get_environment():
+    """Describe the machine and interpreter a benchmark ran on"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'system': platform.system(),
+        'release': platform.release(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def write_results(path, suite, parameters, results):
+    """Write the results of a benchmark suite as JSON
+    
+    Args:
+        path (str): The output file
+        suite (str): Name of the suite
+        parameters (dict): Parameters of the run
+        results (dict): Metrics by benchmark name
+    """
+    document = {
+        'format': RESULTS_FORMAT,
+        'suite': suite,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': get_environment(),
+        'parameters': parameters,
+        'results': results
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+        f.write('\n')
+
+
+def print_results(results):
+    """Print the results of a suite as a table, one benchmark per line"""
+    for name, metrics in results.items():
+        print(f"{name:28s} " + '  '.join(f"{key}={value}" for key, value in metrics.items()))
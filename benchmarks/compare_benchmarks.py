@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Compare two result files of a benchmark suite
+
+Prints the change of every timing and rate metric between a baseline run and
+a new run, and exits with status 1 when a metric got worse by more than the
+threshold. Times (metrics ending in _us, _ms or seconds) are better lower,
+request rates (rps) higher; counts are shown but never compared.
+
+Usage: python3 benchmarks/compare_benchmarks.py BASELINE.json CURRENT.json [--threshold PERCENT]
+"""
+import argparse
+import json
+import sys
+
+# Suffixes of the metrics that are better when lower
+LOWER_IS_BETTER = ('_us', '_ms', 'seconds')
+
+# Metrics that are better when higher
+HIGHER_IS_BETTER = ('rps',)
+
+
+def load_results(path):
+    """Load a result file written by one of the benchmark scripts"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def get_direction(metric):
+    """Get 1 for metrics better when lower, -1 when higher, None for counts"""
+    if metric in HIGHER_IS_BETTER:
+        return -1
+    if metric.endswith(LOWER_IS_BETTER):
+        return 1
+    return None
+
+
+def compare(baseline, current, threshold, metrics=None):
+    """Compare the metrics of two runs
+    
+    Args:
+        baseline (dict): Results of the baseline run, by benchmark name
+        current (dict): Results of the new run, by benchmark name
+        threshold (float): Percent of change counted as a regression
+        metrics (set, optional): Only compare these metrics
+    
+    Returns:
+        tuple: Rows of (benchmark, metric, baseline, current, change percent,
+            verdict), and the number of regressions
+    """
+    rows = []
+    regressions = 0
+    for name, current_metrics in current.items():
+        baseline_metrics = baseline.get(name)
+        if baseline_metrics is None:
+            rows.append((name, '', None, None, None, 'new'))
+            continue
+        for metric, value in current_metrics.items():
+            direction = get_direction(metric)
+            old = baseline_metrics.get(metric)
+            if direction is None or old is None or (metrics and metric not in metrics):
+                continue
+            change = (value - old) / old * 100 if old else 0.0
+            verdict = ''
+            if change * direction > threshold:
+                verdict = 'REGRESSION'
+                regressions += 1
+            elif change * direction < -threshold:
+                verdict = 'improved'
+            rows.append((name, metric, old, value, change, verdict))
+    for name in baseline.keys() - current.keys():
+        rows.append((name, '', None, None, None, 'missing'))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline', help='results of the baseline run')
+    parser.add_argument('current', help='results of the new run')
+    parser.add_argument('--threshold', type=float, default=10, help='percent change reported as a regression (default: 10)')
+    parser.add_argument('--metric', action='append', help='only compare this metric (repeatable), e.g. p99_ms')
+    args = parser.parse_args()
+    
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    if baseline['suite'] != current['suite']:
+        parser.error(f"Cannot compare suite '{baseline['suite']}' with suite '{current['suite']}'")
+    if baseline['environment'] != current['environment']:
+        print("Warning: the runs come from different environments", file=sys.stderr)
+    if baseline['parameters'] != current['parameters']:
+        print(f"Warning: different parameters: {baseline['parameters']} -> {current['parameters']}", file=sys.stderr)
+    
+    rows, regressions = compare(baseline['results'], current['results'], args.threshold,
+                                set(args.metric) if args.metric else None)
+    for name, metric, old, value, change, verdict in rows:
+        if change is None:
+            print(f"{name:28s} {verdict}")
+        else:
+            print(f"{name:28s} {metric:10s} {old:>12} -> {value:>12}  {change:+8.1f}%  {verdict}")
+    
+    print(f"\n{regressions} regression(s) above {args.threshold}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
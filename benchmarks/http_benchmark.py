@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Load generator for the HTTP endpoints
+
+Starts an HttpServer in a child process, on a free port and with a temporary
+database, so the server does not share an interpreter with the client. Each
+endpoint is then driven for a fixed time by a fixed number of client threads,
+each on its own persistent connection, and the request rate and latency
+percentiles are reported. An already running server can be measured instead
+with --url.
+
+Usage: python3 benchmarks/http_benchmark.py [--concurrency N] [--duration SECONDS] [--output FILE] [PATH ...]
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from urllib.parse import urlsplit
+
+from common import print_results, summarize, write_results
+
+# Endpoints driven when none are given
+DEFAULT_PATHS = [
+    '/api/system/info',
+    '/api/disk/usage',
+    '/api/memory/usage',
+    '/api/snapshot',
+    '/metrics',
+    '/',
+]
+
+# Seconds to wait for the child server to start
+SERVER_START_TIMEOUT = 10
+
+
+def serve(db_path, mode):
+    """Run a server on a free port, printing the port once listening (child process)"""
+    from data.db.database import Database
+    from web.http_server import HttpServer
+    
+    Database.DB_PATH = db_path
+    Database.initialize_schema()
+    server = HttpServer(host='127.0.0.1', port=0, mode=mode)
+    
+    def started():
+        print(server.httpd.server_address[1], flush=True)
+    
+    server.run(started)
+
+
+def start_server(directory, mode):
+    """Start the server child process
+    
+    Returns:
+        tuple: The process and the port it listens on
+    """
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve',
+                                os.path.join(directory, 'ps_monitor.db'), '--mode', mode],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    timer = threading.Timer(SERVER_START_TIMEOUT, process.kill)
+    timer.start()
+    try:
+        port = process.stdout.readline().strip()
+    finally:
+        timer.cancel()
+    if not port:
+        raise RuntimeError(f"Server did not start (exit code {process.poll()})")
+    return process, int(port)
+
+
+def drive(host, port, path, concurrency, duration, headers):
+    """Send requests for one path from concurrent clients until the duration elapses
+    
+    Returns:
+        dict: Request rate, error count and latency summary in milliseconds
+    """
+    durations = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    start = threading.Barrier(concurrency + 1)
+    deadline = None
+    
+    def client(index):
+        latencies = durations[index]
+        clock = time.perf_counter
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        start.wait()
+        while clock() < deadline:
+            started = clock()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[index] += 1
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                connection.close()
+                continue
+            latencies.append(clock() - started)
+        connection.close()
+    
+    threads = [threading.Thread(target=client, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    start.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    latencies = [latency for client_latencies in durations for latency in client_latencies]
+    result = {'rps': round(len(latencies) / elapsed, 1), 'errors': sum(errors)}
+    result.update(summarize(latencies, 'ms'))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='*', metavar='PATH', help='endpoints to drive (default: main API endpoints and /)')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent connections (default: 8)')
+    parser.add_argument('--duration', type=float, default=5, help='seconds per endpoint (default: 5)')
+    parser.add_argument('--mode', default='threaded', choices=['threaded', 'single'], help='server concurrency mode')
+    parser.add_argument('--gzip', action='store_true', help='accept gzip compressed responses')
+    parser.add_argument('--url', help='measure a running server at this base URL instead')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--serve', metavar='DB', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve(args.serve, args.mode)
+        return
+    
+    paths = args.paths or DEFAULT_PATHS
+    headers = {'Accept-Encoding': 'gzip'} if args.gzip else {}
+    process = None
+    directory = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        directory = tempfile.TemporaryDirectory(prefix='ps-monitor-benchmark-')
+        process, port = start_server(directory.name, args.mode)
+        host = '127.0.0.1'
+    
+    results = {}
+    try:
+        for path in paths:
+            results[path] = drive(host, port, path, args.concurrency, args.duration, headers)
+            print_results({path: results[path]})
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+            directory.cleanup()
+    
+    if args.output:
+        parameters = {'concurrency': args.concurrency, 'duration': args.duration, 'gzip': args.gzip,
+                      'mode': None if args.url else args.mode, 'url': args.url}
+        write_results(args.output, 'http', parameters, results)
+
+
+if __name__ == '__main__':
+    main()
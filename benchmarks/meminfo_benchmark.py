@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the Linux memory collector
+
+Compares the per-call cost of the persistent /proc/meminfo reader with the
+previous implementation, which opened the file and ran one regex search per key.
+
+Usage: python3 benchmarks/meminfo_benchmark.py [iterations]
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from api.memory_usage import MeminfoReader
+
+
+def regex_memory_info():
+    """Previous implementation: open, read and search each key with a regex"""
+    with open('/proc/meminfo', 'r') as f:
+        meminfo = f.read()
+    
+    mem_total = int(re.search(r'MemTotal:\s+(\d+)', meminfo).group(1)) * 1024
+    mem_free = int(re.search(r'MemFree:\s+(\d+)', meminfo).group(1)) * 1024
+    mem_available = int(re.search(r'MemAvailable:\s+(\d+)', meminfo).group(1)) * 1024
+    swap_total = int(re.search(r'SwapTotal:\s+(\d+)', meminfo).group(1)) * 1024
+    swap_free = int(re.search(r'SwapFree:\s+(\d+)', meminfo).group(1)) * 1024
+    return mem_total, mem_free, mem_available, swap_total, swap_free
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    reader = MeminfoReader()
+    
+    for name, function, keys in [('regex (5 keys)', regex_memory_info, 5),
+                                 ('reader (12 keys)', reader.read, len(reader.keys))]:
+        function()
+        best = min(timeit.repeat(function, number=iterations, repeat=5))
+        print(f"{name:18s} {best / iterations * 1e6:8.2f} us/call  {best / iterations / keys * 1e9:8.1f} ns/key")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the disk usage repository on a synthetic database
+
+Seeds a new database with disk samples of many mounts and the rollup tiers
+built from them, then times saving a batch of samples, reading the latest
+samples and the history of a mount, and the retention delete. The samples
+end --age-days days ago, so the oldest ones are past the raw retention and
+the delete has work to do. The database is created in a temporary directory
+unless --db is given; the application database is never used.
+
+Usage: python3 benchmarks/repository_benchmark.py [--rows N] [--mounts N] [--age-days N] [--output FILE]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from common import print_results, summarize, time_calls, write_results
+
+from data.db.database import Database
+from data.db.disk_rollups import ROLLUP_TIERS
+from data.db.disk_usage_repository import DiskUsageRepository
+
+# Bytes of the smallest synthetic mount; mount i is i + 1 times larger
+MOUNT_SIZE = 100 * 1024 ** 3
+
+
+def get_mountpoint(index):
+    """Get the mountpoint of a synthetic mount"""
+    return f'/mnt/bench{index}'
+
+
+def seed_database(rows, mounts, interval, age_days=0):
+    """Fill the disk tables with synthetic samples
+    
+    Used space grows steadily on every mount, so the last sample of a
+    rollup bucket is also its largest.
+    
+    Args:
+        rows (int): Number of raw samples
+        mounts (int): Number of mounts
+        interval (int): Seconds between two samples of a mount
+        age_days (float, optional): Days between the last samples and now
+    
+    Returns:
+        int: Timestamp of the last samples
+    """
+    conn = Database.get_connection()
+    samples = rows // mounts
+    end = DiskUsageRepository.current_timestamp() - int(age_days * 86400)
+    end -= end % interval
+    with conn:
+        conn.executemany('INSERT INTO mounts (id, mountpoint, device) VALUES (?, ?, ?)',
+                         [(index + 1, get_mountpoint(index), f'/dev/bench{index}') for index in range(mounts)])
+        # Generated by SQLite, in primary key order
+        conn.execute('''
+        WITH RECURSIVE sample(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM sample WHERE n + 1 < :samples),
+        data AS (
+            SELECT m.id AS mount_id, :end - (:samples - 1 - s.n) * :interval AS ts,
+                   m.id * :size AS total,
+                   CAST(m.id * :size * (0.2 + 0.6 * s.n / :samples) AS INTEGER) AS used
+            FROM mounts m, sample s
+            ORDER BY m.id, s.n
+        )
+        INSERT INTO disk_samples (mount_id, ts, total, used, free, percent_used)
+        SELECT mount_id, ts, total, used, total - used, ROUND(100.0 * used / total, 2)
+        FROM data
+        ''', {'samples': samples, 'end': end, 'interval': interval, 'size': MOUNT_SIZE})
+        conn.execute('''
+        INSERT INTO disk_latest (mount_id, ts, total, used, free, percent_used)
+        SELECT mount_id, ts, total, used, free, percent_used FROM disk_samples WHERE ts = ?
+        ''', (end,))
+        for tier in ROLLUP_TIERS:
+            resolution = tier.resolution
+            conn.execute(f'''
+            INSERT INTO {tier.table}
+            (mount_id, ts, samples, min_used, max_used, sum_used, last_used,
+             min_percent, max_percent, sum_percent, last_percent, last_ts, total, free)
+            SELECT mount_id, ts - ts % {resolution}, COUNT(*), MIN(used), MAX(used), SUM(used), MAX(used),
+                   MIN(percent_used), MAX(percent_used), SUM(percent_used), MAX(percent_used), MAX(ts),
+                   MAX(total), MIN(free)
+            FROM disk_samples
+            GROUP BY mount_id, ts - ts % {resolution}
+            ''')
+    return end
+
+
+def run(rows, mounts, interval, calls, age_days):
+    """Seed the database and run the repository benchmarks
+    
+    Returns:
+        dict: Metrics by benchmark name
+    """
+    results = {}
+    Database.initialize_schema()
+    
+    started = time.perf_counter()
+    end = seed_database(rows, mounts, interval, age_days)
+    results['seed'] = {'rows': rows // mounts * mounts, 'seconds': round(time.perf_counter() - started, 3)}
+    print_results({'seed': results['seed']})
+    
+    # One batch of the monitor: a sample of every mount, one interval after the previous batch
+    batch = [{'device': f'/dev/bench{index}', 'mountpoint': get_mountpoint(index),
+              'total': (index + 1) * MOUNT_SIZE, 'used': MOUNT_SIZE // 2, 'free': (index + 1) * MOUNT_SIZE - MOUNT_SIZE // 2,
+              'percent_used': round(50 / (index + 1), 2)} for index in range(mounts)]
+    timestamps = iter(range(end + interval, end + interval * (calls + 2), interval))
+    
+    def save_batch():
+        timestamp = next(timestamps)
+        for disk in batch:
+            disk['timestamp'] = timestamp
+        DiskUsageRepository.save_disk_usage(batch)
+    
+    mountpoints = [get_mountpoint(index) for index in range(mounts)]
+    history_calls = iter(range(calls * 1000))
+    
+    def get_history():
+        return DiskUsageRepository.get_disk_usage_history(mountpoints[next(history_calls) % mounts])
+    
+    for name, function in [('save_disk_usage', save_batch),
+                           ('get_latest_disk_usage', DiskUsageRepository.get_latest_disk_usage),
+                           ('get_disk_usage_history', get_history)]:
+        results[name] = time_calls(function, min_time=0, min_calls=calls, max_calls=calls, unit='ms')
+        print_results({name: results[name]})
+    
+    # Deleting changes the data, so it is timed once
+    started = time.perf_counter()
+    deleted = DiskUsageRepository.delete_old_records()
+    duration = time.perf_counter() - started
+    results['delete_old_records'] = dict(summarize([duration], 'ms'), deleted=deleted)
+    print_results({'delete_old_records': results['delete_old_records']})
+    if deleted == 0:
+        print("Warning: delete_old_records deleted nothing, the seeded samples are all within the retention; "
+              "raise --age-days or --rows", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000000, help='raw samples seeded (default: 2000000)')
+    parser.add_argument('--mounts', type=int, default=50, help='number of mounts (default: 50)')
+    parser.add_argument('--interval', type=int, default=60, help='seconds between samples (default: 60)')
+    parser.add_argument('--calls', type=int, default=200, help='calls per timed operation (default: 200)')
+    parser.add_argument('--age-days', type=float, default=7,
+                        help='days between the last seeded samples and now, so the oldest are past the '
+                             'retention (default: 7)')
+    parser.add_argument('--db', help='database file to create, kept after the run (default: temporary)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+    
+    directory = None
+    if args.db:
+        if os.path.exists(args.db):
+            parser.error(f"{args.db} already exists")
+        Database.DB_PATH = args.db
+    else:
+        directory = tempfile.mkdtemp(prefix='ps-monitor-benchmark-')
+        Database.DB_PATH = os.path.join(directory, 'ps_monitor.db')
+    
+    try:
+        results = run(args.rows, args.mounts, args.interval, args.calls, args.age_days)
+    finally:
+        Database.close_all()
+        if directory:
+            shutil.rmtree(directory)
+    
+    if args.output:
+        parameters = {'rows': args.rows, 'mounts': args.mounts, 'interval': args.interval, 'calls': args.calls,
+                      'age_days': args.age_days}
+        write_results(args.output, 'repository', parameters, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Collector cache for the API endpoints
+Shares recently collected metrics between concurrent requests
+"""
+import logging
+import threading
+import time
+
+from concurrent.futures import Future
+
+from monitor.instrumentation import LatencyHistogram
+
+logger = logging.getLogger('CollectorCache')
+
+
+class CachedCollector:
+    """Cache entry holding the latest value of a single collector"""
+    
+    def __init__(self, name, collect, ttl, max_stale):
+        """Initialize the cache entry
+        
+        Args:
+            name (str): The collector name
+            collect (callable): Function returning a fresh value
+            ttl (float): Seconds a value is served without collecting again
+            max_stale (float): Extra seconds an expired value is still served
+                while a background refresh runs
+        """
+        self.name = name
+        self.collect = collect
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.lock = threading.Lock()
+        self.value = None
+        self.updated = None
+        self.collected_at = None
+        self.version = 0
+        self.in_flight = None
+        # Collections run by the cache, not values put by the monitors
+        self.latency = LatencyHistogram()
+
+
+class CollectorCache:
+    """
+    Cache of collector results with a per-collector TTL.
+    
+    Concurrent callers share a single in-progress collection (single-flight).
+    Once a value expires, it keeps being served for up to max_stale seconds
+    while one background refresh collects a new one (stale-while-revalidate).
+    """
+    
+    def __init__(self):
+        """Initialize an empty cache"""
+        self.entries = {}
+    
+    def __contains__(self, name):
+        """Check if a collector is registered"""
+        return name in self.entries
+    
+    def register(self, name, collect, ttl, max_stale=0):
+        """Register a collector
+        
+        Args:
+            name (str): The collector name
+            collect (callable): Function returning a fresh value
+            ttl (float): Seconds a value is served without collecting again
+            max_stale (float, optional): Extra seconds an expired value is still served
+        """
+        self.entries[name] = CachedCollector(name, collect, ttl, max_stale)
+    
+    def get(self, name):
+        """Get the value of a collector, collecting it only when needed
+        
+        Args:
+            name (str): The collector name
+        
+        Returns:
+            The cached or freshly collected value
+        """
+        entry = self.entries[name]
+        with entry.lock:
+            if entry.value is not None:
+                age = time.monotonic() - entry.updated
+                if age <= entry.ttl:
+                    return entry.value
+                if age <= entry.ttl + entry.max_stale:
+                    if entry.in_flight is None:
+                        entry.in_flight = Future()
+                        threading.Thread(target=self._collect, args=(entry,),
+                                         name=f'Refresh-{name}', daemon=True).start()
+                    return entry.value
+            
+            in_flight = entry.in_flight
+            leader = in_flight is None
+            if leader:
+                in_flight = entry.in_flight = Future()
+        
+        if leader:
+            self._collect(entry)
+        return in_flight.result()
+    
+    def put(self, name, value, collected_at=None):
+        """Store a value collected elsewhere (e.g. by a background monitor)
+        
+        Args:
+            name (str): The collector name
+            value: The collected value
+            collected_at (float, optional): Collection time as a Unix timestamp
+        """
+        entry = self.entries[name]
+        with entry.lock:
+            self._store(entry, value, collected_at)
+    
+    def get_version(self, name):
+        """Get the number of times a collector value was updated
+        
+        Args:
+            name (str): The collector name
+        
+        Returns:
+            int: The value version, 0 if never collected
+        """
+        return self.entries[name].version
+    
+    def get_collected_at(self, name):
+        """Get the collection time of the cached value
+        
+        Args:
+            name (str): The collector name
+        
+        Returns:
+            float: Collection time as a Unix timestamp, or None if never collected
+        """
+        return self.entries[name].collected_at
+    
+    def get_stats(self):
+        """Get the statistics of each collector
+        
+        Returns:
+            dict: Value version, collection time and latency of the collections
+                run by the cache, by collector name
+        """
+        return {name: {
+            'version': entry.version,
+            'collected_at': entry.collected_at,
+            'latency': entry.latency.get_stats(buckets=False)
+        } for name, entry in self.entries.items()}
+    
+    def _collect(self, entry):
+        """Run a collection and publish its result to waiting callers"""
+        in_flight = entry.in_flight
+        started = time.perf_counter()
+        try:
+            value = entry.collect()
+        except Exception as e:
+            entry.latency.observe(time.perf_counter() - started, error=True)
+            logger.error(f"Error collecting {entry.name}: {e}")
+            with entry.lock:
+                entry.in_flight = None
+            in_flight.set_exception(e)
+            return
+        entry.latency.observe(time.perf_counter() - started, isinstance(value, dict) and 'error' in value)
+        
+        with entry.lock:
+            self._store(entry, value, None)
+            entry.in_flight = None
+        in_flight.set_result(value)
+    
+    @staticmethod
+    def _store(entry, value, collected_at):
+        """Update an entry value; the caller holds the entry lock"""
+        entry.value = value
+        entry.updated = time.monotonic()
+        entry.collected_at = collected_at if collected_at is not None else time.time()
+        entry.version += 1
+
+
+# Global instance shared by the API endpoints and the monitors
+collector_cache = CollectorCache()
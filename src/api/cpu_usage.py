@@ -0,0 +1,206 @@
+"""
+CPU usage API endpoint
+Provides aggregate and per-core CPU utilization and load averages
+"""
+import os
+import platform
+import threading
+import time
+
+from operator import add, sub
+
+from api.collector_cache import collector_cache
+
+# Seconds a CPU reading is shared between requests, and served stale while refreshing
+CPU_CACHE_TTL = 1
+CPU_CACHE_MAX_STALE = 5
+
+CPU_STAT_PATH = '/proc/stat'
+LOADAVG_PATH = '/proc/loadavg'
+
+# First counters of a /proc/stat cpu line, used for utilization, in clock ticks;
+# the guest counters that follow are already included in user and nice
+STAT_COLUMNS = ('user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal')
+
+# Utilization fields reported for the whole system and for each core
+CPU_FIELDS = ('percent_used', 'user', 'system', 'iowait', 'steal', 'idle')
+
+
+def handle_cpu_usage_request(handler):
+    """Handle /api/cpu/usage endpoint request
+    
+    Args:
+        handler: The request handler instance
+    """
+    cpu_usage = collector_cache.get('cpu')
+    
+    handler.send_json(cpu_usage)
+
+
+class CpuStatReader:
+    """
+    Reader of the Linux CPU time counters and load averages.
+    
+    Both files are kept open and read with a single preadv into reusable
+    buffers; only the cpu lines at the start of /proc/stat are parsed. The
+    counters are handled by column (one list of all cores per counter), with
+    strided slices and map() over whole columns instead of per-core dicts, so
+    the cost per core stays a few C-level operations. Utilization is computed
+    from the difference with the previous read; the first read reports the
+    utilization since boot.
+    """
+    
+    def __init__(self, stat_path=CPU_STAT_PATH, loadavg_path=LOADAVG_PATH):
+        """Initialize the reader
+        
+        Args:
+            stat_path (str, optional): Path of the kernel statistics file
+            loadavg_path (str, optional): Path of the load average file
+        """
+        self.stat_path = stat_path
+        self.loadavg_path = loadavg_path
+        self.stat_fd = None
+        self.loadavg_fd = None
+        self.buffer = bytearray(4096)
+        self.loadavg_buffer = bytearray(256)
+        # Core names and counters of the previous read
+        self.names = None
+        self.core_names = None
+        self.counters = None
+        self.read_at = None
+        self.lock = threading.Lock()
+    
+    def read(self, per_core=True):
+        """Read the utilization since the previous read, and the load averages
+        
+        Args:
+            per_core (bool, optional): Also compute the utilization of each core;
+                when False, only the first line of /proc/stat is parsed
+        
+        Returns:
+            dict: Aggregate utilization percentages, load averages, and the
+                utilization of each core as one list per field
+        """
+        with self.lock:
+            if self.stat_fd is None:
+                self.stat_fd = os.open(self.stat_path, os.O_RDONLY)
+                self.loadavg_fd = os.open(self.loadavg_path, os.O_RDONLY)
+            
+            now = time.monotonic()
+            names, counters, cpu_count = self._read_counters(per_core)
+            if names == self.names:
+                deltas = [list(map(sub, current, previous)) for current, previous in zip(counters, self.counters)]
+                interval = round(now - self.read_at, 3)
+            else:
+                # First read, or cores went on or offline
+                deltas = counters
+                interval = None
+                self.core_names = [name.decode() for name in names[1:]]
+            self.names = names
+            self.counters = counters
+            self.read_at = now
+            
+            user, nice, system, idle, iowait, irq, softirq, steal = deltas
+            # The iowait counter of a core may go backwards
+            iowait = [ticks if ticks > 0 else 0 for ticks in iowait]
+            totals = list(map(sum, zip(user, nice, system, idle, iowait, irq, softirq, steal)))
+            # Percent with two decimals, as hundredths of a percent per tick
+            scales = [10000 / total if total > 0 else 0 for total in totals]
+            
+            def percent(ticks):
+                return [int(value * scale + 0.5) / 100 for value, scale in zip(ticks, scales)]
+            
+            columns = {
+                'percent_used': percent(map(sub, totals, map(add, idle, iowait))),
+                'user': percent(map(add, user, nice)),
+                'system': percent(map(add, map(add, system, irq), softirq)),
+                'iowait': percent(iowait),
+                'steal': percent(steal),
+                'idle': percent(idle)
+            }
+            
+            # The first line sums all cores
+            result = {field: values[0] for field, values in columns.items()}
+            result['cpu_count'] = cpu_count
+            result['interval'] = interval
+            result.update(self._read_loadavg())
+            if per_core:
+                result['cores'] = {'names': self.core_names}
+                result['cores'].update((field, values[1:]) for field, values in columns.items())
+            return result
+    
+    def close(self):
+        """Close the files"""
+        with self.lock:
+            if self.stat_fd is not None:
+                os.close(self.stat_fd)
+                os.close(self.loadavg_fd)
+                self.stat_fd = None
+                self.loadavg_fd = None
+    
+    def _read_counters(self, per_core):
+        """Read the cpu lines of /proc/stat
+        
+        Args:
+            per_core (bool): Parse the lines of each core, not only the first one
+        
+        Returns:
+            tuple: The line names, one list of counters per STAT_COLUMNS column
+                in line order, and the number of cores
+        """
+        while True:
+            size = os.preadv(self.stat_fd, [self.buffer], 0)
+            # The cpu lines come first, followed by the interrupt counters
+            end = self.buffer.find(b'\nintr ', 0, size)
+            if end >= 0 or size < len(self.buffer):
+                break
+            self.buffer = bytearray(len(self.buffer) * 2)
+        if end < 0:
+            end = size
+        
+        first_line_end = self.buffer.find(b'\n', 0, end)
+        tokens = self.buffer[:end if per_core else first_line_end].split()
+        # Tokens per line: the name, then the counters
+        width = len(self.buffer[:first_line_end].split())
+        # Strided slices give the columns directly; the guest columns are never converted
+        columns = [list(map(int, tokens[column::width])) for column in range(1, len(STAT_COLUMNS) + 1)]
+        return tokens[::width], columns, self.buffer.count(b'\ncpu', 0, end)
+    
+    def _read_loadavg(self):
+        """Read the load averages and the number of runnable tasks"""
+        size = os.preadv(self.loadavg_fd, [self.loadavg_buffer], 0)
+        load_1, load_5, load_15, tasks = self.loadavg_buffer[:size].split()[:4]
+        runnable, total = tasks.split(b'/')
+        return {
+            'load_1': float(load_1),
+            'load_5': float(load_5),
+            'load_15': float(load_15),
+            'runnable': int(runnable),
+            'tasks': int(total)
+        }
+
+
+def get_cpu_usage(reader=None, per_core=True):
+    """Get CPU utilization since the previous reading and load averages
+    
+    Args:
+        reader (CpuStatReader, optional): The reader, holding the previous
+            reading; the shared reader by default
+        per_core (bool, optional): Include the utilization of each core
+    
+    Returns:
+        dict: CPU usage information
+    """
+    if platform.system() != 'Linux':
+        return {'error': f"Unsupported operating system: {platform.system()}"}
+    
+    try:
+        return (reader or cpu_stat_reader).read(per_core)
+    except Exception as e:
+        return {'error': str(e)}
+
+
+# Shared reader of the API endpoint
+cpu_stat_reader = CpuStatReader()
+
+collector_cache.register('cpu', get_cpu_usage, CPU_CACHE_TTL, CPU_CACHE_MAX_STALE)
@@ -0,0 +1,199 @@
+"""
+Disk history API endpoint
+Provides aggregated disk usage history for a mountpoint and time range
+"""
+import time
+
+from urllib.parse import parse_qs, urlsplit
+
+from data.db.disk_rollups import RAW_TIER, TIERS_BY_NAME, select_tier
+from data.db.disk_usage_repository import HISTORY_COLUMNS, DiskUsageRepository
+from monitor.ring_buffer import ring_buffers
+
+# Maximum number of points in a single response; larger ranges are paginated
+MAX_POINTS = 1000
+
+# Number of points aimed for when no step is requested
+DEFAULT_POINTS = 500
+
+# Range returned when no start is requested
+DEFAULT_RANGE = 86400
+
+
+def handle_disk_history_request(handler):
+    """Handle /api/disk/history endpoint request
+    
+    Query parameters:
+        mount: The mountpoint (required)
+        from: Start of the range as Unix epoch seconds (default: one day ago)
+        to: End of the range as Unix epoch seconds (default: now)
+        step: Seconds per point (default: range divided in 500 points)
+        limit: Maximum number of points (default and maximum: 1000)
+        cursor: Value of next_cursor from the previous page
+    
+    Args:
+        handler: The request handler instance
+    """
+    params = parse_qs(urlsplit(handler.path).query)
+    try:
+        query = parse_history_query(params, int(time.time()))
+    except ValueError as e:
+        handler.send_json({'error': str(e)}, status=400)
+        return
+    
+    # The source is chosen once for the whole range; later pages keep the one named in the cursor
+    if query['cursor'] is not None:
+        start, source = query['cursor']
+    else:
+        start, source = query['from'], None
+    
+    buffer = ring_buffers.get('disk', query['mount'])
+    if source in (None, 'buffer') and buffer is not None and buffer.covers(start):
+        # Recent range, every sample is still in memory
+        history = query_buffer_history(buffer, start, query['to'], query['step'], query['limit'])
+    else:
+        mount_id = DiskUsageRepository.get_mount_id(query['mount'])
+        if mount_id is None:
+            handler.send_json({'error': f"Unknown mount: {query['mount']}"}, status=404)
+            return
+        
+        if source is None:
+            tier = select_tier(query['step'], start, int(time.time()))
+        else:
+            # Samples evicted from the buffer since the previous page are read from the raw tier
+            tier = TIERS_BY_NAME.get(source, RAW_TIER)
+        history = DiskUsageRepository.query_disk_usage_history(
+            mount_id, start, query['to'], query['step'], query['limit'], tier)
+    
+    next_start = history['next_start']
+    
+    handler.send_json({
+        'mount': query['mount'],
+        'from': query['from'],
+        'to': query['to'],
+        'step': history['step'],
+        'tier': history['tier'],
+        'resolution': history['resolution'],
+        'columns': history['columns'],
+        'points': history['rows'],
+        'next_cursor': f"{next_start}:{history['tier']}" if next_start is not None else None
+    })
+
+
+def query_buffer_history(buffer, start, end, step, limit):
+    """Aggregate the samples of a ring buffer in buckets of step seconds
+    
+    Returns the same rows as DiskUsageRepository.query_disk_usage_history
+    reading the raw samples.
+    
+    Args:
+        buffer (RingBuffer): The ring buffer of the mount
+        start (int): Start of the range (inclusive) as Unix epoch seconds
+        end (int): End of the range (exclusive) as Unix epoch seconds
+        step (int): Seconds per bucket
+        limit (int): Maximum number of buckets to return
+    
+    Returns:
+        dict: The tier name and resolution, the column names, the rows (as tuples)
+            in time order, and the start of the next page or None
+    """
+    timestamps, columns = buffer.range(start, end)
+    used = columns['used']
+    percent = columns['percent_used']
+    
+    rows = []
+    next_start = None
+    first = 0
+    while first < len(timestamps):
+        bucket = timestamps[first] - timestamps[first] % step
+        if len(rows) == limit:
+            next_start = bucket
+            break
+        
+        last = first + 1
+        while last < len(timestamps) and timestamps[last] < bucket + step:
+            last += 1
+        
+        count = last - first
+        bucket_used = used[first:last]
+        bucket_percent = percent[first:last]
+        rows.append((bucket, count,
+                     min(bucket_used), max(bucket_used), sum(bucket_used) // count, bucket_used[-1],
+                     min(bucket_percent), max(bucket_percent), round(sum(bucket_percent) / count, 2), bucket_percent[-1],
+                     columns['total'][last - 1], columns['free'][last - 1]))
+        first = last
+    
+    return {
+        'tier': 'buffer',
+        'resolution': 0,
+        'step': step,
+        'columns': HISTORY_COLUMNS,
+        'rows': rows,
+        'next_start': next_start
+    }
+
+
+def parse_history_query(params, now):
+    """Validate the history query parameters
+    
+    Args:
+        params (dict): Parsed query string, as returned by urllib.parse.parse_qs
+        now (int): Current time as Unix epoch seconds
+    
+    Returns:
+        dict: The mount, from, to, step, limit and cursor values; the cursor is
+            the start of the page and the name of the tier of the first page
+    
+    Raises:
+        ValueError: If a parameter is missing or invalid
+    """
+    def get_int(name, default):
+        values = params.get(name)
+        if not values:
+            return default
+        try:
+            return int(values[0])
+        except ValueError:
+            raise ValueError(f"Invalid '{name}' parameter: {values[0]}")
+    
+    mount = params.get('mount', [None])[0]
+    if not mount:
+        raise ValueError("Missing 'mount' parameter")
+    
+    end = get_int('to', now)
+    start = get_int('from', end - DEFAULT_RANGE)
+    if start >= end:
+        raise ValueError("'from' must be before 'to'")
+    
+    # Default step spreads the range over DEFAULT_POINTS, in whole minutes to align with the rollup tiers
+    default_step = max(1, -(-(end - start) // DEFAULT_POINTS))
+    if default_step > 60:
+        default_step = -(-default_step // 60) * 60
+    step = get_int('step', default_step)
+    if step <= 0:
+        raise ValueError("'step' must be positive")
+    
+    limit = min(get_int('limit', MAX_POINTS), MAX_POINTS)
+    if limit <= 0:
+        raise ValueError("'limit' must be positive")
+    
+    cursor = params.get('cursor', [None])[0]
+    if cursor is not None:
+        cursor_start, _, source = cursor.partition(':')
+        try:
+            cursor = int(cursor_start), source
+        except ValueError:
+            raise ValueError(f"Invalid 'cursor' parameter: {cursor}")
+        if source not in TIERS_BY_NAME and source != 'buffer':
+            raise ValueError(f"Invalid 'cursor' parameter: {params['cursor'][0]}")
+        if not start <= cursor[0] < end:
+            raise ValueError("'cursor' is outside of the requested range")
+    
+    return {
+        'mount': mount,
+        'from': start,
+        'to': end,
+        'step': step,
+        'limit': limit,
+        'cursor': cursor
+    }
@@ -0,0 +1,231 @@
+"""
+Disk I/O API endpoint
+Provides the throughput, latency and utilization of each block device
+"""
+import os
+import platform
+import select
+import threading
+import time
+
+from api.collector_cache import collector_cache
+from api.disk_usage import MOUNTINFO_PATH, read_mount_table
+
+# Seconds a disk I/O reading is shared between requests, and served stale while refreshing
+DISK_IO_CACHE_TTL = 1
+DISK_IO_CACHE_MAX_STALE = 5
+
+DISKSTATS_PATH = '/proc/diskstats'
+
+# Size of the sectors counted in /proc/diskstats, whatever the device sector size
+SECTOR_SIZE = 512
+
+# Position of the counters used in a /proc/diskstats line, after major, minor and name
+DISKSTATS_COLUMNS = {
+    'reads': 3,
+    'sectors_read': 5,
+    'read_ms': 6,
+    'writes': 7,
+    'sectors_written': 9,
+    'write_ms': 10,
+    'in_flight': 11,
+    'io_ms': 12
+}
+
+
+def handle_disk_io_request(handler):
+    """Handle /api/disk/io endpoint request
+    
+    Args:
+        handler: The request handler instance
+    """
+    disk_io = collector_cache.get('disk_io')
+    
+    handler.send_json(disk_io)
+
+
+class DiskStatsReader:
+    """
+    Reader of the Linux block device I/O counters.
+    
+    /proc/diskstats is kept open and read with a single preadv into a reusable
+    buffer. As for the CPU counters, every counter is handled as a column of
+    all devices, so a read is one split, a few strided slices and map() calls.
+    Rates come from the difference with the previous read; the first read
+    reports the averages since boot. Devices that never did any I/O (unused
+    loop and ram devices) are left out. A counter going backwards belongs to
+    a device re-created under the same name (loop, device mapper), whose
+    counters restarted from 0.
+    
+    Devices are mapped to mountpoints through their device numbers. The mount
+    table is parsed again only when the kernel reports a change (POLLPRI on
+    an open mountinfo file), so hosts with many mounts do not pay for it on
+    every read.
+    """
+    
+    def __init__(self, path=DISKSTATS_PATH):
+        """Initialize the reader
+        
+        Args:
+            path (str, optional): Path of the diskstats file
+        """
+        self.path = path
+        self.fd = None
+        self.buffer = bytearray(8192)
+        # Device names and numbers, and counters of the previous read
+        self.names = None
+        self.device_names = None
+        self.dev_ids = None
+        self.counters = None
+        self.read_at = None
+        self.mountinfo_fd = None
+        self.mountinfo_poll = None
+        self.mountpoints = None
+        self.lock = threading.Lock()
+    
+    def read(self):
+        """Read the I/O rates since the previous read
+        
+        Returns:
+            dict: The interval in seconds (None since boot), and the devices with
+                their mountpoints, IOPS, bytes per second, average wait and utilization
+        """
+        with self.lock:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDONLY)
+            
+            now = time.clock_gettime(time.CLOCK_BOOTTIME)
+            names, majors, minors, counters = self._read_counters()
+            if self.counters is None:
+                # Counters start at boot
+                previous = [[0] * len(names) for _ in counters]
+                elapsed = now
+                interval = None
+            else:
+                previous = self.counters if names == self.names else self._align(names, counters)
+                elapsed = now - self.read_at
+                interval = round(elapsed, 3)
+            
+            if names != self.names:
+                self.device_names = [name.decode() for name in names]
+                self.dev_ids = [f'{major.decode()}:{minor.decode()}' for major, minor in zip(majors, minors)]
+            self.names = names
+            self.counters = counters
+            self.read_at = now
+            
+            deltas = dict(zip(DISKSTATS_COLUMNS, (list(map(_counter_delta, current, old))
+                                                  for current, old in zip(counters, previous))))
+            columns = dict(zip(DISKSTATS_COLUMNS, counters))
+            mountpoints = self._get_mountpoints()
+            
+            devices = []
+            for index, name in enumerate(self.device_names):
+                if columns['reads'][index] == 0 and columns['writes'][index] == 0:
+                    continue
+                reads = deltas['reads'][index]
+                writes = deltas['writes'][index]
+                devices.append({
+                    'device': name,
+                    'mountpoints': mountpoints.get(self.dev_ids[index], []),
+                    'read_iops': round(reads / elapsed, 2),
+                    'write_iops': round(writes / elapsed, 2),
+                    'read_bytes_per_sec': round(deltas['sectors_read'][index] * SECTOR_SIZE / elapsed),
+                    'write_bytes_per_sec': round(deltas['sectors_written'][index] * SECTOR_SIZE / elapsed),
+                    # Average time of a request, queueing included
+                    'read_await_ms': round(deltas['read_ms'][index] / reads, 2) if reads > 0 else 0,
+                    'write_await_ms': round(deltas['write_ms'][index] / writes, 2) if writes > 0 else 0,
+                    # Share of the time with at least one request in flight
+                    'utilization': min(round(deltas['io_ms'][index] / elapsed / 10, 2), 100),
+                    'in_flight': columns['in_flight'][index]
+                })
+            
+            return {
+                'interval': interval,
+                'devices': devices
+            }
+    
+    def close(self):
+        """Close the file"""
+        with self.lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+            if self.mountinfo_fd is not None:
+                os.close(self.mountinfo_fd)
+                self.mountinfo_fd = None
+                self.mountinfo_poll = None
+                self.mountpoints = None
+    
+    def _read_counters(self):
+        """Read /proc/diskstats
+        
+        Returns:
+            tuple: The device names, major and minor numbers, and one list of
+                counters per DISKSTATS_COLUMNS column, in line order
+        """
+        size = os.preadv(self.fd, [self.buffer], 0)
+        while size == len(self.buffer):
+            self.buffer = bytearray(len(self.buffer) * 2)
+            size = os.preadv(self.fd, [self.buffer], 0)
+        
+        tokens = bytes(self.buffer[:size]).split()
+        # Every line has the same number of fields, which depends on the kernel version
+        width = len(self.buffer[:self.buffer.find(b'\n', 0, size)].split())
+        counters = [list(map(int, tokens[column::width])) for column in DISKSTATS_COLUMNS.values()]
+        return tokens[2::width], tokens[0::width], tokens[1::width], counters
+    
+    def _align(self, names, counters):
+        """Get the previous counters in the order of the current devices
+        
+        Devices added since the previous read get their current counters, so
+        their first rates are 0 rather than their counts since boot.
+        """
+        index = {name: position for position, name in enumerate(self.names)}
+        return [[old[index[name]] if name in index else current[position]
+                 for position, name in enumerate(names)]
+                for current, old in zip(counters, self.counters)]
+    
+    def _get_mountpoints(self):
+        """Get the mountpoints of each device number (major:minor), as reported by the disk endpoint"""
+        if self.mountinfo_poll is None:
+            self.mountinfo_fd = os.open(MOUNTINFO_PATH, os.O_RDONLY)
+            self.mountinfo_poll = select.poll()
+            self.mountinfo_poll.register(self.mountinfo_fd, select.POLLPRI)
+        
+        # Polling also acknowledges the change
+        if self.mountpoints is None or self.mountinfo_poll.poll(0):
+            mountpoints = {}
+            for mount in read_mount_table():
+                mountpoints.setdefault(mount.dev_id, []).append(mount.mountpoint)
+            self.mountpoints = mountpoints
+        return self.mountpoints
+
+
+def _counter_delta(current, previous):
+    """Get the increase of a counter, counting from 0 when it was reset"""
+    return current - previous if current >= previous else current
+
+
+def get_disk_io(reader=None):
+    """Get the I/O rates of the block devices since the previous reading
+    
+    Args:
+        reader (DiskStatsReader, optional): The reader, holding the previous
+            reading; the shared reader by default
+    
+    Returns:
+        dict: Disk I/O information
+    """
+    if platform.system() != 'Linux':
+        return {'error': f"Unsupported operating system: {platform.system()}", 'devices': []}
+    
+    try:
+        return (reader or disk_stats_reader).read()
+    except Exception as e:
+        return {'error': str(e), 'devices': []}
+
+
+# Shared reader of the API endpoint
+disk_stats_reader = DiskStatsReader()
+
+collector_cache.register('disk_io', get_disk_io, DISK_IO_CACHE_TTL, DISK_IO_CACHE_MAX_STALE)
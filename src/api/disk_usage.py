@@ -2,11 +2,143 @@
 Disk usage API endpoint
 Provides disk usage information for all mounted filesystems
 """
+import logging
+import os
 import platform
-import json
+import queue
 import shutil
 import subprocess
 import re
+import threading
+
+from collections import namedtuple
+from concurrent.futures import Future, wait
+
+from api.collector_cache import collector_cache
+
+logger = logging.getLogger('DiskUsage')
+
+MOUNTINFO_PATH = '/proc/self/mountinfo'
+
+# Seconds to wait for a mount before reporting it as stale
+DISK_STAT_TIMEOUT = float(os.environ.get('PS_MONITOR_DISK_STAT_TIMEOUT', 2))
+
+# Maximum number of threads running os.statvfs concurrently
+DISK_STAT_WORKERS = int(os.environ.get('PS_MONITOR_DISK_STAT_WORKERS', 8))
+
+# Seconds a disk usage snapshot is shared between requests, and served stale while refreshing
+DISK_CACHE_TTL = 5
+DISK_CACHE_MAX_STALE = 60
+
+# Virtual filesystems that never hold user data and are skipped by the Linux collector
+PSEUDO_FILESYSTEMS = frozenset([
+    'autofs', 'binfmt_misc', 'bpf', 'cgroup', 'cgroup2', 'configfs', 'debugfs',
+    'devpts', 'efivarfs', 'fusectl', 'hugetlbfs', 'mqueue', 'nsfs', 'proc',
+    'pstore', 'ramfs', 'rpc_pipefs', 'securityfs', 'selinuxfs', 'sysfs',
+    'tracefs'
+])
+
+MountEntry = namedtuple('MountEntry', ['device', 'mountpoint', 'fstype', 'dev_id'])
+
+
+class StatWorkerPool:
+    """
+    Pool of daemon threads used to run blocking filesystem calls.
+    
+    Threads are started on demand up to max_workers. They are daemon threads so a
+    call stuck on a hung network filesystem never prevents the process from exiting.
+    Calls marked as hung do not count against max_workers: their threads are
+    replaced, so hung mounts cannot hold every worker and starve the others.
+    """
+    
+    def __init__(self, max_workers):
+        """Initialize the pool
+        
+        Args:
+            max_workers (int): Maximum number of worker threads
+        """
+        self.max_workers = max_workers
+        self.tasks = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.threads = 0
+        self.idle = 0
+        self.queued = 0
+        self.hung = set()
+    
+    def submit(self, fn, *args):
+        """Schedule a call on a worker thread
+        
+        Args:
+            fn (callable): The function to call
+            *args: Arguments for the function
+        
+        Returns:
+            concurrent.futures.Future: The future for the call result
+        """
+        future = Future()
+        with self.lock:
+            self.queued += 1
+            self._start_worker()
+        self.tasks.put((future, fn, args))
+        return future
+    
+    def mark_hung(self, future):
+        """Stop counting a call that did not finish in time against max_workers
+        
+        Args:
+            future (concurrent.futures.Future): The future of the call
+        """
+        with self.lock:
+            if not future.done() and future not in self.hung:
+                self.hung.add(future)
+                self._start_worker()
+    
+    def is_hung(self, future):
+        """Check if a call was marked as hung and is still running
+        
+        Args:
+            future (concurrent.futures.Future): The future of the call
+        
+        Returns:
+            bool: The call is hung
+        """
+        with self.lock:
+            return future in self.hung
+    
+    def _start_worker(self):
+        """Start a thread if calls are waiting and the limit allows it; the caller holds the lock"""
+        if self.queued > self.idle and self.threads < self.max_workers + len(self.hung):
+            self.threads += 1
+            threading.Thread(target=self._worker, name=f'DiskStat-{self.threads}', daemon=True).start()
+    
+    def _worker(self):
+        """Worker thread loop running scheduled calls"""
+        while True:
+            with self.lock:
+                self.idle += 1
+            future, fn, args = self.tasks.get()
+            with self.lock:
+                self.idle -= 1
+                self.queued -= 1
+            
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            with self.lock:
+                self.hung.discard(future)
+
+
+_stat_pool = StatWorkerPool(DISK_STAT_WORKERS)
+_stat_lock = threading.Lock()
+
+# Calls in flight by mountpoint, shared by overlapping collections; a hung mount never gets a second call
+_pending_stats = {}
+
+# Last successful result by mountpoint, reported when the mount stops responding
+_last_known_usage = {}
 
 
 def handle_disk_usage_request(handler):
@@ -15,18 +147,14 @@ def handle_disk_usage_request(handler):
     Args:
         handler: The request handler instance
     """
-    handler.send_response(200)
-    handler.send_header('Content-type', 'application/json')
-    handler.end_headers()
-    
-    # Get disk usage information using standard library
-    disks = get_disk_usage()
+    # Get disk usage information, shared with concurrent requests
+    disks = collector_cache.get('disk')
     
     response = {
         'disks': disks,
         'count': len(disks)
     }
-    handler.wfile.write(json.dumps(response).encode('utf-8'))
+    handler.send_json(response)
 
 
 def get_disk_usage():
@@ -35,6 +163,12 @@ def get_disk_usage():
     Returns:
         list: A list of disk usage information dictionaries
     """
+    # On Linux, read the mount table directly instead of forking df
+    if platform.system() == 'Linux':
+        disks = get_linux_disk_usage()
+        if disks is not None:
+            return disks
+
     disks = []
     
     # First try to get root disk usage with shutil (standard library)
@@ -57,8 +191,8 @@ def get_disk_usage():
     if platform.system() != 'Windows':
         try:
             # Run df command to get all filesystem info
-            process = subprocess.Popen(['df', '-P'], stdout=subprocess.PIPE)
-            output, _ = process.communicate()
+            output = subprocess.run(['df', '-P'], stdout=subprocess.PIPE,
+                                    timeout=DISK_STAT_TIMEOUT * 5).stdout
             output = output.decode('utf-8')
             
             # Parse the output
@@ -118,3 +252,150 @@ def get_disk_usage():
             pass
             
     return disks
+
+
+def read_mount_table(path=MOUNTINFO_PATH):
+    """Read the mount table, skipping pseudo filesystems
+    
+    Mounts are deduplicated by mountpoint; when a mountpoint appears more than
+    once, the last (visible) mount wins.
+    
+    Args:
+        path (str, optional): Path of the mountinfo file to parse
+    
+    Returns:
+        list: MountEntry tuples in mount order
+    """
+    mounts = {}
+    with open(path, 'r') as f:
+        for line in f:
+            # Format: id parent major:minor root mountpoint options [optional...] - fstype source super_options
+            left, _, right = line.partition(' - ')
+            left_parts = left.split(' ')
+            right_parts = right.split(' ')
+            if len(left_parts) < 5 or len(right_parts) < 2:
+                continue
+
+            fstype = right_parts[0]
+            if fstype in PSEUDO_FILESYSTEMS:
+                continue
+
+            mountpoint = _unescape_mount_field(left_parts[4])
+            # Remove first so a re-mounted mountpoint keeps its latest position
+            mounts.pop(mountpoint, None)
+            mounts[mountpoint] = MountEntry(
+                device=_unescape_mount_field(right_parts[1]),
+                mountpoint=mountpoint,
+                fstype=fstype,
+                dev_id=left_parts[2]
+            )
+    return list(mounts.values())
+
+
+def get_linux_disk_usage(timeout=DISK_STAT_TIMEOUT):
+    """Get disk usage information on Linux using the mount table and os.statvfs
+    
+    Mounts are queried in parallel. Mounts that do not answer within the timeout
+    (e.g. stale NFS/CIFS mounts) are reported with their last known values and
+    'stale' set to True, so one hung mount cannot delay the whole snapshot.
+    
+    Args:
+        timeout (float, optional): Seconds to wait for the mounts to answer
+    
+    Returns:
+        list: A list of disk usage information dictionaries, or None if the
+            mount table cannot be read
+    """
+    try:
+        mounts = read_mount_table()
+    except OSError:
+        return None
+
+    calls = []
+    waited = []
+    with _stat_lock:
+        for mount in mounts:
+            future = _pending_stats.get(mount.mountpoint)
+            if future is None or future.done():
+                future = _pending_stats[mount.mountpoint] = _stat_pool.submit(_statvfs_disk_usage, mount)
+            # Mounts still hung from an earlier collection are not waited for again
+            if not _stat_pool.is_hung(future):
+                waited.append(future)
+            calls.append((mount, future))
+
+    wait(waited, timeout=timeout)
+
+    disks = []
+    with _stat_lock:
+        mountpoints = set()
+        for mount, future in calls:
+            mountpoints.add(mount.mountpoint)
+            if not future.done():
+                _stat_pool.mark_hung(future)
+                last_known = _last_known_usage.get(mount.mountpoint)
+                logger.warning(f"Timed out reading disk usage for {mount.mountpoint}")
+                if last_known is not None:
+                    disks.append(dict(last_known, stale=True))
+                continue
+
+            # Only the entries of finished calls are removed; an overlapping collection may own the others
+            if _pending_stats.get(mount.mountpoint) is future:
+                del _pending_stats[mount.mountpoint]
+            if future.exception() is not None:
+                # Skip mounts that cannot be accessed
+                _last_known_usage.pop(mount.mountpoint, None)
+                continue
+
+            disk = future.result()
+            if disk is not None:
+                _last_known_usage[mount.mountpoint] = disk
+                disks.append(disk)
+
+        # Forget mounts that are gone
+        for mountpoint in list(_last_known_usage):
+            if mountpoint not in mountpoints:
+                del _last_known_usage[mountpoint]
+        for mountpoint in list(_pending_stats):
+            if mountpoint not in mountpoints:
+                del _pending_stats[mountpoint]
+    return disks
+
+
+def _statvfs_disk_usage(mount):
+    """Get disk usage for a single mount using os.statvfs
+    
+    Args:
+        mount (MountEntry): The mount to query
+    
+    Returns:
+        dict: Disk usage information, or None for filesystems without blocks
+    """
+    st = os.statvfs(mount.mountpoint)
+    if st.f_blocks == 0:
+        return None
+
+    # Same figures as df: used excludes reserved blocks, free is what users can allocate
+    total = st.f_blocks * st.f_frsize
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    free = st.f_bavail * st.f_frsize
+    percent_used = round((used / (used + free)) * 100, 2) if used + free > 0 else 0
+
+    return {
+        'device': mount.device,
+        'mountpoint': mount.mountpoint,
+        'total': total,
+        'used': used,
+        'free': free,
+        'percent_used': percent_used,
+        'percent_free': round(100 - percent_used, 2)
+    }
+
+
+def _unescape_mount_field(value):
+    """Decode the octal escapes (e.g. \\040 for space) used in mountinfo fields"""
+    if '\\' not in value:
+        return value
+    return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), value)
+
+
+collector_cache.register('disk', get_disk_usage, DISK_CACHE_TTL, DISK_CACHE_MAX_STALE)
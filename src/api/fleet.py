@@ -0,0 +1,192 @@
+"""
+Fleet API endpoints
+Serve views merged from the snapshots of all agents polled in aggregator mode
+"""
+import heapq
+import json
+import threading
+
+from urllib.parse import parse_qs, urlsplit
+
+from api.metrics import METRICS_EXCLUDE_MOUNTS
+from monitor.fleet import fleet_monitor
+from web.http_cache import GZIP_MIN_SIZE, compress, compute_etag
+from web.static_assets import StaticAsset
+
+# Default and maximum number of mounts returned by /api/fleet/disk/top
+FLEET_TOP_DEFAULT = 10
+FLEET_TOP_MAX = 1000
+
+# Orders of /api/fleet/disk/top: mount field and whether the largest values come first
+FLEET_TOP_ORDERS = {
+    'percent_used': ('percent_used', True),
+    'used': ('used', True),
+    'free': ('free', False)
+}
+
+# Maximum views kept for the current fleet version
+FLEET_VIEWS_MAX = 64
+
+
+def handle_fleet_agents_request(handler):
+    """Handle /api/fleet/agents endpoint request
+    
+    Args:
+        handler: The request handler instance
+    """
+    if _check_aggregator(handler):
+        handler.send_asset(fleet_round_views.get(('agents',), get_fleet_agents))
+
+
+def handle_fleet_snapshot_request(handler):
+    """Handle /api/fleet/snapshot endpoint request
+    
+    Args:
+        handler: The request handler instance
+    """
+    if _check_aggregator(handler):
+        handler.send_asset(fleet_views.get(('snapshot',), get_fleet_snapshot))
+
+
+def handle_fleet_disk_top_request(handler):
+    """Handle /api/fleet/disk/top endpoint request
+    
+    Query parameters:
+        limit: Number of mounts to return (default: 10, maximum: 1000)
+        by: Order of the mounts, 'percent_used' (default), 'used' or 'free'
+    
+    Args:
+        handler: The request handler instance
+    """
+    if not _check_aggregator(handler):
+        return
+    
+    params = parse_qs(urlsplit(handler.path).query)
+    order = params.get('by', ['percent_used'])[0]
+    if order not in FLEET_TOP_ORDERS:
+        handler.send_json({'error': f"'by' must be one of {', '.join(FLEET_TOP_ORDERS)}"}, status=400)
+        return
+    try:
+        limit = int(params.get('limit', [FLEET_TOP_DEFAULT])[0])
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= FLEET_TOP_MAX:
+        handler.send_json({'error': f"'limit' must be between 1 and {FLEET_TOP_MAX}"}, status=400)
+        return
+    
+    handler.send_asset(fleet_views.get(('disk_top', order, limit), lambda: get_top_mounts(order, limit)))
+
+
+def get_fleet_agents():
+    """Get the state of every agent
+    
+    Returns:
+        dict: Number of agents up and down, and the polling state of every agent
+    """
+    agents = {agent.name: agent.get_stats() for agent in fleet_monitor.agents}
+    up = sum(stats['up'] for stats in agents.values())
+    return {'up': up, 'down': len(agents) - up, 'agents': agents}
+
+
+def get_fleet_snapshot():
+    """Get the latest snapshot of every agent
+    
+    Agents down are included with the last snapshot they returned, if any.
+    
+    Returns:
+        dict: State and snapshot of every agent, by agent name
+    """
+    return {agent.name: {'up': agent.is_up(), 'polled_at': agent.polled_at, 'snapshot': agent.snapshot}
+            for agent in fleet_monitor.agents}
+
+
+def get_top_mounts(order, limit):
+    """Get the fullest mounts across the fleet
+    
+    Mountpoints excluded from the Prometheus metrics (pseudo and container
+    runtime file systems) are left out.
+    
+    Args:
+        order (str): One of FLEET_TOP_ORDERS
+        limit (int): Number of mounts to return
+    
+    Returns:
+        list: The mounts with the name and state of their agent, fullest first
+    """
+    field, largest = FLEET_TOP_ORDERS[order]
+    mounts = []
+    for agent in fleet_monitor.agents:
+        disks = (agent.snapshot or {}).get('disk')
+        if not isinstance(disks, dict) or 'error' in disks:
+            continue
+        up = agent.is_up()
+        for disk in disks.values():
+            if not METRICS_EXCLUDE_MOUNTS.search(disk['mountpoint']) and disk.get('total'):
+                mounts.append(dict(disk, agent=agent.name, up=up))
+    
+    select = heapq.nlargest if largest else heapq.nsmallest
+    return select(limit, mounts, key=lambda disk: disk[field])
+
+
+def _check_aggregator(handler):
+    """Answer 404 unless running in aggregator mode
+    
+    Returns:
+        bool: The fleet endpoints are served
+    """
+    if fleet_monitor.is_running():
+        return True
+    handler.send_json({'error': "Fleet endpoints are only served in aggregator mode (PS_MONITOR_MODE=aggregator)"},
+                      status=404)
+    return False
+
+
+class FleetViews:
+    """
+    Cache of the fleet views, built once per fleet version.
+    
+    A view merges the snapshots of every agent, so building it costs
+    O(agents); it is encoded and compressed once, then every client loading
+    it is served the same bytes until the next polling round changes an
+    agent. Views of the polling state itself (poll times, failures,
+    latency), which change every round, use the round number as version.
+    """
+    
+    def __init__(self, get_version=fleet_monitor.get_version):
+        """Initialize an empty cache
+        
+        Args:
+            get_version (callable, optional): Function returning the current version of the views
+        """
+        self.get_version = get_version
+        self.lock = threading.Lock()
+        self.version = None
+        self.assets = {}
+    
+    def get(self, key, build):
+        """Get a view of the current fleet version, building it if needed
+        
+        Args:
+            key (tuple): The view name and parameters
+            build (callable): Function returning the JSON serializable view
+        
+        Returns:
+            StaticAsset: The encoded view, with its entity tag and compressed body
+        """
+        with self.lock:
+            version = self.get_version()
+            if version != self.version or len(self.assets) >= FLEET_VIEWS_MAX:
+                self.assets = {}
+                self.version = version
+            asset = self.assets.get(key)
+            if asset is None:
+                body = json.dumps(build()).encode('utf-8')
+                asset = StaticAsset(None, 'application/json', len(body), compute_etag(body), body,
+                                    compress(body) if len(body) >= GZIP_MIN_SIZE else None)
+                self.assets[key] = asset
+            return asset
+
+
+# Global instances shared by the fleet endpoints, for the snapshot views and the polling state views
+fleet_views = FleetViews()
+fleet_round_views = FleetViews(fleet_monitor.get_rounds)
@@ -0,0 +1,78 @@
+"""
+Internal statistics API endpoint
+Provides runtime statistics about the PS Monitor agent itself
+"""
+from urllib.parse import parse_qs, urlsplit
+
+from api.collector_cache import collector_cache
+from api.metric_stream import metric_stream
+from api.metrics import metrics_exporter
+from data.db.database import Database
+from monitor.fleet import fleet_monitor
+from monitor.instrumentation import (PROFILE_DEFAULT_INTERVAL_MS, PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS,
+                                     PROFILER_ENABLED, instrumentation, profiler)
+from monitor.ring_buffer import ring_buffers
+from monitor.scheduler import scheduler, writers
+
+
+def handle_internal_stats_request(handler):
+    """Handle /api/internal/stats endpoint request
+    
+    Args:
+        handler: The request handler instance
+    """
+    stats = {
+        'http': handler.server.get_stats(),
+        'requests': instrumentation.get_stats('requests'),
+        'stream': metric_stream.get_stats(),
+        'metrics': metrics_exporter.get_stats(),
+        'tasks': scheduler.get_stats(),
+        'collectors': collector_cache.get_stats(),
+        'buffers': ring_buffers.get_stats(),
+        'writers': {writer.name: writer.get_stats() for writer in writers},
+        'database': Database.get_stats(),
+        'repository': instrumentation.get_stats('repository')['latency'],
+        'profiler': {'enabled': PROFILER_ENABLED, 'running': profiler.is_running()},
+        'fleet': fleet_monitor.get_stats() if fleet_monitor.is_running() else None
+    }
+    
+    handler.send_json(stats)
+
+
+def handle_profile_request(handler):
+    """Handle /api/internal/profile endpoint request
+    
+    Samples the stacks of all threads for a while and returns the most
+    frequent ones; the request only completes once the profile is captured.
+    Disabled unless PS_MONITOR_PROFILER is set.
+    
+    Query parameters:
+        seconds: Duration of the profile (default: 10, maximum: 60)
+        interval_ms: Milliseconds between two samples (default: 10)
+    
+    Args:
+        handler: The request handler instance
+    """
+    if not PROFILER_ENABLED:
+        handler.send_json({'error': "Profiler disabled, set PS_MONITOR_PROFILER=1 to enable it"}, status=403)
+        return
+    
+    params = parse_qs(urlsplit(handler.path).query)
+    try:
+        seconds = float(params.get('seconds', [PROFILE_DEFAULT_SECONDS])[0])
+        interval_ms = float(params.get('interval_ms', [PROFILE_DEFAULT_INTERVAL_MS])[0])
+    except ValueError:
+        handler.send_json({'error': "'seconds' and 'interval_ms' must be numbers"}, status=400)
+        return
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        handler.send_json({'error': f"'seconds' must be between 0 and {PROFILE_MAX_SECONDS}"}, status=400)
+        return
+    if not 1 <= interval_ms <= 1000:
+        handler.send_json({'error': "'interval_ms' must be between 1 and 1000"}, status=400)
+        return
+    
+    profile = profiler.profile(seconds, interval_ms)
+    if profile is None:
+        handler.send_json({'error': "A profile is already being captured"}, status=409)
+        return
+    handler.send_json(profile)
@@ -2,10 +2,25 @@
 Memory usage API endpoint
 Provides system memory information using standard libraries
 """
-import json
+import os
 import platform
 import subprocess
 import re
+import threading
+
+from api.collector_cache import collector_cache
+
+# Seconds a memory snapshot is shared between requests, and served stale while refreshing
+MEMORY_CACHE_TTL = 1
+MEMORY_CACHE_MAX_STALE = 5
+
+MEMINFO_PATH = '/proc/meminfo'
+
+# /proc/meminfo keys read by the Linux reader, in bytes unless marked as counts
+MEMINFO_KEYS = (
+    'MemTotal', 'MemFree', 'MemAvailable', 'Buffers', 'Cached', 'SwapTotal', 'SwapFree',
+    'Dirty', 'Shmem', 'HugePages_Total', 'HugePages_Free', 'Hugepagesize'
+)
 
 
 def handle_memory_usage_request(handler):
@@ -14,13 +29,101 @@ def handle_memory_usage_request(handler):
     Args:
         handler: The request handler instance
     """
-    handler.send_response(200)
-    handler.send_header('Content-type', 'application/json')
-    handler.end_headers()
+    memory_info = collector_cache.get('memory')
+    
+    handler.send_json(memory_info)
+
+
+class MeminfoReader:
+    """
+    Reader of /proc/meminfo keeping its file open between calls.
+    
+    Each read is a single preadv into a reusable buffer. The position of every
+    value is remembered from the previous parse, with its unit, and only
+    checked in place: the file is scanned again only when a line moved (a
+    value grew or lost a digit).
+    """
+    
+    def __init__(self, path=MEMINFO_PATH, keys=MEMINFO_KEYS):
+        """Initialize the reader
+        
+        Args:
+            path (str, optional): Path of the meminfo file
+            keys (tuple, optional): Keys to read
+        """
+        self.path = path
+        self.keys = keys
+        self.fd = None
+        self.buffer = bytearray(8192)
+        # (key, line offset, line prefix, value end, line end, multiplier) of each key found
+        self.layout = None
+        self.missing = {}
+        self.lock = threading.Lock()
     
-    memory_info = get_memory_info()
+    def read(self):
+        """Read the current values
+        
+        Returns:
+            dict: Values by key, in bytes for kB values; 0 for keys the kernel does not report
+        """
+        with self.lock:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDONLY)
+            
+            size = os.preadv(self.fd, [self.buffer], 0)
+            while size == len(self.buffer):
+                # The whole file must fit to be read atomically
+                self.buffer = bytearray(len(self.buffer) * 2)
+                size = os.preadv(self.fd, [self.buffer], 0)
+            
+            values = self._parse(size) if self.layout is not None else None
+            if values is None:
+                self._scan(size)
+                values = self._parse(size)
+            return values
     
-    handler.wfile.write(json.dumps(memory_info).encode('utf-8'))
+    def close(self):
+        """Close the file"""
+        with self.lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+    
+    def _parse(self, size):
+        """Parse the values at the known positions, or return None if a line moved"""
+        buffer = self.buffer
+        values = dict(self.missing)
+        for key, offset, prefix, value_end, line_end, multiplier in self.layout:
+            if line_end >= size or buffer[line_end] != 0x0A or not buffer.startswith(prefix, offset):
+                return None
+            values[key] = int(buffer[offset + len(prefix):value_end]) * multiplier
+        return values
+    
+    def _scan(self, size):
+        """Find the position of every value"""
+        wanted = {key.encode() + b':': key for key in self.keys}
+        layout = []
+        offset = 0
+        while offset < size:
+            line_end = self.buffer.find(b'\n', offset, size)
+            if line_end < 0:
+                break
+            colon = self.buffer.find(b':', offset, line_end)
+            prefix = bytes(self.buffer[offset:colon + 1])
+            if colon >= 0 and prefix in wanted:
+                if self.buffer.endswith(b' kB', offset, line_end):
+                    layout.append((wanted[prefix], offset, prefix, line_end - 3, line_end, 1024))
+                else:
+                    layout.append((wanted[prefix], offset, prefix, line_end, line_end, 1))
+            offset = line_end + 1
+        
+        found = {entry[0] for entry in layout}
+        self.missing = {key: 0 for key in self.keys if key not in found}
+        self.layout = layout
+
+
+# Shared reader of the Linux memory statistics
+meminfo_reader = MeminfoReader()
 
 
 def get_memory_info():
@@ -44,19 +147,13 @@ def get_memory_info():
     system = platform.system()
     
     if system == 'Linux':
-        # Read memory info from /proc/meminfo
         try:
-            with open('/proc/meminfo', 'r') as f:
-                meminfo = f.read()
-                
-            # Parse memory information
-            mem_total = int(re.search(r'MemTotal:\s+(\d+)', meminfo).group(1)) * 1024  # KB to bytes
-            mem_free = int(re.search(r'MemFree:\s+(\d+)', meminfo).group(1)) * 1024
-            mem_available = int(re.search(r'MemAvailable:\s+(\d+)', meminfo).group(1)) * 1024
+            meminfo = meminfo_reader.read()
             
-            # Swap information
-            swap_total = int(re.search(r'SwapTotal:\s+(\d+)', meminfo).group(1)) * 1024
-            swap_free = int(re.search(r'SwapFree:\s+(\d+)', meminfo).group(1)) * 1024
+            mem_total = meminfo['MemTotal']
+            mem_available = meminfo['MemAvailable']
+            swap_total = meminfo['SwapTotal']
+            swap_free = meminfo['SwapFree']
             
             # Calculate used memory
             mem_used = mem_total - mem_available
@@ -75,7 +172,14 @@ def get_memory_info():
                 'swap_total': swap_total,
                 'swap_used': swap_used,
                 'swap_free': swap_free,
-                'swap_percent_used': swap_percent
+                'swap_percent_used': swap_percent,
+                'buffers': meminfo['Buffers'],
+                'cached': meminfo['Cached'],
+                'dirty': meminfo['Dirty'],
+                'shmem': meminfo['Shmem'],
+                'hugepages_total': meminfo['HugePages_Total'],
+                'hugepages_free': meminfo['HugePages_Free'],
+                'hugepage_size': meminfo['Hugepagesize']
             })
         except Exception as e:
             result['error'] = str(e)
@@ -180,3 +284,6 @@ def get_memory_info():
         result['error'] = f"Unsupported operating system: {system}"
         
     return result
+
+
+collector_cache.register('memory', get_memory_info, MEMORY_CACHE_TTL, MEMORY_CACHE_MAX_STALE)
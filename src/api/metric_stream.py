@@ -0,0 +1,222 @@
+"""
+Metric stream API endpoint
+Pushes live metric updates to subscribers using Server-Sent Events
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from api.snapshot import SNAPSHOT_SECTIONS, collect_snapshot
+
+logger = logging.getLogger('MetricStream')
+
+# Seconds between two samples pushed to subscribers
+STREAM_INTERVAL = float(os.environ.get('PS_MONITOR_STREAM_INTERVAL', 2))
+
+# Seconds without changes after which a keep-alive comment is sent
+HEARTBEAT_INTERVAL = 15
+
+# Seconds a subscriber may block a write before it is disconnected
+SEND_TIMEOUT = 2
+
+
+def handle_stream_request(handler):
+    """Handle /api/stream endpoint request
+    
+    Sends the response headers, then hands the connection over to the metric
+    stream, which sends the full snapshot followed by changed fields only.
+    
+    Args:
+        handler: The request handler instance
+    """
+    handler.send_response(200)
+    handler.send_header('Content-type', 'text/event-stream')
+    handler.send_header('Cache-Control', 'no-cache')
+    handler.send_header('Connection', 'close')
+    handler.end_headers()
+    handler.wfile.flush()
+    
+    handler.server.detach_request(handler.request)
+    metric_stream.subscribe(handler.request)
+
+
+def collect_stream_snapshot():
+    """Collect the metrics pushed to stream subscribers
+    
+    Returns:
+        dict: System, disk usage (by mountpoint), disk I/O (by device), memory, CPU,
+            network (by interface) and top process information
+    """
+    return collect_snapshot(SNAPSHOT_SECTIONS)
+
+
+def diff_snapshots(old, new):
+    """Compute the fields that changed between two snapshots
+    
+    Nested dictionaries are compared recursively. Removed keys are reported
+    with a None value.
+    
+    Args:
+        old (dict): The previous snapshot
+        new (dict): The current snapshot
+    
+    Returns:
+        dict: The changed fields, empty if nothing changed
+    """
+    delta = {}
+    for key, value in new.items():
+        old_value = old.get(key)
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            changes = diff_snapshots(old_value, value)
+            if changes:
+                delta[key] = changes
+        elif value != old_value:
+            delta[key] = value
+    
+    for key in old:
+        if key not in new:
+            delta[key] = None
+    return delta
+
+
+def format_event(event, data):
+    """Encode a Server-Sent Event
+    
+    Args:
+        event (str): The event name
+        data: JSON serializable event data
+    
+    Returns:
+        bytes: The encoded event
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+class MetricStream:
+    """
+    Single producer pushing metric samples to all stream subscribers.
+    
+    The producer thread runs only while there are subscribers. Each tick it
+    collects one snapshot and sends the same encoded delta to every subscriber,
+    so the collection cost does not depend on the number of subscribers.
+    Payloads are sent without holding the lock, so a slow subscriber does not
+    block new subscriptions.
+    """
+    
+    def __init__(self, interval=STREAM_INTERVAL):
+        """Initialize the metric stream
+        
+        Args:
+            interval (float, optional): Seconds between two samples
+        """
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.snapshot = None
+        self.producer_thread = None
+        self.last_sent = 0
+    
+    def subscribe(self, connection):
+        """Add a subscriber and send it the current snapshot
+        
+        Args:
+            connection (socket.socket): The subscriber connection
+        """
+        connection.settimeout(SEND_TIMEOUT)
+        with self.lock:
+            if self.snapshot is None:
+                self.snapshot = collect_stream_snapshot()
+            sent = self.snapshot
+        
+        payload = format_event('snapshot', sent)
+        while True:
+            if not self._send(connection, payload):
+                return
+            with self.lock:
+                if self.snapshot is None:
+                    self.snapshot = sent
+                if self.snapshot is sent:
+                    self.subscribers.add(connection)
+                    if self.producer_thread is None:
+                        self.producer_thread = threading.Thread(target=self._produce, name='MetricStream',
+                                                                daemon=True)
+                        self.producer_thread.start()
+                    break
+                # The producer moved on while sending, catch up before receiving its deltas
+                payload = format_event('delta', diff_snapshots(sent, self.snapshot))
+                sent = self.snapshot
+        logger.info(f"Stream subscriber added ({len(self.subscribers)} connected)")
+    
+    def get_stats(self):
+        """Get the stream statistics
+        
+        Returns:
+            dict: Number of subscribers and stream interval
+        """
+        return {
+            'subscribers': len(self.subscribers),
+            'interval': self.interval
+        }
+    
+    def _produce(self):
+        """Producer thread sending one update per tick to all subscribers"""
+        while True:
+            time.sleep(self.interval)
+            try:
+                snapshot = collect_stream_snapshot()
+            except Exception as e:
+                logger.error(f"Error collecting stream snapshot: {e}")
+                continue
+            
+            with self.lock:
+                delta = diff_snapshots(self.snapshot, snapshot)
+                self.snapshot = snapshot
+                
+                if delta:
+                    payload = format_event('delta', delta)
+                elif time.monotonic() - self.last_sent >= HEARTBEAT_INTERVAL:
+                    payload = b': keep-alive\n\n'
+                else:
+                    payload = None
+                
+                if payload is not None:
+                    self.last_sent = time.monotonic()
+                    subscribers = list(self.subscribers)
+                else:
+                    subscribers = []
+            
+            failed = [connection for connection in subscribers if not self._send(connection, payload)]
+            
+            with self.lock:
+                for connection in failed:
+                    self.subscribers.discard(connection)
+                    logger.info(f"Stream subscriber removed ({len(self.subscribers)} connected)")
+                
+                if not self.subscribers:
+                    # Next subscriber starts a new producer with a fresh snapshot
+                    self.producer_thread = None
+                    self.snapshot = None
+                    return
+    
+    @staticmethod
+    def _send(connection, payload):
+        """Send a payload to a subscriber, closing the connection on failure
+        
+        Returns:
+            bool: True if the payload was sent
+        """
+        try:
+            connection.sendall(payload)
+            return True
+        except OSError:
+            try:
+                connection.close()
+            except OSError:
+                pass
+            return False
+
+
+# Global instance shared by all stream subscribers
+metric_stream = MetricStream()
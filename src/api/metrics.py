@@ -0,0 +1,446 @@
+"""
+Prometheus metrics endpoint
+Renders the collected metrics and the agent statistics in the Prometheus text exposition format
+"""
+import logging
+import os
+import re
+import threading
+import time
+
+from api.collector_cache import collector_cache
+from api.metric_stream import metric_stream
+from data.db.database import Database
+from monitor.instrumentation import LATENCY_BUCKETS_MS, instrumentation
+from monitor.scheduler import scheduler, writers
+from web.http_cache import GZIP_MIN_SIZE, compress, compute_etag
+from web.static_assets import StaticAsset
+
+logger = logging.getLogger('Metrics')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Maximum mountpoints exported with their own labels; the smaller ones are summed
+# into a single mountpoint="_other" series, so the number of series stays bounded
+METRICS_MAX_MOUNTS = int(os.environ.get('PS_MONITOR_METRICS_MAX_MOUNTS', 32))
+
+# Mountpoints never exported: pseudo and runtime filesystems, and the per-container
+# and per-snap mounts whose names change with every deployment
+METRICS_EXCLUDE_MOUNTS = re.compile(os.environ.get(
+    'PS_MONITOR_METRICS_EXCLUDE_MOUNTS',
+    r'^/(dev|proc|run|snap|sys)(/|$)|^/var/lib/(docker|containers|kubelet)/'))
+
+# Maximum block devices and network interfaces exported, in name order
+METRICS_MAX_INSTANCES = int(os.environ.get('PS_MONITOR_METRICS_MAX_INSTANCES', 64))
+
+# Collector cache entries rendered; a new value of any of them invalidates the rendering
+METRICS_SECTIONS = ('system', 'disk', 'memory', 'cpu', 'disk_io', 'network', 'processes')
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKET_BOUNDS = tuple(f'{bound / 1000:g}' for bound in LATENCY_BUCKETS_MS) + ('+Inf',)
+
+# Memory gauges: key in the memory reading, metric name and help
+MEMORY_GAUGES = (
+    ('total', 'ps_monitor_memory_total_bytes', 'Physical memory size'),
+    ('used', 'ps_monitor_memory_used_bytes', 'Physical memory used'),
+    ('free', 'ps_monitor_memory_available_bytes', 'Physical memory available for new allocations'),
+    ('buffers', 'ps_monitor_memory_buffers_bytes', 'Memory used by block device buffers'),
+    ('cached', 'ps_monitor_memory_cached_bytes', 'Memory used by the page cache'),
+    ('dirty', 'ps_monitor_memory_dirty_bytes', 'Memory waiting to be written back to disk'),
+    ('shmem', 'ps_monitor_memory_shared_bytes', 'Shared memory and tmpfs'),
+    ('swap_total', 'ps_monitor_swap_total_bytes', 'Swap size'),
+    ('swap_used', 'ps_monitor_swap_used_bytes', 'Swap used'),
+    ('swap_free', 'ps_monitor_swap_free_bytes', 'Swap free'),
+)
+
+# Block device gauges: key in a disk I/O reading, metric name, help and scale
+DISK_IO_GAUGES = (
+    ('read_iops', 'ps_monitor_disk_reads_per_second', 'Read requests completed per second', 1),
+    ('write_iops', 'ps_monitor_disk_writes_per_second', 'Write requests completed per second', 1),
+    ('read_bytes_per_sec', 'ps_monitor_disk_read_bytes_per_second', 'Bytes read per second', 1),
+    ('write_bytes_per_sec', 'ps_monitor_disk_written_bytes_per_second', 'Bytes written per second', 1),
+    ('read_await_ms', 'ps_monitor_disk_read_await_seconds', 'Average time of a read request, queueing included', 0.001),
+    ('write_await_ms', 'ps_monitor_disk_write_await_seconds', 'Average time of a write request, queueing included', 0.001),
+    ('utilization', 'ps_monitor_disk_io_utilization_ratio', 'Share of the time with requests in flight', 0.01),
+    ('in_flight', 'ps_monitor_disk_io_in_flight', 'Requests in flight', 1),
+)
+
+# Network interface gauges: key in a network reading, metric name, help and scale
+NETWORK_GAUGES = (
+    ('rx_bytes_per_sec', 'ps_monitor_network_receive_bytes_per_second', 'Bytes received per second', 1),
+    ('tx_bytes_per_sec', 'ps_monitor_network_transmit_bytes_per_second', 'Bytes sent per second', 1),
+    ('rx_packets_per_sec', 'ps_monitor_network_receive_packets_per_second', 'Packets received per second', 1),
+    ('tx_packets_per_sec', 'ps_monitor_network_transmit_packets_per_second', 'Packets sent per second', 1),
+    ('rx_errors_per_sec', 'ps_monitor_network_receive_errors_per_second', 'Receive errors per second', 1),
+    ('tx_errors_per_sec', 'ps_monitor_network_transmit_errors_per_second', 'Transmit errors per second', 1),
+    ('rx_drops_per_sec', 'ps_monitor_network_receive_drops_per_second', 'Received packets dropped per second', 1),
+    ('tx_drops_per_sec', 'ps_monitor_network_transmit_drops_per_second', 'Sent packets dropped per second', 1),
+    ('speed_mbps', 'ps_monitor_network_speed_bytes_per_second', 'Link speed in bytes per second', 125000),
+    ('utilization', 'ps_monitor_network_utilization_ratio', 'Traffic of the busiest direction against the link speed', 0.01),
+)
+
+# CPU modes reported as ps_monitor_cpu_usage_ratio{mode=...}
+CPU_MODES = ('user', 'system', 'iowait', 'steal', 'idle')
+
+
+def handle_metrics_request(handler):
+    """Handle /metrics endpoint request
+    
+    Args:
+        handler: The request handler instance
+    """
+    handler.send_asset(metrics_exporter.get(handler.server))
+
+
+class MetricsWriter:
+    """Builder of a text exposition, one metric family at a time"""
+    
+    def __init__(self):
+        """Initialize an empty exposition"""
+        self.lines = []
+    
+    def gauge(self, name, help_text, samples):
+        """Add a gauge family
+        
+        Args:
+            name (str): The metric name
+            help_text (str): The HELP text
+            samples (iterable): (labels, value) pairs; labels is a dict or None,
+                and samples with a None value are skipped
+        """
+        self._family(name, 'gauge', help_text, samples)
+    
+    def counter(self, name, help_text, samples):
+        """Add a counter family, named with its _total suffix"""
+        self._family(name, 'counter', help_text, samples)
+    
+    def histogram(self, name, help_text, histograms):
+        """Add a histogram family
+        
+        Args:
+            name (str): The metric name, in seconds
+            help_text (str): The HELP text
+            histograms (iterable): (labels, LatencyHistogram) pairs
+        """
+        lines = []
+        for labels, histogram in histograms:
+            counts, count, sum_ms = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKET_BOUNDS, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{format_labels(dict(labels, le=bound))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(sum_ms / 1000)}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+        if lines:
+            self.lines.append(f'# HELP {name} {help_text}')
+            self.lines.append(f'# TYPE {name} histogram')
+            self.lines.extend(lines)
+    
+    def render(self):
+        """Get the exposition
+        
+        Returns:
+            bytes: The UTF-8 encoded exposition
+        """
+        self.lines.append('')
+        return '\n'.join(self.lines).encode('utf-8')
+    
+    def _family(self, name, kind, help_text, samples):
+        """Add a family of samples, without headers when it has no sample"""
+        lines = [f'{name}{format_labels(labels)} {format_value(value)}'
+                 for labels, value in samples if value is not None]
+        if lines:
+            self.lines.append(f'# HELP {name} {help_text}')
+            self.lines.append(f'# TYPE {name} {kind}')
+            self.lines.extend(lines)
+
+
+def format_labels(labels):
+    """Format a label set, escaping the values"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label_value(value)}"' for key, value in labels.items()) + '}'
+
+
+def escape_label_value(value):
+    """Escape a label value for the text exposition format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    """Format a sample value"""
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def select_mounts(disks):
+    """Bound the mountpoints exported
+    
+    Excluded mountpoints are dropped. Of the others, the METRICS_MAX_MOUNTS
+    largest are exported; the rest are summed into one '_other' entry, so
+    the totals stay right while the number of series stays bounded.
+    
+    Args:
+        disks (list): The disk usage entries
+    
+    Returns:
+        tuple: The exported entries, and the numbers of summed and excluded mounts
+    """
+    candidates = [disk for disk in disks if not METRICS_EXCLUDE_MOUNTS.search(disk['mountpoint'])]
+    excluded = len(disks) - len(candidates)
+    if len(candidates) <= METRICS_MAX_MOUNTS:
+        return candidates, 0, excluded
+    
+    candidates.sort(key=lambda disk: (-disk['total'], disk['mountpoint']))
+    exported = candidates[:METRICS_MAX_MOUNTS]
+    rest = candidates[METRICS_MAX_MOUNTS:]
+    other = {'device': '_other', 'mountpoint': '_other', 'stale': any(disk.get('stale') for disk in rest)}
+    for key in ('total', 'used', 'free'):
+        other[key] = sum(disk[key] for disk in rest)
+    other['percent_used'] = round(other['used'] * 100 / (other['used'] + other['free']), 2) \
+        if other['used'] + other['free'] else 0
+    return exported + [other], len(rest), excluded
+
+
+class MetricsExporter:
+    """
+    Renderer of the /metrics exposition, cached per collection.
+    
+    Every scrape reads the sections from the collector cache, which collects
+    them at most once per TTL whatever the number of scrapers. The exposition
+    is rendered and compressed again only when one of the sections got a new
+    value (its collector cache version changed); in between, scrapers are
+    served the same bytes. The agent statistics in the exposition are those
+    of the last rendering.
+    
+    The sections are read without holding the lock, so a scraper waiting for
+    a fresh collection does not block the others; the lock only guards the
+    comparison of the versions and the rendering.
+    """
+    
+    def __init__(self):
+        """Initialize the exporter without a rendering"""
+        self.lock = threading.Lock()
+        self.versions = None
+        self.asset = None
+        self.renders = 0
+        self.scrapes = 0
+        self.last_render_ms = 0.0
+    
+    def get(self, server=None):
+        """Get the exposition, rendering it again if the collected values changed
+        
+        Args:
+            server (optional): The HTTP server, whose statistics are included
+        
+        Returns:
+            StaticAsset: The exposition, with its entity tag and compressed body
+        """
+        # The version of a section is read before its value: a collection finishing in between
+        # is rendered again by the next scrape, instead of old values being cached as the new version
+        values = {}
+        versions = []
+        for name in METRICS_SECTIONS:
+            versions.append(collector_cache.get_version(name))
+            try:
+                values[name] = collector_cache.get(name)
+            except Exception as e:
+                logger.error(f"Error collecting {name} for the metrics: {e}")
+                values[name] = {'error': str(e)}
+        versions = tuple(versions)
+        
+        with self.lock:
+            self.scrapes += 1
+            # A concurrent scraper may have rendered newer values already
+            if self.versions and all(version <= current for version, current in zip(versions, self.versions)):
+                return self.asset
+            
+            started = time.perf_counter()
+            body = self.render(values, server)
+            self.asset = StaticAsset(None, CONTENT_TYPE, len(body), compute_etag(body), body,
+                                     compress(body) if len(body) >= GZIP_MIN_SIZE else None)
+            self.versions = versions
+            self.renders += 1
+            self.last_render_ms = (time.perf_counter() - started) * 1000
+            return self.asset
+    
+    def get_stats(self):
+        """Get the exporter statistics
+        
+        Returns:
+            dict: Scrape and rendering counts, and the size and cost of the last rendering
+        """
+        with self.lock:
+            return {
+                'scrapes': self.scrapes,
+                'renders': self.renders,
+                'size': self.asset.size if self.asset else 0,
+                'last_render_ms': round(self.last_render_ms, 3)
+            }
+    
+    def render(self, values, server=None):
+        """Render an exposition
+        
+        Args:
+            values (dict): The value of each section, by collector cache name
+            server (optional): The HTTP server, whose statistics are included
+        
+        Returns:
+            bytes: The exposition
+        """
+        writer = MetricsWriter()
+        writer.gauge('ps_monitor_collector_up', 'Whether the last collection succeeded',
+                     [({'collector': name}, not (isinstance(value, dict) and 'error' in value))
+                      for name, value in values.items()])
+        
+        self._render_system(writer, values['system'])
+        self._render_disk(writer, values['disk'])
+        self._render_memory(writer, values['memory'])
+        self._render_cpu(writer, values['cpu'])
+        dropped = {
+            'devices': self._render_instances(writer, values['disk_io'], 'devices', 'device', DISK_IO_GAUGES),
+            'interfaces': self._render_instances(writer, values['network'], 'interfaces', 'interface',
+                                                 NETWORK_GAUGES)
+        }
+        # One family for both sections, a family must appear only once in an exposition
+        writer.gauge('ps_monitor_metrics_dropped_instances', 'Instances left out of the exposition',
+                     [({'section': section}, count) for section, count in dropped.items() if count])
+        self._render_processes(writer, values['processes'])
+        self._render_agent(writer, server)
+        return writer.render()
+    
+    @staticmethod
+    def _render_system(writer, system):
+        """Render the platform information"""
+        if 'error' in system:
+            return
+        platform_info = system['platform']
+        writer.gauge('ps_monitor_system_info', 'Operating system and platform, as labels', [({
+            'system': platform_info['system'],
+            'release': platform_info['release'],
+            'machine': platform_info['machine'],
+            'python': platform_info['python']
+        }, 1)])
+    
+    @staticmethod
+    def _render_disk(writer, disks):
+        """Render the disk usage of the selected mounts"""
+        if not isinstance(disks, list):
+            return
+        exported, summed, excluded = select_mounts(disks)
+        
+        def labels(disk):
+            return {'device': disk['device'], 'mountpoint': disk['mountpoint']}
+        
+        writer.gauge('ps_monitor_disk_size_bytes', 'Filesystem size',
+                     [(labels(disk), disk['total']) for disk in exported])
+        writer.gauge('ps_monitor_disk_used_bytes', 'Filesystem space used',
+                     [(labels(disk), disk['used']) for disk in exported])
+        writer.gauge('ps_monitor_disk_free_bytes', 'Filesystem space available to unprivileged users',
+                     [(labels(disk), disk['free']) for disk in exported])
+        writer.gauge('ps_monitor_disk_used_ratio', 'Share of the filesystem space used',
+                     [(labels(disk), round(disk['percent_used'] / 100, 4)) for disk in exported])
+        writer.gauge('ps_monitor_disk_stale', 'Whether the values are the last known ones of a hung mount',
+                     [(labels(disk), bool(disk.get('stale'))) for disk in exported])
+        writer.gauge('ps_monitor_disk_mounts', 'Mounts by export state',
+                     [({'state': 'exported'}, len(exported) - (1 if summed else 0)),
+                      ({'state': 'summed'}, summed), ({'state': 'excluded'}, excluded)])
+    
+    @staticmethod
+    def _render_memory(writer, memory):
+        """Render the memory usage"""
+        if 'error' in memory:
+            return
+        for key, name, help_text in MEMORY_GAUGES:
+            writer.gauge(name, help_text, [(None, memory.get(key))])
+    
+    @staticmethod
+    def _render_cpu(writer, cpu):
+        """Render the CPU utilization and load averages"""
+        if 'error' in cpu:
+            return
+        writer.gauge('ps_monitor_cpu_used_ratio', 'Share of the CPU time not idle or waiting for I/O',
+                     [(None, round(cpu['percent_used'] / 100, 4))])
+        writer.gauge('ps_monitor_cpu_usage_ratio', 'Share of the CPU time by mode',
+                     [({'mode': mode}, round(cpu[mode] / 100, 4)) for mode in CPU_MODES])
+        writer.gauge('ps_monitor_cpu_count', 'Number of CPU cores', [(None, cpu['cpu_count'])])
+        for period in (1, 5, 15):
+            writer.gauge(f'ps_monitor_load{period}', f'{period} minute load average', [(None, cpu[f'load_{period}'])])
+        writer.gauge('ps_monitor_tasks', 'Scheduling entities by state',
+                     [({'state': 'runnable'}, cpu['runnable']), ({'state': 'all'}, cpu['tasks'])])
+    
+    @staticmethod
+    def _render_instances(writer, reading, key, label, gauges):
+        """Render the gauges of the first METRICS_MAX_INSTANCES devices or interfaces by name
+        
+        Returns:
+            int: The number of instances left out
+        """
+        instances = sorted(reading.get(key, ()), key=lambda instance: instance[label])
+        dropped = max(len(instances) - METRICS_MAX_INSTANCES, 0)
+        instances = instances[:METRICS_MAX_INSTANCES]
+        for field, name, help_text, scale in gauges:
+            writer.gauge(name, help_text, [({label: instance[label]},
+                                            round(instance[field] * scale, 6) if instance[field] is not None else None)
+                                           for instance in instances])
+        return dropped
+    
+    @staticmethod
+    def _render_processes(writer, table):
+        """Render the process counts"""
+        if 'error' in table:
+            return
+        writer.gauge('ps_monitor_processes', 'Number of processes', [(None, table['count'])])
+        writer.gauge('ps_monitor_processes_running', 'Number of running processes', [(None, table['running'])])
+        writer.gauge('ps_monitor_threads', 'Number of threads', [(None, table['threads'])])
+    
+    @staticmethod
+    def _render_agent(writer, server):
+        """Render the statistics of the agent itself"""
+        if server is not None:
+            stats = server.get_stats()
+            writer.gauge('ps_monitor_http_workers_active', 'HTTP workers handling a connection', [(None, stats['active'])])
+            writer.gauge('ps_monitor_http_queue_depth', 'Connections waiting for an HTTP worker',
+                         [(None, stats['queue_depth'])])
+            writer.counter('ps_monitor_http_rejected_connections_total', 'Connections rejected with a full queue',
+                           [(None, stats['rejected'])])
+        writer.histogram('ps_monitor_http_request_duration_seconds', 'HTTP request latency by route',
+                         [({'route': route}, histogram)
+                          for route, histogram in sorted(instrumentation.get_histograms('requests').items())])
+        writer.counter('ps_monitor_http_responses_total', 'HTTP responses by status class',
+                       [({'code': code}, count)
+                        for code, count in sorted(instrumentation.get_counters('requests').items())])
+        writer.gauge('ps_monitor_stream_subscribers', 'Clients of the metric stream',
+                     [(None, metric_stream.get_stats()['subscribers'])])
+        
+        tasks = sorted(scheduler.tasks.items())
+        writer.histogram('ps_monitor_task_duration_seconds', 'Scheduled task run latency',
+                         [({'task': name}, task.latency) for name, task in tasks])
+        writer.counter('ps_monitor_task_errors_total', 'Scheduled task runs that failed',
+                       [({'task': name}, task.errors) for name, task in tasks])
+        writer.gauge('ps_monitor_task_interval_seconds', 'Current interval of a scheduled task, raised when over budget',
+                     [({'task': name}, task.current_interval) for name, task in tasks])
+        
+        writer_stats = [(batch_writer.name, batch_writer.get_stats()) for batch_writer in writers]
+        writer.gauge('ps_monitor_writer_queued_rows', 'Rows waiting to be written',
+                     [({'writer': name}, stats['queued']) for name, stats in writer_stats])
+        writer.counter('ps_monitor_writer_rows_written_total', 'Rows written by a batch writer',
+                       [({'writer': name}, stats['rows_written']) for name, stats in writer_stats])
+        writer.counter('ps_monitor_writer_rows_dropped_total', 'Rows dropped with a full writer queue',
+                       [({'writer': name}, stats['rows_dropped']) for name, stats in writer_stats])
+        
+        database = Database.get_stats()
+        writer.gauge('ps_monitor_db_connections', 'Open database connections', [(None, database['connections'])])
+        writer.histogram('ps_monitor_db_statement_duration_seconds', 'Database statement latency by kind',
+                         [({'kind': kind}, histogram)
+                          for kind, histogram in sorted(instrumentation.get_histograms('database').items())])
+        writer.counter('ps_monitor_db_rows_written_total', 'Rows inserted, updated or deleted',
+                       [(None, database['rows_written'])])
+        writer.counter('ps_monitor_db_errors_total', 'Database statements that failed', [(None, database['errors'])])
+
+
+# Global instance shared by all scrapers
+metrics_exporter = MetricsExporter()
@@ -0,0 +1,240 @@
+"""
+Network usage API endpoint
+Provides the throughput, packet, error and drop rates of each network interface
+"""
+import os
+import platform
+import threading
+import time
+
+from operator import sub
+
+from api.collector_cache import collector_cache
+
+# Seconds a network reading is shared between requests, and served stale while refreshing
+NETWORK_CACHE_TTL = 1
+NETWORK_CACHE_MAX_STALE = 5
+
+NET_DEV_PATH = '/proc/net/dev'
+SYS_CLASS_NET_PATH = '/sys/class/net'
+
+# Seconds between two reads of the link speeds; they only change when a link is renegotiated
+SPEED_REFRESH_INTERVAL = 60
+
+# Position of the counters used in a /proc/net/dev line, after the interface name
+NET_DEV_COLUMNS = {
+    'rx_bytes': 1,
+    'rx_packets': 2,
+    'rx_errors': 3,
+    'rx_drops': 4,
+    'tx_bytes': 9,
+    'tx_packets': 10,
+    'tx_errors': 11,
+    'tx_drops': 12
+}
+
+# Tokens of a /proc/net/dev line: the name, 8 receive and 8 transmit counters
+NET_DEV_LINE_WIDTH = 17
+
+# Drivers may expose 32-bit counters, which wrap quickly on fast links
+COUNTER_32_LIMIT = 2 ** 32
+
+# A counter going backwards only wrapped around 32 bits if it was within this
+# distance of the limit and is now below it; anything else is a reset
+COUNTER_32_WRAP_MARGIN = 2 ** 30
+
+
+def handle_network_usage_request(handler):
+    """Handle /api/network/usage endpoint request
+    
+    Args:
+        handler: The request handler instance
+    """
+    network_usage = collector_cache.get('network')
+    
+    handler.send_json(network_usage)
+
+
+class NetDevReader:
+    """
+    Reader of the Linux network interface counters.
+    
+    /proc/net/dev is kept open and read with a single preadv into a reusable
+    buffer, and every counter is handled as a column of all interfaces, as
+    for the CPU and disk counters. Rates come from the difference with the
+    previous read; the first read reports the averages since boot. Link
+    speeds are read from sysfs only when interfaces change or every
+    SPEED_REFRESH_INTERVAL seconds.
+    """
+    
+    def __init__(self, path=NET_DEV_PATH, sys_path=SYS_CLASS_NET_PATH):
+        """Initialize the reader
+        
+        Args:
+            path (str, optional): Path of the network device statistics file
+            sys_path (str, optional): Directory of the network interfaces in sysfs
+        """
+        self.path = path
+        self.sys_path = sys_path
+        self.fd = None
+        self.buffer = bytearray(8192)
+        # Interface names and counters of the previous read
+        self.names = None
+        self.interface_names = None
+        self.counters = None
+        self.read_at = None
+        self.speeds = None
+        self.speeds_read_at = None
+        self.lock = threading.Lock()
+    
+    def read(self):
+        """Read the interface rates since the previous read
+        
+        Returns:
+            dict: The interval in seconds (None since boot), and the interfaces
+                with their rates per second, link speed and utilization
+        """
+        with self.lock:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDONLY)
+            
+            now = time.clock_gettime(time.CLOCK_BOOTTIME)
+            names, counters = self._read_counters()
+            if self.counters is None:
+                # Counters start when the interface is created, at boot for most
+                previous = [[0] * len(names) for _ in counters]
+                elapsed = now
+                interval = None
+            else:
+                previous = self.counters if names == self.names else self._align(names, counters)
+                elapsed = now - self.read_at
+                interval = round(elapsed, 3)
+            
+            if names != self.names or now - self.speeds_read_at >= SPEED_REFRESH_INTERVAL:
+                self.interface_names = [name.decode() for name in names]
+                self.speeds = [self._read_speed(name) for name in self.interface_names]
+                self.speeds_read_at = now
+            self.names = names
+            self.counters = counters
+            self.read_at = now
+            
+            rates = {}
+            for column, current, old in zip(NET_DEV_COLUMNS, counters, previous):
+                deltas = list(map(sub, current, old))
+                if deltas and min(deltas) < 0:
+                    deltas = [delta if delta >= 0 else _wrapped_delta(value, old_value)
+                              for delta, value, old_value in zip(deltas, current, old)]
+                rates[column] = [delta / elapsed for delta in deltas]
+            
+            interfaces = []
+            for index, name in enumerate(self.interface_names):
+                rx_bytes = rates['rx_bytes'][index]
+                tx_bytes = rates['tx_bytes'][index]
+                speed = self.speeds[index]
+                interfaces.append({
+                    'interface': name,
+                    'rx_bytes_per_sec': round(rx_bytes),
+                    'tx_bytes_per_sec': round(tx_bytes),
+                    'rx_packets_per_sec': round(rates['rx_packets'][index], 2),
+                    'tx_packets_per_sec': round(rates['tx_packets'][index], 2),
+                    'rx_errors_per_sec': round(rates['rx_errors'][index], 2),
+                    'tx_errors_per_sec': round(rates['tx_errors'][index], 2),
+                    'rx_drops_per_sec': round(rates['rx_drops'][index], 2),
+                    'tx_drops_per_sec': round(rates['tx_drops'][index], 2),
+                    'speed_mbps': speed,
+                    # Links are full duplex: the busiest direction against the link speed
+                    'utilization': round(max(rx_bytes, tx_bytes) * 8 / (speed * 10000), 2) if speed else None
+                })
+            
+            return {
+                'interval': interval,
+                'interfaces': interfaces
+            }
+    
+    def close(self):
+        """Close the file"""
+        with self.lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+    
+    def _read_counters(self):
+        """Read /proc/net/dev
+        
+        Returns:
+            tuple: The interface names, and one list of counters per NET_DEV_COLUMNS
+                column, in line order
+        """
+        size = os.preadv(self.fd, [self.buffer], 0)
+        while size == len(self.buffer):
+            self.buffer = bytearray(len(self.buffer) * 2)
+            size = os.preadv(self.fd, [self.buffer], 0)
+        
+        # Skip the two header lines; the colon after the name may touch the first counter
+        start = self.buffer.find(b'\n', self.buffer.find(b'\n', 0, size) + 1, size) + 1
+        tokens = bytes(self.buffer[start:size]).replace(b':', b' ').split()
+        counters = [list(map(int, tokens[column::NET_DEV_LINE_WIDTH])) for column in NET_DEV_COLUMNS.values()]
+        return tokens[::NET_DEV_LINE_WIDTH], counters
+    
+    def _align(self, names, counters):
+        """Get the previous counters in the order of the current interfaces
+        
+        Interfaces added since the previous read get their current counters, so
+        their first rates are 0 rather than their counts since creation.
+        """
+        index = {name: position for position, name in enumerate(self.names)}
+        return [[old[index[name]] if name in index else current[position]
+                 for position, name in enumerate(names)]
+                for current, old in zip(counters, self.counters)]
+    
+    def _read_speed(self, name):
+        """Read the link speed of an interface
+        
+        Returns:
+            int: The speed in Mb/s, or None if unknown (virtual interfaces, link down)
+        """
+        try:
+            with open(os.path.join(self.sys_path, name, 'speed'), 'rb') as f:
+                speed = int(f.read())
+        except (OSError, ValueError):
+            return None
+        return speed if speed > 0 else None
+
+
+def _wrapped_delta(current, previous):
+    """Get the increase of a counter that went backwards
+    
+    /proc/net/dev counters are 64-bit on 64-bit kernels, so going backwards
+    usually means a reset (interface re-created, tunnel restarted, driver
+    reloaded) and the counter counts from 0. It is taken as a 32-bit wrap
+    only when the previous value was close to 2**32 and the current one is
+    small.
+    """
+    if COUNTER_32_LIMIT - COUNTER_32_WRAP_MARGIN <= previous < COUNTER_32_LIMIT and current < COUNTER_32_WRAP_MARGIN:
+        return current + COUNTER_32_LIMIT - previous
+    return current
+
+
+def get_network_usage(reader=None):
+    """Get the rates of the network interfaces since the previous reading
+    
+    Args:
+        reader (NetDevReader, optional): The reader, holding the previous
+            reading; the shared reader by default
+    
+    Returns:
+        dict: Network usage information
+    """
+    if platform.system() != 'Linux':
+        return {'error': f"Unsupported operating system: {platform.system()}", 'interfaces': []}
+    
+    try:
+        return (reader or net_dev_reader).read()
+    except Exception as e:
+        return {'error': str(e), 'interfaces': []}
+
+
+# Shared reader of the API endpoint
+net_dev_reader = NetDevReader()
+
+collector_cache.register('network', get_network_usage, NETWORK_CACHE_TTL, NETWORK_CACHE_MAX_STALE)
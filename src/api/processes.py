@@ -0,0 +1,276 @@
+"""
+Processes API endpoint
+Provides the process count and the top processes by CPU or memory usage
+"""
+import heapq
+import os
+import platform
+import threading
+import time
+
+from collections import namedtuple
+from operator import attrgetter
+from urllib.parse import parse_qs, urlsplit
+
+from api.collector_cache import collector_cache
+
+try:
+    import pwd
+except ImportError:
+    pwd = None
+
+# Seconds a process table scan is shared between requests, and served stale while refreshing
+PROCESS_CACHE_TTL = 2
+PROCESS_CACHE_MAX_STALE = 5
+
+# Number of processes returned when no limit is requested, and maximum limit
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 500
+
+PROC_PATH = '/proc'
+
+# Bytes of the command line kept for each process
+CMDLINE_MAX_SIZE = 4096
+
+# Minimum seconds of CPU time accounting behind a CPU usage; a process scanned
+# again sooner keeps its previous value, as clock ticks are too coarse
+MIN_CPU_INTERVAL = 1
+
+# Process attributes a request can sort by
+SORT_KEYS = {
+    'cpu': attrgetter('cpu_percent'),
+    'rss': attrgetter('rss')
+}
+
+# One process in a scan result; CPU usage is in percent of one core
+ProcessSample = namedtuple('ProcessSample', [
+    'pid', 'ppid', 'name', 'user', 'state', 'threads', 'rss', 'cpu_percent', 'cmdline', 'exe'
+])
+
+
+def handle_processes_request(handler):
+    """Handle /api/processes endpoint request
+    
+    Query parameters:
+        sort: 'cpu' or 'rss' (default: cpu)
+        limit: Number of processes returned (default: 20, maximum: 500)
+    
+    Args:
+        handler: The request handler instance
+    """
+    params = parse_qs(urlsplit(handler.path).query)
+    sort = params.get('sort', ['cpu'])[0]
+    if sort not in SORT_KEYS:
+        handler.send_json({'error': f"Invalid 'sort' parameter: {sort}",
+                           'sort': list(SORT_KEYS)}, status=400)
+        return
+    
+    try:
+        limit = int(params.get('limit', [DEFAULT_LIMIT])[0])
+    except ValueError:
+        handler.send_json({'error': f"Invalid 'limit' parameter: {params['limit'][0]}"}, status=400)
+        return
+    if limit <= 0:
+        handler.send_json({'error': "'limit' must be positive"}, status=400)
+        return
+    
+    table = get_top_processes(sort, min(limit, MAX_LIMIT))
+    table['processes'] = list(table['processes'].values())
+    handler.send_json(table)
+
+
+def get_top_processes(sort='cpu', limit=DEFAULT_LIMIT):
+    """Get the process counts and the top processes of the latest scan
+    
+    Args:
+        sort (str, optional): Attribute sorted by, a key of SORT_KEYS
+        limit (int, optional): Number of processes returned
+    
+    Returns:
+        dict: Process, running process and thread counts, and the top processes
+            by pid in decreasing order of the sort attribute
+    """
+    scan = collector_cache.get('processes')
+    result = {key: value for key, value in scan.items() if key != 'processes'}
+    
+    # Heap selection: O(n log limit) instead of sorting the whole table
+    top = heapq.nlargest(limit, scan.get('processes', ()), key=SORT_KEYS[sort])
+    result['processes'] = {str(process.pid): process._asdict() for process in top}
+    return result
+
+
+class ProcessEntry:
+    """Scanner state of one process, kept between scans"""
+    
+    __slots__ = ('start_time', 'cpu_ticks', 'measured_at', 'cpu_percent', 'user', 'cmdline', 'exe')
+    
+    def __init__(self, start_time, user, cmdline, exe):
+        """Initialize the entry of a new process
+        
+        Args:
+            start_time (int): Start time of the process, in clock ticks after boot
+            user (str): Name of the owner
+            cmdline (str): The command line
+            exe (str): Path of the executable, '' if not readable
+        """
+        self.start_time = start_time
+        self.cpu_ticks = 0
+        self.measured_at = None
+        self.cpu_percent = 0.0
+        self.user = user
+        self.cmdline = cmdline
+        self.exe = exe
+
+
+class ProcessScanner:
+    """
+    Incremental scanner of the Linux process table.
+    
+    Each scan reads /proc/[pid]/stat once per process. The command line,
+    executable and owner of a process never change, so they are read only
+    the first time its pid is seen, and kept until it exits; a pid reused by
+    a new process is told apart by its start time. CPU usage is the CPU time
+    used since the last measurement, at least MIN_CPU_INTERVAL seconds ago, or
+    since the process started for processes seen for the first time.
+    """
+    
+    def __init__(self, proc_path=PROC_PATH):
+        """Initialize the scanner
+        
+        Args:
+            proc_path (str, optional): Mount point of the proc filesystem
+        """
+        self.proc_path = proc_path
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+        self.entries = {}
+        self.users = {}
+        self.lock = threading.Lock()
+    
+    def scan(self):
+        """Scan the process table
+        
+        Returns:
+            dict: Scan time, process, running process and thread counts, scan
+                duration, and the list of ProcessSample
+        """
+        with self.lock:
+            started = time.perf_counter()
+            now = time.clock_gettime(time.CLOCK_BOOTTIME)
+            ticks_per_percent = self.clock_ticks / 100
+            
+            entries = {}
+            processes = []
+            running = 0
+            threads = 0
+            for name in os.listdir(self.proc_path):
+                if not name.isdigit():
+                    continue
+                pid = int(name)
+                try:
+                    stat = self._read(f'{self.proc_path}/{name}/stat', 1024)
+                except OSError:
+                    # Exited since the directory was listed
+                    continue
+                
+                # The command name is in parentheses and may itself contain spaces and parentheses
+                name_end = stat.rindex(b')')
+                fields = stat[name_end + 2:].split()
+                start_time = int(fields[19])
+                cpu_ticks = int(fields[11]) + int(fields[12])
+                
+                entry = self.entries.get(pid)
+                if entry is None or entry.start_time != start_time:
+                    entry = self._read_static(pid, start_time)
+                    if entry is None:
+                        continue
+                    lifetime = now - start_time / self.clock_ticks
+                    entry.cpu_percent = round(cpu_ticks / ticks_per_percent / lifetime, 2) if lifetime > 0 else 0.0
+                    entry.cpu_ticks = cpu_ticks
+                    entry.measured_at = now
+                elif now - entry.measured_at >= MIN_CPU_INTERVAL:
+                    entry.cpu_percent = round((cpu_ticks - entry.cpu_ticks) / ticks_per_percent / (now - entry.measured_at), 2)
+                    entry.cpu_ticks = cpu_ticks
+                    entry.measured_at = now
+                entries[pid] = entry
+                
+                state = fields[0].decode()
+                running += state == 'R'
+                thread_count = int(fields[17])
+                threads += thread_count
+                processes.append(ProcessSample(
+                    pid, int(fields[1]), stat[stat.index(b'(') + 1:name_end].decode(errors='replace'),
+                    entry.user, state, thread_count, int(fields[21]) * self.page_size,
+                    entry.cpu_percent, entry.cmdline, entry.exe))
+            
+            # Exited processes are dropped with their cached fields
+            self.entries = entries
+            
+            return {
+                'timestamp': time.time(),
+                'count': len(processes),
+                'running': running,
+                'threads': threads,
+                'scan_ms': round((time.perf_counter() - started) * 1000, 3),
+                'processes': processes
+            }
+    
+    def _read_static(self, pid, start_time):
+        """Read the fields of a new process that stay the same until it exits
+        
+        Returns:
+            ProcessEntry: The new entry, or None if the process exited
+        """
+        path = f'{self.proc_path}/{pid}'
+        try:
+            uid = os.stat(path).st_uid
+            cmdline = self._read(f'{path}/cmdline', CMDLINE_MAX_SIZE)
+        except OSError:
+            return None
+        
+        try:
+            exe = os.readlink(f'{path}/exe')
+        except OSError:
+            # Kernel threads, or processes of other users without privileges
+            exe = ''
+        
+        return ProcessEntry(start_time, self._get_user(uid),
+                            cmdline.rstrip(b'\0').replace(b'\0', b' ').decode(errors='replace'), exe)
+    
+    def _get_user(self, uid):
+        """Get the name of a user, cached"""
+        user = self.users.get(uid)
+        if user is None:
+            try:
+                user = pwd.getpwuid(uid).pw_name if pwd else str(uid)
+            except KeyError:
+                user = str(uid)
+            self.users[uid] = user
+        return user
+    
+    @staticmethod
+    def _read(path, size):
+        """Read the start of a proc file with a single system call"""
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return os.read(fd, size)
+        finally:
+            os.close(fd)
+
+
+def get_process_table():
+    """Scan the process table
+    
+    Returns:
+        dict: The scan result, or an error for systems without a proc filesystem
+    """
+    if process_scanner is None:
+        return {'error': f"Unsupported operating system: {platform.system()}", 'processes': []}
+    
+    return process_scanner.scan()
+
+
+# Global instance, keeping the per-process cache between scans
+process_scanner = ProcessScanner() if platform.system() == 'Linux' else None
+
+collector_cache.register('processes', get_process_table, PROCESS_CACHE_TTL, PROCESS_CACHE_MAX_STALE)
@@ -0,0 +1,81 @@
+"""
+Snapshot API endpoint
+Provides several metric sections in a single response
+"""
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from api.collector_cache import collector_cache
+from api.processes import get_top_processes
+
+logger = logging.getLogger('Snapshot')
+
+# Number of processes in the processes section, by CPU usage
+SNAPSHOT_PROCESS_LIMIT = 10
+
+# Functions collecting each section, by field name
+SNAPSHOT_SECTIONS = {
+    'system': lambda: collector_cache.get('system'),
+    'disk': lambda: {disk['mountpoint']: disk for disk in collector_cache.get('disk')},
+    'disk_io': lambda: {device['device']: device for device in collector_cache.get('disk_io')['devices']},
+    'memory': lambda: collector_cache.get('memory'),
+    'cpu': lambda: collector_cache.get('cpu'),
+    'network': lambda: {interface['interface']: interface for interface in collector_cache.get('network')['interfaces']},
+    'processes': lambda: get_top_processes('cpu', SNAPSHOT_PROCESS_LIMIT)
+}
+
+# Shared pool collecting the sections of a snapshot concurrently
+_executor = ThreadPoolExecutor(max_workers=len(SNAPSHOT_SECTIONS), thread_name_prefix='Snapshot')
+
+
+def handle_snapshot_request(handler):
+    """Handle /api/snapshot endpoint request
+    
+    Query parameters:
+        fields: Comma separated sections to return (default: all sections)
+    
+    Args:
+        handler: The request handler instance
+    """
+    params = parse_qs(urlsplit(handler.path).query)
+    fields = [field for value in params.get('fields', []) for field in value.split(',') if field]
+    
+    unknown = [field for field in fields if field not in SNAPSHOT_SECTIONS]
+    if unknown:
+        handler.send_json({'error': f"Unknown fields: {', '.join(unknown)}",
+                           'fields': list(SNAPSHOT_SECTIONS)}, status=400)
+        return
+    
+    handler.send_json(collect_snapshot(fields or SNAPSHOT_SECTIONS))
+
+
+def collect_snapshot(fields):
+    """Collect metric sections concurrently
+    
+    Sections are usually served from the collector cache; when some need a
+    fresh collection, the slowest one sets the response time instead of the sum.
+    A section that fails is returned as {'error': message}, the others as usual.
+    
+    Args:
+        fields (iterable): Names of the sections to collect
+    
+    Returns:
+        dict: The collected sections, by field name
+    """
+    fields = list(dict.fromkeys(fields))
+    if len(fields) == 1:
+        return {fields[0]: _collect_section(fields[0])}
+    
+    futures = {field: _executor.submit(_collect_section, field) for field in fields}
+    return {field: future.result() for field, future in futures.items()}
+
+
+def _collect_section(field):
+    """Collect one section, or an error object if it fails"""
+    try:
+        return SNAPSHOT_SECTIONS[field]()
+    except Exception as e:
+        logger.error(f"Error collecting {field} for the snapshot: {e}")
+        return {'error': str(e)}
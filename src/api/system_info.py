@@ -4,7 +4,11 @@ Provides basic OS and platform information
 """
 import os
 import platform
-import json
+
+from api.collector_cache import collector_cache
+
+# System information only changes across reboots and upgrades
+SYSTEM_INFO_CACHE_TTL = 3600
 
 
 def handle_system_info_request(handler):
@@ -13,11 +17,18 @@ def handle_system_info_request(handler):
     Args:
         handler: The request handler instance
     """
-    handler.send_response(200)
-    handler.send_header('Content-type', 'application/json')
-    handler.end_headers()
+    info = collector_cache.get('system')
+    
+    handler.send_json(info)
+
+
+def get_system_info():
+    """Get operating system and platform information
     
-    info = {
+    Returns:
+        dict: System information
+    """
+    return {
         'os': {
             'name': os.name
         },
@@ -30,5 +41,6 @@ def handle_system_info_request(handler):
             'python': f'v{platform.python_version()}'
         },
     }
-    
-    handler.wfile.write(json.dumps(info).encode('utf-8'))
+
+
+collector_cache.register('system', get_system_info, SYSTEM_INFO_CACHE_TTL)
@@ -0,0 +1,224 @@
+"""
+Batch writer module for PS Monitor application.
+Buffers rows in memory and writes them to the database in batches.
+"""
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger('BatchWriter')
+
+# Queue marker asking the writer thread to stop
+_STOP = object()
+
+
+class BatchWriter:
+    """
+    Writer that groups rows into batched transactions.
+    
+    Rows submitted by collectors are queued in memory and written by a dedicated
+    thread. A batch is committed when it reaches max_batch_size rows or when its
+    oldest row has waited max_delay seconds, so many small samples cost a single
+    transaction and a single fsync.
+    """
+    
+    def __init__(self, name, write_batch, max_batch_size=500, max_delay=5.0, max_queue_size=100000):
+        """Initialize the batch writer
+        
+        Args:
+            name (str): Name of the writer, used in logs and statistics
+            write_batch (callable): Function writing a list of rows in one transaction
+            max_batch_size (int, optional): Maximum number of rows per batch
+            max_delay (float, optional): Maximum seconds a row waits before being written
+            max_queue_size (int, optional): Maximum number of rows waiting to be written
+        """
+        self.name = name
+        self.write_batch = write_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.writer_thread = None
+        self.lock = threading.Lock()
+        
+        # Statistics
+        self.batches = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes_dropped = 0
+        self.errors = 0
+        self.last_batch_size = 0
+        self.max_batch_seen = 0
+        self.last_commit_ms = 0.0
+        self.max_commit_ms = 0.0
+        self.total_commit_ms = 0.0
+    
+    def start(self):
+        """Start the writer thread"""
+        if self.writer_thread and self.writer_thread.is_alive():
+            return
+        
+        self.writer_thread = threading.Thread(target=self._run, name=f'{self.name}-writer', daemon=True)
+        self.writer_thread.start()
+    
+    def submit(self, rows):
+        """Queue rows to be written
+        
+        Rows that do not fit in the queue are dropped and counted, so a slow
+        disk never blocks the collectors.
+        
+        Args:
+            rows (list): The rows to write
+        
+        Returns:
+            int: Number of rows queued
+        """
+        queued = 0
+        for row in rows:
+            try:
+                self.queue.put_nowait(row)
+                queued += 1
+            except queue.Full:
+                with self.lock:
+                    self.rows_dropped += len(rows) - queued
+                logger.warning(f"Write queue of {self.name} is full, dropped {len(rows) - queued} rows")
+                break
+        return queued
+    
+    def flush(self, timeout=None):
+        """Wait until the rows queued so far are written
+        
+        Like rows, a flush request that does not fit in the queue is dropped
+        and counted instead of blocking the caller.
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+        
+        Returns:
+            bool: True if the rows were written before the timeout
+        """
+        if not self.writer_thread or not self.writer_thread.is_alive():
+            return False
+        
+        flushed = threading.Event()
+        try:
+            self.queue.put_nowait(flushed)
+        except queue.Full:
+            with self.lock:
+                self.flushes_dropped += 1
+            logger.warning(f"Write queue of {self.name} is full, dropped a flush request")
+            return False
+        return flushed.wait(timeout)
+    
+    def stop(self, timeout=10):
+        """Write the queued rows and stop the writer thread
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait for pending rows
+        """
+        if not self.writer_thread or not self.writer_thread.is_alive():
+            return
+        
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning(f"Write queue of {self.name} stayed full for {timeout} seconds, not stopping the writer")
+            return
+        self.writer_thread.join(timeout)
+        if self.writer_thread.is_alive():
+            logger.warning(f"Writer {self.name} did not finish within {timeout} seconds")
+    
+    def get_stats(self):
+        """Get the writer statistics
+        
+        Returns:
+            dict: Queue, batch size and commit latency statistics
+        """
+        with self.lock:
+            return {
+                'queued': self.queue.qsize(),
+                'batches': self.batches,
+                'rows_written': self.rows_written,
+                'rows_dropped': self.rows_dropped,
+                'flushes_dropped': self.flushes_dropped,
+                'errors': self.errors,
+                'last_batch_size': self.last_batch_size,
+                'max_batch_size': self.max_batch_seen,
+                'avg_batch_size': round(self.rows_written / self.batches, 2) if self.batches else 0,
+                'last_commit_ms': round(self.last_commit_ms, 3),
+                'max_commit_ms': round(self.max_commit_ms, 3),
+                'avg_commit_ms': round(self.total_commit_ms / self.batches, 3) if self.batches else 0
+            }
+    
+    def _run(self):
+        """Writer thread collecting rows into batches"""
+        while True:
+            item = self.queue.get()
+            batch = []
+            waiters = []
+            stop = False
+            deadline = time.monotonic() + self.max_delay
+            
+            # Collect rows until the batch is full, the delay expires, or a flush/stop arrives
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                
+                batch.append(item)
+                if len(batch) >= self.max_batch_size:
+                    break
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            
+            if batch:
+                self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+            
+            if stop:
+                # Write anything submitted after the stop request
+                remaining_rows = []
+                while True:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        item.set()
+                    elif item is not _STOP:
+                        remaining_rows.append(item)
+                if remaining_rows:
+                    self._write(remaining_rows)
+                return
+    
+    def _write(self, batch):
+        """Write a batch and record its statistics"""
+        start = time.perf_counter()
+        try:
+            self.write_batch(batch)
+        except Exception as e:
+            with self.lock:
+                self.errors += 1
+            logger.error(f"Error writing {len(batch)} {self.name} rows: {e}")
+            return
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.batches += 1
+            self.rows_written += len(batch)
+            self.last_batch_size = len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.last_commit_ms = elapsed_ms
+            self.max_commit_ms = max(self.max_commit_ms, elapsed_ms)
+            self.total_commit_ms += elapsed_ms
+        logger.info(f"Saved {len(batch)} {self.name} records in {elapsed_ms:.1f}ms")
@@ -5,27 +5,157 @@ Provides database connectivity and configuration.
 import logging
 import os
 import sqlite3
+import threading
+import time
+
+from data.db import migrations
+from monitor.instrumentation import instrumentation
 
 logger = logging.getLogger('Database')
 
+# Statement kinds timed separately; other statements are timed as 'other'
+STATEMENT_KINDS = frozenset(['select', 'insert', 'update', 'delete', 'pragma', 'with'])
+
+# Statement kinds whose row count is added to the rows written
+WRITE_STATEMENTS = frozenset(['insert', 'update', 'delete'])
+
+# Statement kinds by SQL text; statements are built once, so this stays small
+_statement_kinds = {}
+
+
+def get_statement_kind(sql):
+    """Get the kind of a statement, its first keyword in lower case"""
+    kind = _statement_kinds.get(sql)
+    if kind is None:
+        keyword = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else ''
+        kind = keyword if keyword in STATEMENT_KINDS else 'other'
+        if len(_statement_kinds) < 1024:
+            _statement_kinds[sql] = kind
+    return kind
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor recording the latency of its statements by kind, the rows they
+    write and the database errors.
+    
+    Only the execution is timed: for queries, that is the work up to the
+    first row, which includes any sorting or grouping; the remaining rows
+    are stepped through while fetching.
+    """
+    
+    def execute(self, sql, parameters=()):
+        """Execute a statement, recording its latency"""
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        except sqlite3.Error:
+            instrumentation.increment('database', 'errors')
+            raise
+        finally:
+            self._record(sql, started)
+    
+    def executemany(self, sql, seq_of_parameters):
+        """Execute a statement for each set of parameters, recording the total latency"""
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        except sqlite3.Error:
+            instrumentation.increment('database', 'errors')
+            raise
+        finally:
+            self._record(sql, started)
+    
+    def _record(self, sql, started):
+        """Record an execution in the histogram of its kind"""
+        kind = get_statement_kind(sql)
+        instrumentation.observe('database', kind, time.perf_counter() - started)
+        if kind in WRITE_STATEMENTS and self.rowcount > 0:
+            instrumentation.increment('database', 'rows_written', self.rowcount)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose statements all run through an InstrumentedCursor"""
+    
+    def cursor(self, factory=InstrumentedCursor):
+        """Create a cursor, instrumented by default"""
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        """Execute a statement on a new instrumented cursor"""
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        """Execute a statement for each set of parameters on a new instrumented cursor"""
+        return self.cursor().executemany(sql, seq_of_parameters)
+
 class Database:
-    """Database connector class for PS Monitor application"""
+    """
+    Database connector class for PS Monitor application
+    
+    Each thread keeps one long-lived connection, opened on first use. Connections
+    use WAL journaling so the monitor writer and the readers do not block each other.
+    """
     
     # SQLite database file path
     DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db', 'ps_monitor.db')
     
+    # Seconds to wait for a lock held by another connection
+    BUSY_TIMEOUT = 5
+    
+    # Page cache size per connection in KiB
+    CACHE_SIZE_KB = 8192
+    
+    # Bytes of the database file mapped in memory for reads
+    MMAP_SIZE = 64 * 1024 * 1024
+    
+    # Number of prepared statements kept per connection
+    STATEMENT_CACHE_SIZE = 128
+    
+    _local = threading.local()
+    _lock = threading.Lock()
+    _connections = {}
+    _directory_ready = False
+    _opened = 0
+    _closed = 0
+    
     @classmethod
     def ensure_db_directory(cls):
         """Ensure the database directory exists"""
-        db_dir = os.path.dirname(cls.DB_PATH)
-        os.makedirs(db_dir, exist_ok=True)
-        
-        # Set secure permissions for the directory
-        os.chmod(db_dir, 0o700)  # Only owner can read, write, execute
+        with cls._lock:
+            if cls._directory_ready:
+                return
+            
+            db_dir = os.path.dirname(cls.DB_PATH)
+            os.makedirs(db_dir, exist_ok=True)
+            
+            # Set secure permissions for the directory
+            os.chmod(db_dir, 0o700)  # Only owner can read, write, execute
+            cls._directory_ready = True
     
     @classmethod
     def get_connection(cls):
-        """Get a connection to the SQLite database
+        """Get the connection of the current thread to the SQLite database
+        
+        The connection is shared by all calls from the same thread and must not
+        be closed by the caller.
+        
+        Returns:
+            sqlite3.Connection: The database connection
+        """
+        conn = getattr(cls._local, 'connection', None)
+        if conn is None:
+            conn = cls._open_connection()
+            cls._local.connection = conn
+            with cls._lock:
+                cls._close_dead_thread_connections()
+                cls._connections[threading.current_thread()] = conn
+                cls._opened += 1
+        return conn
+    
+    @classmethod
+    def _open_connection(cls):
+        """Open and configure a new connection
         
         Returns:
             sqlite3.Connection: The database connection
@@ -33,8 +163,16 @@ class Database:
         # Ensure the database directory exists with secure permissions
         cls.ensure_db_directory()
         
-        # Connect to the database
-        conn = sqlite3.connect(cls.DB_PATH)
+        # Connect to the database; closing from another thread is allowed for shutdown
+        conn = sqlite3.connect(cls.DB_PATH, timeout=cls.BUSY_TIMEOUT, check_same_thread=False,
+                               cached_statements=cls.STATEMENT_CACHE_SIZE, factory=InstrumentedConnection)
+        
+        # Readers and the writer do not block each other in WAL mode
+        conn.execute("PRAGMA journal_mode = WAL")
+        # Durable across application crashes, fsync only at checkpoints
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{cls.CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {cls.MMAP_SIZE}")
         
         # Enable foreign keys
         conn.execute("PRAGMA foreign_keys = ON")
@@ -44,6 +182,57 @@ class Database:
         
         return conn
     
+    @classmethod
+    def _close_dead_thread_connections(cls):
+        """Close connections owned by threads that have exited; the caller holds the lock"""
+        for thread in [thread for thread in cls._connections if not thread.is_alive()]:
+            cls._connections.pop(thread).close()
+            cls._closed += 1
+    
+    @classmethod
+    def close_connection(cls):
+        """Close the connection of the current thread, if any"""
+        conn = getattr(cls._local, 'connection', None)
+        if conn is not None:
+            cls._local.connection = None
+            with cls._lock:
+                if cls._connections.pop(threading.current_thread(), None) is not None:
+                    cls._closed += 1
+            conn.close()
+    
+    @classmethod
+    def close_all(cls):
+        """Close the connections of all threads"""
+        with cls._lock:
+            connections = list(cls._connections.values())
+            cls._connections.clear()
+            cls._closed += len(connections)
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error closing database connection: {e}")
+    
+    @classmethod
+    def get_stats(cls):
+        """Get the connection and statement statistics
+        
+        Returns:
+            dict: Open, opened and closed connection counts, the latency of the
+                statements by kind, and the rows written and errors counters
+        """
+        with cls._lock:
+            stats = {
+                'connections': len(cls._connections),
+                'connections_opened': cls._opened,
+                'connections_closed': cls._closed
+            }
+        statements = instrumentation.get_stats('database')
+        stats['statements'] = statements['latency']
+        stats['rows_written'] = statements['counters'].get('rows_written', 0)
+        stats['errors'] = statements['counters'].get('errors', 0)
+        return stats
+    
     @staticmethod
     def dict_factory(cursor, row):
         """Convert row object to dictionary
@@ -51,40 +240,18 @@ class Database:
         Args:
             cursor: The database cursor
             row: The row data
-            
+        
         Returns:
             dict: Row data as dictionary
         """
-        d = {}
-        for idx, col in enumerate(cursor.description):
-            d[col[0]] = row[idx]
-        return d
+        return dict(zip([col[0] for col in cursor.description], row))
     
     @classmethod
     def initialize_schema(cls):
-        """Initialize the database schema if not already created"""
+        """Initialize the database schema, upgrading existing databases to the latest version"""
         conn = cls.get_connection()
         try:
-            cursor = conn.cursor()
-            
-            # Create tables if they don't exist
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS disk_usage (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                device TEXT NOT NULL,
-                mountpoint TEXT NOT NULL,
-                total BIGINT NOT NULL,
-                used BIGINT NOT NULL,
-                free BIGINT NOT NULL,
-                percent_used REAL NOT NULL,
-                percent_free REAL NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            
-            conn.commit()
-            logger.info("Database schema initialized successfully")
+            version = migrations.migrate(conn)
+            logger.info(f"Database schema initialized successfully (version {version})")
         except Exception as e:
             logger.error(f"Error initializing database schema: {e}")
-        finally:
-            conn.close()
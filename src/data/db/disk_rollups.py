@@ -0,0 +1,125 @@
+"""
+Downsampling tiers for disk usage history.
+Defines the rollup tables, their resolution and retention, and how history
+queries pick the cheapest tier for a requested resolution.
+"""
+from collections import namedtuple
+
+RollupTier = namedtuple('RollupTier', ['name', 'table', 'resolution', 'retention_days'])
+
+# Raw samples, as collected by the monitor
+RAW_TIER = RollupTier('raw', 'disk_samples', 0, 30)
+
+# Aggregated tiers keeping min/max/avg/last per bucket, from finest to coarsest
+ROLLUP_TIERS = [
+    RollupTier('1m', 'disk_rollup_1m', 60, 30),
+    RollupTier('1h', 'disk_rollup_1h', 3600, 90),
+    RollupTier('1d', 'disk_rollup_1d', 86400, 1825),
+]
+
+ALL_TIERS = [RAW_TIER] + ROLLUP_TIERS
+
+# Tiers by name, as encoded in history cursors
+TIERS_BY_NAME = {tier.name: tier for tier in ALL_TIERS}
+
+# Columns shared by every tier source, in query order
+SOURCE_COLUMNS = ('mount_id, ts, samples, min_used, max_used, sum_used, last_used, '
+                  'min_percent, max_percent, sum_percent, last_percent, last_ts, total, free')
+
+# Raw samples presented with the same columns as the rollup tables
+RAW_SOURCE = f'''
+SELECT mount_id, ts, 1 AS samples, used AS min_used, used AS max_used, used AS sum_used, used AS last_used,
+       percent_used AS min_percent, percent_used AS max_percent, percent_used AS sum_percent,
+       percent_used AS last_percent, ts AS last_ts, total, free
+FROM {RAW_TIER.table}
+'''
+
+
+def get_tier_source(tier):
+    """Get the SQL source of a tier with the common rollup columns
+    
+    Args:
+        tier (RollupTier): The tier
+    
+    Returns:
+        str: A table name or a parenthesized subquery
+    """
+    if tier is RAW_TIER:
+        return f'({RAW_SOURCE})'
+    return tier.table
+
+
+def get_upsert_sql(tier):
+    """Get the statement merging one raw sample into a rollup bucket
+    
+    Parameters, in order: mount_id, bucket ts, used, percent_used, sample ts,
+    total and free.
+    
+    Args:
+        tier (RollupTier): The rollup tier
+    
+    Returns:
+        str: The upsert statement
+    """
+    return f'''
+    INSERT INTO {tier.table} ({SOURCE_COLUMNS})
+    VALUES (?1, ?2, 1, ?3, ?3, ?3, ?3, ?4, ?4, ?4, ?4, ?5, ?6, ?7)
+    ON CONFLICT (mount_id, ts) DO UPDATE SET
+        samples = samples + 1,
+        min_used = MIN(min_used, excluded.min_used),
+        max_used = MAX(max_used, excluded.max_used),
+        sum_used = sum_used + excluded.sum_used,
+        min_percent = MIN(min_percent, excluded.min_percent),
+        max_percent = MAX(max_percent, excluded.max_percent),
+        sum_percent = sum_percent + excluded.sum_percent,
+        last_used = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last_used ELSE last_used END,
+        last_percent = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last_percent ELSE last_percent END,
+        total = CASE WHEN excluded.last_ts >= last_ts THEN excluded.total ELSE total END,
+        free = CASE WHEN excluded.last_ts >= last_ts THEN excluded.free ELSE free END,
+        last_ts = MAX(last_ts, excluded.last_ts)
+    '''
+
+
+def select_tier(resolution, start, now):
+    """Pick the cheapest tier for a history query
+    
+    The coarsest tier whose resolution divides the requested one and whose
+    retention still covers the start of the range is preferred, so its rows
+    fall in whole buckets. When no tier is fine enough, the finest tier
+    covering the range is used, and the resolution must be aligned on it
+    with align_resolution.
+    
+    Args:
+        resolution (int): Requested seconds between two points, 0 for raw samples
+        start (int): Start of the range as Unix epoch seconds, or None
+        now (int): Current time as Unix epoch seconds
+    
+    Returns:
+        RollupTier: The selected tier
+    """
+    covering = [tier for tier in ALL_TIERS
+                if start is None or start >= now - tier.retention_days * 86400]
+    if not covering:
+        # Range starts before any retention, use the tier keeping data the longest
+        return max(ALL_TIERS, key=lambda tier: tier.retention_days)
+    
+    eligible = [tier for tier in covering
+                if tier.resolution == 0 or resolution >= tier.resolution and resolution % tier.resolution == 0]
+    if eligible:
+        return max(eligible, key=lambda tier: tier.resolution)
+    return min(covering, key=lambda tier: tier.resolution)
+
+
+def align_resolution(resolution, tier):
+    """Round a resolution up to a multiple of the resolution of a tier
+    
+    Args:
+        resolution (int): Requested seconds between two points
+        tier (RollupTier): The tier the points are computed from
+    
+    Returns:
+        int: The resolution, a multiple of the tier resolution
+    """
+    if not tier.resolution:
+        return resolution
+    return -(-resolution // tier.resolution) * tier.resolution
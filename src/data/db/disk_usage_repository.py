@@ -2,49 +2,150 @@
 Repository for disk usage data.
 Handles database operations for disk usage information.
 """
+import threading
+import time
+
+from data.db.batch_writer import BatchWriter
 from data.db.database import Database
+from data.db.disk_rollups import (RAW_TIER, ROLLUP_TIERS, align_resolution, get_tier_source, get_upsert_sql,
+                                  select_tier)
+from monitor.instrumentation import timed
+
+# Rollup upsert statements by tier, built once so the prepared statements are reused
+ROLLUP_UPSERTS = [(tier, get_upsert_sql(tier)) for tier in ROLLUP_TIERS]
+
+# Columns of the aggregated history rows, in order
+HISTORY_COLUMNS = ['timestamp', 'samples', 'min_used', 'max_used', 'avg_used', 'last_used',
+                   'min_percent', 'max_percent', 'avg_percent', 'last_percent', 'total', 'free']
 
 
 class DiskUsageRepository:
     """Repository for disk usage data"""
     
+    # Mount ids by mountpoint, with the device last stored for each mount
+    _mount_ids = {}
+    _mount_devices = {}
+    _mount_lock = threading.Lock()
+    
     @classmethod
+    @timed('repository', 'disk_usage.save_disk_usage')
     def save_disk_usage(cls, disk_data):
-        """Save disk usage data to the database
+        """Save disk usage data to the database in a single transaction
         
         Args:
-            disk_data (list): List of disk usage information dictionaries
+            disk_data (list): List of disk usage information dictionaries, each with an
+                optional 'timestamp' (Unix epoch seconds) of when it was collected
+        
+        Samples already stored for the same mount and timestamp, such as a
+        replayed batch, are ignored so they are not counted twice in the rollups.
         
         Returns:
             int: Number of records inserted
         """
+        now = cls.current_timestamp()
         conn = Database.get_connection()
-        try:
-            cursor = conn.cursor()
-            records_inserted = 0
+        with conn:
+            mount_ids, stored_mounts = cls._resolve_mount_ids(conn, disk_data)
+            rows = [(
+                mount_ids[disk['mountpoint']],
+                disk.get('timestamp', now),
+                disk['total'],
+                disk['used'],
+                disk['free'],
+                disk['percent_used']
+            ) for disk in disk_data]
             
-            for disk in disk_data:
-                cursor.execute('''
-                INSERT INTO disk_usage 
-                (device, mountpoint, total, used, free, percent_used, percent_free)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    disk['device'],
-                    disk['mountpoint'],
-                    disk['total'],
-                    disk['used'],
-                    disk['free'],
-                    disk['percent_used'],
-                    disk['percent_free']
-                ))
-                records_inserted += 1
+            # One statement per row, to merge only the samples actually inserted into the rollups
+            insert = '''
+            INSERT INTO disk_samples (mount_id, ts, total, used, free, percent_used)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (mount_id, ts) DO NOTHING
+            '''
+            rows = [row for row in rows if conn.execute(insert, row).rowcount]
             
-            conn.commit()
-            return records_inserted
-        finally:
-            conn.close()
+            # Keep the latest sample of each mount, ignoring samples older than the stored one
+            conn.executemany('''
+            INSERT INTO disk_latest (mount_id, ts, total, used, free, percent_used)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (mount_id) DO UPDATE SET
+                ts = excluded.ts,
+                total = excluded.total,
+                used = excluded.used,
+                free = excluded.free,
+                percent_used = excluded.percent_used
+            WHERE excluded.ts >= disk_latest.ts
+            ''', rows)
+            
+            # Merge the samples into the bucket of each rollup tier
+            for tier, upsert in ROLLUP_UPSERTS:
+                resolution = tier.resolution
+                conn.executemany(upsert, [
+                    (mount_id, ts - ts % resolution, used, percent_used, ts, total, free)
+                    for mount_id, ts, total, used, free, percent_used in rows
+                ])
+        
+        # Only committed ids are cached: the id of a rolled back mount is given to the next new one
+        cls._cache_mount_ids(stored_mounts)
+        return len(rows)
     
     @classmethod
+    def _resolve_mount_ids(cls, conn, disk_data):
+        """Get the mount ids for disk usage data, creating or updating mounts as needed
+        
+        Args:
+            conn (sqlite3.Connection): The connection of the current transaction
+            disk_data (list): List of disk usage information dictionaries
+        
+        Returns:
+            tuple: Mount ids by mountpoint, and the (mount id, device) of the
+                mounts created or updated in the transaction, by mountpoint
+        """
+        mount_ids = {}
+        stored_mounts = {}
+        with cls._mount_lock:
+            for disk in disk_data:
+                mountpoint = disk['mountpoint']
+                if mountpoint in mount_ids:
+                    continue
+                
+                mount_id = cls._mount_ids.get(mountpoint)
+                if mount_id is not None and cls._mount_devices.get(mount_id) == disk['device']:
+                    mount_ids[mountpoint] = mount_id
+                    continue
+                
+                conn.execute('''
+                INSERT INTO mounts (mountpoint, device) VALUES (?, ?)
+                ON CONFLICT (mountpoint) DO UPDATE SET device = excluded.device
+                ''', (mountpoint, disk['device']))
+                mount_id = conn.execute('SELECT id FROM mounts WHERE mountpoint = ?', (mountpoint,)).fetchone()['id']
+                
+                stored_mounts[mountpoint] = (mount_id, disk['device'])
+                mount_ids[mountpoint] = mount_id
+        return mount_ids, stored_mounts
+    
+    @classmethod
+    def _cache_mount_ids(cls, stored_mounts):
+        """Cache the mounts created or updated by a committed transaction
+        
+        Args:
+            stored_mounts (dict): The (mount id, device) of the mounts, by mountpoint
+        """
+        with cls._mount_lock:
+            for mountpoint, (mount_id, device) in stored_mounts.items():
+                cls._mount_ids[mountpoint] = mount_id
+                cls._mount_devices[mount_id] = device
+    
+    @staticmethod
+    def current_timestamp():
+        """Get the current time in the format stored in the ts columns
+        
+        Returns:
+            int: Current time as Unix epoch seconds
+        """
+        return int(time.time())
+    
+    @classmethod
+    @timed('repository', 'disk_usage.get_latest_disk_usage')
     def get_latest_disk_usage(cls):
         """Get the latest disk usage data for each mountpoint
         
@@ -52,26 +153,20 @@ class DiskUsageRepository:
             list: Latest disk usage data for each mountpoint
         """
         conn = Database.get_connection()
-        try:
-            cursor = conn.cursor()
-            
-            # Using a subquery to get the latest timestamp for each mountpoint
-            cursor.execute('''
-            SELECT d.*
-            FROM disk_usage d
-            INNER JOIN (
-                SELECT mountpoint, MAX(timestamp) as latest_timestamp
-                FROM disk_usage
-                GROUP BY mountpoint
-            ) latest ON d.mountpoint = latest.mountpoint AND d.timestamp = latest.latest_timestamp
-            ORDER BY d.percent_used DESC
-            ''')
-            
-            return cursor.fetchall()
-        finally:
-            conn.close()
+        
+        # One row per mount, kept up to date on every save
+        cursor = conn.execute('''
+        SELECT m.device, m.mountpoint, l.total, l.used, l.free, l.percent_used,
+               ROUND(100 - l.percent_used, 2) AS percent_free, l.ts AS timestamp
+        FROM disk_latest l
+        INNER JOIN mounts m ON m.id = l.mount_id
+        ORDER BY l.percent_used DESC
+        ''')
+        
+        return cursor.fetchall()
     
     @classmethod
+    @timed('repository', 'disk_usage.get_disk_usage_history')
     def get_disk_usage_history(cls, mountpoint, limit=100):
         """Get historical disk usage data for a specific mountpoint
         
@@ -83,42 +178,142 @@ class DiskUsageRepository:
             list: Historical disk usage data
         """
         conn = Database.get_connection()
-        try:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            SELECT *
-            FROM disk_usage
-            WHERE mountpoint = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-            ''', (mountpoint, limit))
-            
-            return cursor.fetchall()
-        finally:
-            conn.close()
-            
+        
+        cursor = conn.execute('''
+        SELECT m.device, m.mountpoint, s.total, s.used, s.free, s.percent_used,
+               ROUND(100 - s.percent_used, 2) AS percent_free, s.ts AS timestamp
+        FROM mounts m
+        INNER JOIN disk_samples s ON s.mount_id = m.id
+        WHERE m.mountpoint = ?
+        ORDER BY s.ts DESC
+        LIMIT ?
+        ''', (mountpoint, limit))
+        
+        return cursor.fetchall()
+    
     @classmethod
-    def delete_old_records(cls, days_to_keep=30):
-        """Delete disk usage records older than the specified number of days
+    def get_mount_id(cls, mountpoint):
+        """Get the id of a mount
         
         Args:
-            days_to_keep (int, optional): Number of days of data to keep
-            
+            mountpoint (str): The mountpoint
+        
+        Returns:
+            int: The mount id, or None if the mountpoint was never stored
+        """
+        mount_id = cls._mount_ids.get(mountpoint)
+        if mount_id is not None:
+            return mount_id
+        
+        conn = Database.get_connection()
+        row = conn.execute('SELECT id FROM mounts WHERE mountpoint = ?', (mountpoint,)).fetchone()
+        return row['id'] if row else None
+    
+    @classmethod
+    @timed('repository', 'disk_usage.query_disk_usage_history')
+    def query_disk_usage_history(cls, mount_id, start, end, step, limit, tier=None):
+        """Get disk usage history for a time range, aggregated in buckets of step seconds
+        
+        Buckets are aligned on multiples of step and computed by SQLite from the
+        cheapest tier matching the step; a step that is not a multiple of the
+        tier resolution is rounded up to one. Pages are requested by passing the
+        returned next start as the start, and the returned tier, to the
+        following call, so all pages have the same resolution.
+        
+        Args:
+            mount_id (int): The mount id
+            start (int): Start of the range (inclusive) as Unix epoch seconds
+            end (int): End of the range (exclusive) as Unix epoch seconds
+            step (int): Seconds per bucket
+            limit (int): Maximum number of buckets to return
+            tier (RollupTier, optional): The tier of the previous pages (default:
+                selected from the step and the start of the range)
+        
+        Returns:
+            dict: The selected tier name and resolution, the step of the buckets,
+                the column names, the rows (as tuples) in time order, and the
+                start of the next page or None
+        """
+        if tier is None:
+            tier = select_tier(step, start, cls.current_timestamp())
+        step = align_resolution(step, tier)
+        conn = Database.get_connection()
+        
+        cursor = conn.cursor()
+        # Plain tuples, no per-row dictionary
+        cursor.row_factory = None
+        cursor.execute(f'''
+        SELECT bucket, SUM(samples),
+               MIN(min_used), MAX(max_used), SUM(sum_used) / SUM(samples), bucket_last_used,
+               MIN(min_percent), MAX(max_percent), ROUND(SUM(sum_percent) / SUM(samples), 2), bucket_last_percent,
+               bucket_total, bucket_free
+        FROM (
+            SELECT s.*, s.ts - s.ts % :step AS bucket,
+                   LAST_VALUE(s.last_used) OVER bucket_window AS bucket_last_used,
+                   LAST_VALUE(s.last_percent) OVER bucket_window AS bucket_last_percent,
+                   LAST_VALUE(s.total) OVER bucket_window AS bucket_total,
+                   LAST_VALUE(s.free) OVER bucket_window AS bucket_free
+            FROM {get_tier_source(tier)} s
+            WHERE s.mount_id = :mount_id AND s.ts >= :start AND s.ts < :end
+            WINDOW bucket_window AS (
+                PARTITION BY s.ts - s.ts % :step ORDER BY s.last_ts
+                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+            )
+        )
+        GROUP BY bucket
+        ORDER BY bucket
+        LIMIT :limit
+        ''', {'mount_id': mount_id, 'start': start, 'end': end, 'step': step, 'limit': limit + 1})
+        
+        rows = cursor.fetchmany(limit + 1)
+        next_start = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_start = rows[-1][0] + step
+        
+        return {
+            'tier': tier.name,
+            'resolution': tier.resolution,
+            'step': step,
+            'columns': HISTORY_COLUMNS,
+            'rows': rows,
+            'next_start': next_start
+        }
+    
+    @classmethod
+    @timed('repository', 'disk_usage.delete_old_records')
+    def delete_old_records(cls, days_to_keep=RAW_TIER.retention_days):
+        """Delete disk usage records older than the retention of their tier
+        
+        Args:
+            days_to_keep (int, optional): Number of days of raw samples to keep; each
+                rollup tier keeps its own retention
+        
         Returns:
             int: Number of records deleted
         """
+        now = cls.current_timestamp()
+        cutoff = now - days_to_keep * 86400
         conn = Database.get_connection()
-        try:
-            cursor = conn.cursor()
+        with conn:
+            # Range delete on the (mount_id, ts) primary key of each mount
+            cursor = conn.execute('''
+            DELETE FROM disk_samples
+            WHERE mount_id IN (SELECT id FROM mounts) AND ts < ?
+            ''', (cutoff,))
+            deleted_count = cursor.rowcount
             
-            cursor.execute('''
-            DELETE FROM disk_usage
-            WHERE timestamp < datetime('now', ? || ' days')
-            ''', (f'-{days_to_keep}',))
+            conn.execute('DELETE FROM disk_latest WHERE ts < ?', (cutoff,))
             
-            deleted_count = cursor.rowcount
-            conn.commit()
-            return deleted_count
-        finally:
-            conn.close()
+            for tier in ROLLUP_TIERS:
+                cursor = conn.execute(f'''
+                DELETE FROM {tier.table}
+                WHERE mount_id IN (SELECT id FROM mounts) AND ts < ?
+                ''', (now - tier.retention_days * 86400,))
+                deleted_count += cursor.rowcount
+        
+        return deleted_count
+
+
+# Shared writer batching the disk usage samples of the monitor
+disk_usage_writer = BatchWriter('disk_usage', DiskUsageRepository.save_disk_usage)
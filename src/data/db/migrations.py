@@ -0,0 +1,280 @@
+"""
+Schema migrations for PS Monitor application.
+Upgrades existing database files in place, one version at a time.
+"""
+import logging
+import os
+import time
+
+from collections import namedtuple
+
+logger = logging.getLogger('Migrations')
+
+# A schema migration; non transactional ones manage their own transactions
+Migration = namedtuple('Migration', ['version', 'description', 'function', 'transactional'])
+
+# Largest database, in megabytes, rebuilt at startup to enable incremental
+# auto vacuum; VACUUM rewrites the whole file and startup waits for it
+VACUUM_MAX_MB = int(os.environ.get('PS_MONITOR_VACUUM_MAX_MB', 64))
+
+# Schema version from which the database should use incremental auto vacuum
+INCREMENTAL_VACUUM_VERSION = 5
+
+
+def create_disk_usage_table(conn):
+    """Version 1: original disk usage table"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS disk_usage (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        device TEXT NOT NULL,
+        mountpoint TEXT NOT NULL,
+        total BIGINT NOT NULL,
+        used BIGINT NOT NULL,
+        free BIGINT NOT NULL,
+        percent_used REAL NOT NULL,
+        percent_free REAL NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+
+def normalize_disk_usage(conn):
+    """Version 2: mounts dimension, compact samples and latest sample per mount
+    
+    Samples reference mounts by integer id and use integer epoch timestamps.
+    They are clustered by (mount_id, ts), so the history of a mount is a
+    single index range scan.
+    """
+    conn.execute('''
+    CREATE TABLE mounts (
+        id INTEGER PRIMARY KEY,
+        mountpoint TEXT NOT NULL UNIQUE,
+        device TEXT NOT NULL
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE disk_samples (
+        mount_id INTEGER NOT NULL REFERENCES mounts(id),
+        ts INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        used INTEGER NOT NULL,
+        free INTEGER NOT NULL,
+        percent_used REAL NOT NULL,
+        PRIMARY KEY (mount_id, ts)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TABLE disk_latest (
+        mount_id INTEGER PRIMARY KEY REFERENCES mounts(id),
+        ts INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        used INTEGER NOT NULL,
+        free INTEGER NOT NULL,
+        percent_used REAL NOT NULL
+    )
+    ''')
+    
+    # Copy the existing data; the device of a mount is taken from its latest row
+    conn.execute('''
+    INSERT INTO mounts (mountpoint, device)
+    SELECT mountpoint, device
+    FROM (SELECT mountpoint, device, MAX(id) FROM disk_usage GROUP BY mountpoint)
+    ''')
+    conn.execute('''
+    INSERT OR REPLACE INTO disk_samples (mount_id, ts, total, used, free, percent_used)
+    SELECT m.id, CAST(strftime('%s', d.timestamp) AS INTEGER), d.total, d.used, d.free, d.percent_used
+    FROM disk_usage d
+    INNER JOIN mounts m ON m.mountpoint = d.mountpoint
+    ORDER BY d.id
+    ''')
+    conn.execute('''
+    INSERT INTO disk_latest (mount_id, ts, total, used, free, percent_used)
+    SELECT s.mount_id, s.ts, s.total, s.used, s.free, s.percent_used
+    FROM disk_samples s
+    INNER JOIN (
+        SELECT mount_id, MAX(ts) AS latest_ts
+        FROM disk_samples
+        GROUP BY mount_id
+    ) latest ON s.mount_id = latest.mount_id AND s.ts = latest.latest_ts
+    ''')
+    conn.execute('DROP TABLE disk_usage')
+
+
+def create_disk_rollups(conn):
+    """Version 3: per-minute, per-hour and per-day disk usage rollups
+    
+    Each bucket keeps min/max/sum/last of the used bytes and used percentage.
+    The tables are filled from the existing raw samples.
+    """
+    for table, resolution in (('disk_rollup_1m', 60), ('disk_rollup_1h', 3600), ('disk_rollup_1d', 86400)):
+        conn.execute(f'''
+        CREATE TABLE {table} (
+            mount_id INTEGER NOT NULL REFERENCES mounts(id),
+            ts INTEGER NOT NULL,
+            samples INTEGER NOT NULL,
+            min_used INTEGER NOT NULL,
+            max_used INTEGER NOT NULL,
+            sum_used INTEGER NOT NULL,
+            last_used INTEGER NOT NULL,
+            min_percent REAL NOT NULL,
+            max_percent REAL NOT NULL,
+            sum_percent REAL NOT NULL,
+            last_percent REAL NOT NULL,
+            last_ts INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            free INTEGER NOT NULL,
+            PRIMARY KEY (mount_id, ts)
+        ) WITHOUT ROWID
+        ''')
+        conn.execute(f'''
+        INSERT INTO {table}
+        (mount_id, ts, samples, min_used, max_used, sum_used, last_used,
+         min_percent, max_percent, sum_percent, last_percent, last_ts, total, free)
+        SELECT mount_id, bucket, COUNT(*), MIN(used), MAX(used), SUM(used), last_used,
+               MIN(percent_used), MAX(percent_used), SUM(percent_used), last_percent, MAX(ts), last_total, last_free
+        FROM (
+            SELECT mount_id, ts, used, percent_used, ts - ts % {resolution} AS bucket,
+                   LAST_VALUE(used) OVER bucket_window AS last_used,
+                   LAST_VALUE(percent_used) OVER bucket_window AS last_percent,
+                   LAST_VALUE(total) OVER bucket_window AS last_total,
+                   LAST_VALUE(free) OVER bucket_window AS last_free
+            FROM disk_samples
+            WINDOW bucket_window AS (
+                PARTITION BY mount_id, ts - ts % {resolution} ORDER BY ts
+                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+            )
+        )
+        GROUP BY mount_id, bucket
+        ''')
+
+
+def create_timeseries(conn):
+    """Version 4: generic time series storage shared by all collectors
+
+    A series is one field of one instance of a metric (e.g. memory/''/used).
+    Samples are clustered by (series_id, ts).
+    """
+    conn.execute('''
+    CREATE TABLE series (
+        id INTEGER PRIMARY KEY,
+        metric TEXT NOT NULL,
+        instance TEXT NOT NULL,
+        field TEXT NOT NULL,
+        UNIQUE (metric, instance, field)
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE samples (
+        series_id INTEGER NOT NULL REFERENCES series(id),
+        ts INTEGER NOT NULL,
+        value REAL NOT NULL,
+        PRIMARY KEY (series_id, ts)
+    ) WITHOUT ROWID
+    ''')
+
+
+def enable_incremental_vacuum(conn):
+    """Version 5: incremental auto vacuum, so pages freed by the retention job can be released
+    
+    Changing auto_vacuum on an existing file requires rebuilding it with
+    VACUUM, which cannot run inside a transaction.
+    """
+    rebuild_for_incremental_vacuum(conn)
+
+
+def rebuild_for_incremental_vacuum(conn):
+    """Rebuild the database with VACUUM, unless it already uses incremental auto vacuum
+    
+    VACUUM rewrites the whole file and blocks startup until it is done, so
+    only databases up to VACUUM_MAX_MB are rebuilt. Larger ones are left
+    as they are, with a warning: the retention job still frees pages for
+    reuse, but the file does not shrink until a later startup with a
+    higher limit rebuilds it.
+    
+    Args:
+        conn (sqlite3.Connection): The database connection, outside a transaction
+    
+    Returns:
+        bool: The database was rebuilt
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()['auto_vacuum'] == 2:
+        return False
+    
+    page_count = conn.execute('PRAGMA page_count').fetchone()['page_count']
+    page_size = conn.execute('PRAGMA page_size').fetchone()['page_size']
+    size_mb = page_count * page_size / (1024 * 1024)
+    if size_mb > VACUUM_MAX_MB:
+        logger.warning(f"Database is {size_mb:.0f}MB, not rebuilding it to enable incremental auto vacuum "
+                       f"(limit PS_MONITOR_VACUUM_MAX_MB={VACUUM_MAX_MB}); expired data will not shrink the file. "
+                       f"Raise the limit to rebuild it at the next startup, which waits for the full VACUUM")
+        return False
+    
+    logger.info(f"Rebuilding the {size_mb:.1f}MB database with VACUUM to enable incremental auto vacuum")
+    start = time.perf_counter()
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    logger.info(f"Database rebuilt in {time.perf_counter() - start:.1f}s")
+    return True
+
+
+# Ordered list of migrations
+MIGRATIONS = [
+    Migration(1, 'Create disk usage table', create_disk_usage_table, True),
+    Migration(2, 'Normalize disk usage into mounts, disk_samples and disk_latest', normalize_disk_usage, True),
+    Migration(3, 'Create disk usage rollup tiers', create_disk_rollups, True),
+    Migration(4, 'Create generic time series tables', create_timeseries, True),
+    Migration(INCREMENTAL_VACUUM_VERSION, 'Enable incremental vacuum', enable_incremental_vacuum, False),
+]
+
+
+def get_schema_version(conn):
+    """Get the schema version of a database
+    
+    Args:
+        conn (sqlite3.Connection): The database connection
+    
+    Returns:
+        int: The applied schema version, 0 for a new database
+    """
+    return conn.execute('PRAGMA user_version').fetchone()['user_version']
+
+
+def migrate(conn):
+    """Apply the pending migrations, each transactional one in its own transaction
+    
+    A database too large to be rebuilt for incremental auto vacuum when
+    migrated is rebuilt at a later startup, once VACUUM_MAX_MB allows it.
+    
+    Args:
+        conn (sqlite3.Connection): The database connection
+    
+    Returns:
+        int: The schema version after migrating
+    """
+    version = get_schema_version(conn)
+    if version >= INCREMENTAL_VACUUM_VERSION:
+        rebuild_for_incremental_vacuum(conn)
+    
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        
+        target = migration.version
+        logger.info(f"Migrating database schema to version {target}: {migration.description}")
+        if not migration.transactional:
+            migration.function(conn)
+            conn.execute(f'PRAGMA user_version = {target}')
+            version = target
+            continue
+        
+        conn.execute('BEGIN')
+        try:
+            migration.function(conn)
+            conn.execute(f'PRAGMA user_version = {target}')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        version = target
+    
+    return version
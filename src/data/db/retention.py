@@ -0,0 +1,110 @@
+"""
+Retention policies for PS Monitor application.
+Deletes expired samples in small batches bounded by primary key ranges.
+"""
+from collections import namedtuple
+
+from data.db.database import Database
+from data.db.disk_rollups import ALL_TIERS, RAW_TIER
+
+RetentionPolicy = namedtuple('RetentionPolicy', ['table', 'key', 'key_table', 'retention_days'])
+
+# Days of generic time series samples kept
+TIMESERIES_RETENTION_DAYS = 30
+
+# Tables cleaned by the retention job; each is keyed by (key, ts)
+RETENTION_POLICIES = [
+    RetentionPolicy(tier.table, 'mount_id', 'mounts', tier.retention_days) for tier in ALL_TIERS
+] + [
+    RetentionPolicy('samples', 'series_id', 'series', TIMESERIES_RETENTION_DAYS)
+]
+
+
+class RetentionRepository:
+    """Repository for the deletion of expired data"""
+    
+    @classmethod
+    def get_keys(cls, policy):
+        """Get the keys (mounts or series) whose samples a policy cleans
+        
+        Args:
+            policy (RetentionPolicy): The retention policy
+        
+        Returns:
+            list: The key ids
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f'SELECT id FROM {policy.key_table} ORDER BY id')
+        return [row[0] for row in cursor.fetchall()]
+    
+    @classmethod
+    def delete_batch(cls, policy, key_id, cutoff, batch_size):
+        """Delete the oldest expired samples of one key, at most batch_size rows
+        
+        The batch is bounded by the timestamp of its last row, so the delete is a
+        single primary key range and the write transaction stays short.
+        
+        Args:
+            policy (RetentionPolicy): The retention policy
+            key_id (int): The mount or series id
+            cutoff (int): Samples before this Unix epoch time are expired
+            batch_size (int): Maximum number of rows deleted
+        
+        Returns:
+            tuple: Number of rows deleted, and whether expired rows remain
+        """
+        conn = Database.get_connection()
+        row = conn.execute(f'''
+        SELECT ts FROM {policy.table}
+        WHERE {policy.key} = ? AND ts < ?
+        ORDER BY ts
+        LIMIT 1 OFFSET ?
+        ''', (key_id, cutoff, batch_size - 1)).fetchone()
+        bound = row['ts'] if row else cutoff - 1
+        
+        with conn:
+            cursor = conn.execute(f'''
+            DELETE FROM {policy.table}
+            WHERE {policy.key} = ? AND ts <= ?
+            ''', (key_id, bound))
+        
+        return cursor.rowcount, row is not None and bound < cutoff - 1
+    
+    @classmethod
+    def delete_expired_latest(cls, now):
+        """Delete the latest samples of mounts not seen within the raw retention
+        
+        Args:
+            now (int): Current time as Unix epoch seconds
+        
+        Returns:
+            int: Number of records deleted
+        """
+        conn = Database.get_connection()
+        with conn:
+            cursor = conn.execute('DELETE FROM disk_latest WHERE ts < ?',
+                                  (now - RAW_TIER.retention_days * 86400,))
+        return cursor.rowcount
+    
+    @classmethod
+    def incremental_vacuum(cls, pages):
+        """Return free pages of the database file to the file system
+        
+        Args:
+            pages (int): Maximum number of pages to free
+        
+        Returns:
+            int: Number of free pages left
+        """
+        conn = Database.get_connection()
+        # Each step of the pragma frees one page; execute() would only run the first step
+        conn.executescript(f'PRAGMA incremental_vacuum({int(pages)})')
+        return conn.execute('PRAGMA freelist_count').fetchone()['freelist_count']
+    
+    @classmethod
+    def optimize(cls):
+        """Refresh the query planner statistics of the tables that need it"""
+        conn = Database.get_connection()
+        conn.execute('PRAGMA optimize')
@@ -0,0 +1,128 @@
+"""
+Repository for generic time series data.
+Handles database operations for the samples of collectors without dedicated tables.
+"""
+import threading
+import time
+
+from data.db.batch_writer import BatchWriter
+from data.db.database import Database
+from monitor.instrumentation import timed
+
+
+class TimeSeriesRepository:
+    """Repository for generic time series data"""
+    
+    # Series ids by (metric, instance, field)
+    _series_ids = {}
+    _series_lock = threading.Lock()
+    
+    @classmethod
+    @timed('repository', 'timeseries.save_samples')
+    def save_samples(cls, samples):
+        """Save samples to the database in a single transaction
+        
+        Args:
+            samples (list): List of (metric, instance, field, timestamp, value) tuples,
+                with the timestamp as Unix epoch seconds
+        
+        Returns:
+            int: Number of records inserted
+        """
+        conn = Database.get_connection()
+        with conn:
+            series_ids = cls._resolve_series_ids(conn, samples)
+            conn.executemany('''
+            INSERT OR REPLACE INTO samples (series_id, ts, value)
+            VALUES (?, ?, ?)
+            ''', [(series_ids[(metric, instance, field)], ts, value)
+                  for metric, instance, field, ts, value in samples])
+        
+        # Only committed ids are cached: the id of a rolled back series is given to the next new one
+        with cls._series_lock:
+            cls._series_ids.update(series_ids)
+        return len(samples)
+    
+    @classmethod
+    def _resolve_series_ids(cls, conn, samples):
+        """Get the series ids for samples, creating the missing series
+        
+        Args:
+            conn (sqlite3.Connection): The connection of the current transaction
+            samples (list): List of (metric, instance, field, timestamp, value) tuples
+        
+        Returns:
+            dict: Series ids by (metric, instance, field)
+        """
+        series_ids = {}
+        with cls._series_lock:
+            for metric, instance, field, _, _ in samples:
+                key = (metric, instance, field)
+                if key in series_ids:
+                    continue
+                
+                series_id = cls._series_ids.get(key)
+                if series_id is None:
+                    conn.execute('''
+                    INSERT OR IGNORE INTO series (metric, instance, field) VALUES (?, ?, ?)
+                    ''', key)
+                    series_id = conn.execute('''
+                    SELECT id FROM series WHERE metric = ? AND instance = ? AND field = ?
+                    ''', key).fetchone()['id']
+                series_ids[key] = series_id
+        return series_ids
+    
+    @classmethod
+    @timed('repository', 'timeseries.get_series_history')
+    def get_series_history(cls, metric, instance, field, start, end):
+        """Get the samples of a series for a time range
+        
+        Args:
+            metric (str): The metric (collector) name
+            instance (str): The instance, e.g. a device name, or '' for single instance metrics
+            field (str): The field name
+            start (int): Start of the range (inclusive) as Unix epoch seconds
+            end (int): End of the range (exclusive) as Unix epoch seconds
+        
+        Returns:
+            list: (timestamp, value) tuples in time order
+        """
+        conn = Database.get_connection()
+        
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute('''
+        SELECT s.ts, s.value
+        FROM series r
+        INNER JOIN samples s ON s.series_id = r.id
+        WHERE r.metric = ? AND r.instance = ? AND r.field = ? AND s.ts >= ? AND s.ts < ?
+        ORDER BY s.ts
+        ''', (metric, instance, field, start, end))
+        
+        return cursor.fetchall()
+    
+    @classmethod
+    @timed('repository', 'timeseries.delete_old_samples')
+    def delete_old_samples(cls, days_to_keep=30):
+        """Delete samples older than the specified number of days
+        
+        Args:
+            days_to_keep (int, optional): Number of days of data to keep
+        
+        Returns:
+            int: Number of records deleted
+        """
+        cutoff = int(time.time()) - days_to_keep * 86400
+        conn = Database.get_connection()
+        with conn:
+            # Range delete on the (series_id, ts) primary key of each series
+            cursor = conn.execute('''
+            DELETE FROM samples
+            WHERE series_id IN (SELECT id FROM series) AND ts < ?
+            ''', (cutoff,))
+        
+        return cursor.rowcount
+
+
+# Shared writer batching the samples of all generic collectors
+timeseries_writer = BatchWriter('timeseries', TimeSeriesRepository.save_samples)
@@ -14,12 +14,16 @@ import os
 import platform
 
 from data.db.database import Database
-from data.db.disk_usage_monitor import start_monitoring
+from monitor.fleet import fleet_monitor
+from monitor.scheduler import start_monitoring, stop_monitoring
 from web.http_server import HttpServer
 
 running = True
 startup_at = time.time()
 
+# 'agent' monitors this host; 'aggregator' polls the agents listed in PS_MONITOR_AGENTS instead
+MODE = os.environ.get('PS_MONITOR_MODE', 'agent')
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-5s [%(threadName)20s] %(name)-18s: %(message)s')
 logger = logging.getLogger('main')
 
@@ -32,7 +36,15 @@ def main():
     signal.signal(signal.SIGTERM, shutdown)
 
     Database.initialize_schema()
-    start_monitoring()
+    if MODE == 'aggregator':
+        if not fleet_monitor.agents:
+            logger.error("Aggregator mode needs the agents to poll in PS_MONITOR_AGENTS")
+            sys.exit(1)
+        fleet_monitor.start()
+    else:
+        if MODE != 'agent':
+            logger.warning(f"Unknown mode '{MODE}', using 'agent'")
+        start_monitoring()
 
     server_thread = threading.Thread(target=http_server.run, daemon=True)
     http_start_time = time.time()
@@ -40,7 +52,7 @@ def main():
 
     startup_time_ms = int((time.time() - startup_at) * 1000)
     http_start_time_ms = int((time.time() - http_start_time) * 1000)
-    logger.info(f"Started ps-monitor in {http_start_time_ms}ms (process running for {startup_time_ms}ms)")
+    logger.info(f"Started ps-monitor in {MODE} mode in {http_start_time_ms}ms (process running for {startup_time_ms}ms)")
 
     try:
         global running
@@ -54,6 +66,11 @@ def shutdown(signal=None, frame=None):
     global running
     running = False
     http_server.shutdown()
+    if MODE == 'aggregator':
+        fleet_monitor.stop()
+    else:
+        stop_monitoring()
+    Database.close_all()
     sys.exit(0)
 
 
@@ -0,0 +1,84 @@
+"""
+Collector base class for PS Monitor application.
+A collector declares what it samples and how often; the scheduler runs it.
+"""
+import time
+
+from api.collector_cache import collector_cache
+from data.db.timeseries_repository import timeseries_writer
+from monitor.ring_buffer import ring_buffers
+from monitor.task import ScheduledTask
+
+
+class Collector(ScheduledTask):
+    """
+    Base class of the periodic metric collectors.
+    
+    Subclasses set a name, an interval, the numeric fields they sample and a
+    cost budget, and implement collect(). Each run shares the collected value
+    with the API endpoints through the collector cache, appends it to the
+    in-memory ring buffer of each instance, and stores one sample per
+    instance and field in the time series tables.
+    """
+    
+    # Name of the metric, also the collector cache entry updated on each run
+    name = None
+    
+    # Numeric fields stored for each instance
+    fields = ()
+    
+    # Array typecode of each field in the ring buffers, 'd' (float) when not set
+    field_types = {}
+    
+    # Share each collected value with the API endpoints through the collector
+    # cache, when an entry of the same name is registered
+    shared = True
+    
+    def collect(self):
+        """Collect a fresh value
+        
+        Returns:
+            The collected value
+        """
+        raise NotImplementedError
+    
+    def samples(self, value):
+        """Split a collected value into per-instance field values
+        
+        Single instance metrics use '' as instance name.
+        
+        Args:
+            value: The collected value
+        
+        Returns:
+            list: (instance, {field: value}) tuples
+        """
+        if not isinstance(value, dict) or 'error' in value:
+            return []
+        return [('', value)]
+    
+    def store(self, value, timestamp):
+        """Queue the samples of a collected value for the database
+        
+        Args:
+            value: The collected value
+            timestamp (int): Collection time as Unix epoch seconds
+        """
+        rows = [(self.name, instance, field, timestamp, float(values[field]))
+                for instance, values in self.samples(value)
+                for field in self.fields
+                if values.get(field) is not None]
+        timeseries_writer.submit(rows)
+    
+    def run(self):
+        """Collect, share and store one value"""
+        timestamp = time.time()
+        value = self.collect()
+        if self.shared and self.name in collector_cache:
+            collector_cache.put(self.name, value, timestamp)
+        
+        timestamp = int(timestamp)
+        for instance, values in self.samples(value):
+            ring_buffers.get_or_create(self.name, instance, self.interval, self.fields,
+                                       self.field_types).append(timestamp, values)
+        self.store(value, timestamp)
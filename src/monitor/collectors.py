@@ -0,0 +1,220 @@
+"""
+Built-in collectors for PS Monitor application.
+Disk usage keeps its dedicated tables and rollups; other metrics use the
+generic time series tables.
+"""
+import os
+
+from api.cpu_usage import CpuStatReader, get_cpu_usage
+from api.disk_io import DiskStatsReader, get_disk_io
+from api.disk_usage import DISK_STAT_TIMEOUT, get_disk_usage
+from api.memory_usage import get_memory_info
+from api.network_usage import NetDevReader, get_network_usage
+from api.processes import get_process_table
+from data.db.disk_usage_repository import disk_usage_writer
+from monitor.collector import Collector
+
+# Seconds between two collections of each collector
+DISK_INTERVAL = int(os.environ.get('PS_MONITOR_DISK_INTERVAL', 600))
+DISK_IO_INTERVAL = int(os.environ.get('PS_MONITOR_DISK_IO_INTERVAL', 60))
+MEMORY_INTERVAL = int(os.environ.get('PS_MONITOR_MEMORY_INTERVAL', 60))
+NETWORK_INTERVAL = int(os.environ.get('PS_MONITOR_NETWORK_INTERVAL', 60))
+CPU_INTERVAL = int(os.environ.get('PS_MONITOR_CPU_INTERVAL', 60))
+PROCESS_INTERVAL = int(os.environ.get('PS_MONITOR_PROCESS_INTERVAL', 60))
+
+
+class DiskUsageCollector(Collector):
+    """Collector of the usage of every mounted filesystem"""
+    
+    name = 'disk'
+    interval = DISK_INTERVAL
+    fields = ('total', 'used', 'free', 'percent_used')
+    field_types = {'total': 'q', 'used': 'q', 'free': 'q'}
+    
+    # Mounts are stat'ed in parallel, a hung mount costs at most the stat timeout
+    budget_ms = DISK_STAT_TIMEOUT * 1000 + 500
+    
+    def collect(self):
+        """Collect the usage of the mounted filesystems
+        
+        Returns:
+            list: Disk usage information dictionaries
+        """
+        return get_disk_usage()
+    
+    def samples(self, value):
+        """Split the disk usage into the values of each mount
+        
+        Args:
+            value (list): Disk usage information dictionaries
+        
+        Returns:
+            list: (mountpoint, disk) tuples
+        """
+        # Leave out stale mounts that did not answer
+        return [(disk['mountpoint'], disk) for disk in value if not disk.get('stale')]
+    
+    def store(self, value, timestamp):
+        """Queue the disk usage for the mount tables
+        
+        Args:
+            value (list): Disk usage information dictionaries
+            timestamp (int): Collection time as Unix epoch seconds
+        """
+        # Disk samples go to the mount tables, which maintain the rollup tiers
+        disk_data = [dict(disk, timestamp=timestamp) for _, disk in self.samples(value)]
+        disk_usage_writer.submit(disk_data)
+
+
+class DiskIOCollector(Collector):
+    """Collector of the I/O rates of every block device"""
+    
+    name = 'disk_io'
+    interval = DISK_IO_INTERVAL
+    fields = ('read_iops', 'write_iops', 'read_bytes_per_sec', 'write_bytes_per_sec',
+              'read_await_ms', 'write_await_ms', 'utilization')
+    field_types = {'read_bytes_per_sec': 'q', 'write_bytes_per_sec': 'q'}
+    budget_ms = 50
+    
+    # Samples average the whole interval, so they do not replace the endpoint's cached value
+    shared = False
+    
+    def __init__(self):
+        """Initialize the collector with its own reader, so rates are measured over the interval"""
+        super().__init__()
+        self.reader = DiskStatsReader()
+    
+    def collect(self):
+        """Collect the I/O rates since the previous collection
+        
+        Returns:
+            dict: Disk I/O information
+        """
+        return get_disk_io(self.reader)
+    
+    def samples(self, value):
+        """Split the disk I/O rates into the values of each device
+        
+        Args:
+            value (dict): Disk I/O information
+        
+        Returns:
+            list: (device name, device) tuples
+        """
+        return [(device['device'], device) for device in value['devices']]
+
+
+class MemoryCollector(Collector):
+    """Collector of the system memory and swap usage"""
+    
+    name = 'memory'
+    interval = MEMORY_INTERVAL
+    fields = ('total', 'used', 'free', 'percent_used',
+              'swap_total', 'swap_used', 'swap_free', 'swap_percent_used',
+              'buffers', 'cached', 'dirty', 'shmem')
+    field_types = {'total': 'q', 'used': 'q', 'free': 'q', 'swap_total': 'q', 'swap_used': 'q', 'swap_free': 'q',
+                   'buffers': 'q', 'cached': 'q', 'dirty': 'q', 'shmem': 'q'}
+    budget_ms = 50
+    
+    def collect(self):
+        """Collect the memory and swap usage
+        
+        Returns:
+            dict: Memory information
+        """
+        return get_memory_info()
+
+
+class NetworkCollector(Collector):
+    """Collector of the traffic of every network interface"""
+    
+    name = 'network'
+    interval = NETWORK_INTERVAL
+    fields = ('rx_bytes_per_sec', 'tx_bytes_per_sec', 'rx_packets_per_sec', 'tx_packets_per_sec',
+              'rx_errors_per_sec', 'tx_errors_per_sec', 'rx_drops_per_sec', 'tx_drops_per_sec', 'utilization')
+    field_types = {'rx_bytes_per_sec': 'q', 'tx_bytes_per_sec': 'q'}
+    budget_ms = 50
+    
+    # Samples average the whole interval, so they do not replace the endpoint's cached value
+    shared = False
+    
+    def __init__(self):
+        """Initialize the collector with its own reader, so rates are measured over the interval"""
+        super().__init__()
+        self.reader = NetDevReader()
+    
+    def collect(self):
+        """Collect the interface rates since the previous collection
+        
+        Returns:
+            dict: Network usage information
+        """
+        return get_network_usage(self.reader)
+    
+    def samples(self, value):
+        """Split the network rates into the values of each interface
+        
+        Args:
+            value (dict): Network usage information
+        
+        Returns:
+            list: (interface name, interface) tuples
+        """
+        return [(interface['interface'], interface) for interface in value['interfaces']]
+
+
+class CpuCollector(Collector):
+    """Collector of the system CPU utilization and load averages"""
+    
+    name = 'cpu'
+    interval = CPU_INTERVAL
+    fields = ('percent_used', 'user', 'system', 'iowait', 'steal', 'load_1', 'load_5', 'load_15')
+    budget_ms = 50
+    
+    # Samples average the whole interval, without the per-core detail of the
+    # endpoint, so they do not replace its cached value
+    shared = False
+    
+    def __init__(self):
+        """Initialize the collector with its own reader, so utilization is measured over the interval"""
+        super().__init__()
+        self.reader = CpuStatReader()
+    
+    def collect(self):
+        """Collect the CPU utilization since the previous collection and the load averages
+        
+        Returns:
+            dict: CPU usage information, without the per-core utilization
+        """
+        # Only the aggregate is stored; the cost does not grow with the number of cores
+        return get_cpu_usage(self.reader, per_core=False)
+
+
+class ProcessCollector(Collector):
+    """Collector of the process table, storing the process and thread counts"""
+    
+    name = 'processes'
+    interval = PROCESS_INTERVAL
+    fields = ('count', 'running', 'threads')
+    field_types = {'count': 'q', 'running': 'q', 'threads': 'q'}
+    
+    # One stat read per process; about half a second for 20k processes
+    budget_ms = 500
+    
+    def collect(self):
+        """Collect the process table
+        
+        Returns:
+            dict: Process table information
+        """
+        return get_process_table()
+
+
+def get_default_collectors():
+    """Create the collectors started with the monitor
+    
+    Returns:
+        list: The collector instances
+    """
+    return [DiskUsageCollector(), DiskIOCollector(), MemoryCollector(), NetworkCollector(), CpuCollector(),
+            ProcessCollector()]
@@ -0,0 +1,289 @@
+"""
+Fleet monitor for the aggregator mode.
+Polls the snapshot of every configured agent and keeps the latest ones in memory.
+"""
+import gzip
+import http.client
+import json
+import logging
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from monitor.instrumentation import LatencyHistogram
+
+logger = logging.getLogger('FleetMonitor')
+
+# Agents polled in aggregator mode, comma separated host:port or http:// URLs
+FLEET_AGENTS = [agent.strip() for agent in os.environ.get('PS_MONITOR_AGENTS', '').split(',') if agent.strip()]
+
+# Seconds between two polls of every agent; below the agents' keep-alive
+# timeout (5 seconds by default), so their connections stay open between polls
+FLEET_POLL_INTERVAL = float(os.environ.get('PS_MONITOR_AGENT_INTERVAL', 4))
+
+# Seconds to wait for an agent, both to connect and for every read
+FLEET_POLL_TIMEOUT = float(os.environ.get('PS_MONITOR_AGENT_TIMEOUT', 2))
+
+# Maximum agents polled at the same time
+FLEET_POLL_WORKERS = int(os.environ.get('PS_MONITOR_AGENT_WORKERS', 32))
+
+# Snapshot sections polled from every agent
+FLEET_SNAPSHOT_PATH = '/api/snapshot?fields=system,disk,memory,cpu,network'
+
+
+class Agent:
+    """A polled agent, with its persistent connection and latest snapshot"""
+    
+    def __init__(self, address, timeout=FLEET_POLL_TIMEOUT):
+        """Initialize the agent
+        
+        Args:
+            address (str): The agent host:port or http:// URL
+            timeout (float, optional): Seconds to wait to connect and for every read
+        """
+        url = urlsplit(address if '//' in address else f'http://{address}')
+        self.name = url.netloc
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = timeout
+        self.connection = None
+        self.etag = None
+        self.snapshot = None
+        self.polled_at = None
+        self.error = None
+        self.failures = 0
+        self.polls = 0
+        self.busy = False
+        self.latency = LatencyHistogram()
+    
+    def poll(self):
+        """Fetch the agent snapshot
+        
+        The connection is kept open for the next poll. The snapshot is requested
+        with the entity tag of the previous one, so an unchanged snapshot costs
+        a 304 Not Modified without a body.
+        
+        Returns:
+            bool: The snapshot or the agent state changed
+        """
+        started = time.perf_counter()
+        was_up = self.is_up()
+        try:
+            changed = self._fetch()
+            if self.failures:
+                logger.info(f"Agent {self.name} is up again after {self.failures} failed polls")
+            self.polled_at = time.time()
+            self.error = None
+            self.failures = 0
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            self.close()
+            self.error = str(e) or type(e).__name__
+            self.failures += 1
+            changed = was_up
+            if self.failures == 1:
+                logger.warning(f"Agent {self.name} is down: {self.error}")
+        self.polls += 1
+        self.latency.observe(time.perf_counter() - started, error=self.error is not None)
+        return changed or not was_up and self.is_up()
+    
+    def is_up(self):
+        """Check if the last poll succeeded"""
+        return self.polls > 0 and self.failures == 0
+    
+    def close(self):
+        """Close the connection to the agent"""
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+    
+    def get_stats(self):
+        """Get the agent polling statistics
+        
+        Returns:
+            dict: Agent state, time of the last successful poll, consecutive
+                failures and poll latency
+        """
+        return {
+            'up': self.is_up(),
+            'polled_at': self.polled_at,
+            'failures': self.failures,
+            'error': self.error,
+            'latency': self.latency.get_stats(buckets=False)
+        }
+    
+    def _fetch(self):
+        """Request the snapshot, again on a new connection if the kept one was closed by the agent"""
+        reused = self.connection is not None
+        try:
+            return self._request()
+        except (ConnectionError, http.client.RemoteDisconnected, http.client.BadStatusLine):
+            if not reused:
+                raise
+            self.close()
+            return self._request()
+    
+    def _request(self):
+        """Send the snapshot request and read the response"""
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        self.connection.request('GET', FLEET_SNAPSHOT_PATH, headers=headers)
+        response = self.connection.getresponse()
+        body = response.read()
+        if response.will_close:
+            self.close()
+        
+        if response.status == 304:
+            return False
+        if response.status != 200:
+            raise http.client.HTTPException(f"HTTP {response.status} {response.reason}")
+        if response.getheader('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        self.snapshot = json.loads(body)
+        self.etag = response.getheader('ETag')
+        return True
+
+
+class FleetMonitor:
+    """
+    Poller of the snapshot of every agent of the fleet.
+    
+    Every FLEET_POLL_INTERVAL seconds, all agents are polled concurrently by
+    a bounded pool of threads, each agent on its own persistent connection.
+    A round waits for FLEET_POLL_TIMEOUT seconds at most; an agent still
+    answering the previous round is skipped. The fleet version is increased
+    once per round in which an agent changed, so views of the fleet can be
+    built once per version whatever the number of clients.
+    """
+    
+    def __init__(self, agents=FLEET_AGENTS, interval=FLEET_POLL_INTERVAL, timeout=FLEET_POLL_TIMEOUT,
+                 workers=FLEET_POLL_WORKERS):
+        """Initialize the fleet monitor
+        
+        Args:
+            agents (list, optional): The agent host:port or http:// URLs
+            interval (float, optional): Seconds between two polls of every agent
+            timeout (float, optional): Seconds to wait for an agent
+            workers (int, optional): Maximum agents polled at the same time
+        """
+        self.agents = [Agent(address, timeout) for address in dict.fromkeys(agents)]
+        self.interval = interval
+        self.timeout = timeout
+        self.workers = max(1, min(workers, len(self.agents)))
+        self.lock = threading.Lock()
+        self.version = 0
+        self.changed = False
+        self.rounds = 0
+        self.last_round_ms = 0.0
+        self.running = False
+        self.executor = None
+        self.poller_thread = None
+    
+    def start(self):
+        """Start polling the agents"""
+        if self.poller_thread and self.poller_thread.is_alive():
+            logger.warning("Fleet monitor is already running")
+            return
+        
+        self.running = True
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='FleetPoller')
+        self.poller_thread = threading.Thread(target=self._run, name='FleetMonitor', daemon=True)
+        self.poller_thread.start()
+        logger.info(f"Polling {len(self.agents)} agents every {self.interval}s with {self.workers} workers")
+    
+    def stop(self):
+        """Stop polling the agents and close their connections"""
+        self.running = False
+        if self.poller_thread and self.poller_thread.is_alive():
+            self.poller_thread.join(self.timeout + 1)
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        for agent in self.agents:
+            agent.close()
+        logger.info("Fleet monitor stopped")
+    
+    def is_running(self):
+        """Check if the agents are being polled"""
+        return self.running
+    
+    def get_version(self):
+        """Get the fleet version, increased once per round in which an agent changed
+        
+        Returns:
+            int: The fleet version, 0 before the first round
+        """
+        return self.version
+    
+    def get_rounds(self):
+        """Get the number of polling rounds, increased every round whether or not an agent changed
+        
+        Returns:
+            int: The number of rounds, 0 before the first round
+        """
+        return self.rounds
+    
+    def poll(self):
+        """Poll every agent not busy with the previous round, waiting at most the poll timeout"""
+        started = time.perf_counter()
+        futures = []
+        for agent in self.agents:
+            if not agent.busy:
+                agent.busy = True
+                futures.append(self.executor.submit(self._poll, agent))
+        wait(futures, timeout=self.timeout)
+        
+        with self.lock:
+            if self.changed or not self.rounds:
+                self.version += 1
+                self.changed = False
+            self.rounds += 1
+            self.last_round_ms = (time.perf_counter() - started) * 1000
+    
+    def get_stats(self):
+        """Get the fleet monitor statistics
+        
+        Returns:
+            dict: Agent counts, polling rounds and version, and the statistics of every agent
+        """
+        with self.lock:
+            return {
+                'agents': len(self.agents),
+                'up': sum(agent.is_up() for agent in self.agents),
+                'interval': self.interval,
+                'timeout': self.timeout,
+                'workers': self.workers,
+                'rounds': self.rounds,
+                'version': self.version,
+                'last_round_ms': round(self.last_round_ms, 3),
+                'by_agent': {agent.name: agent.get_stats() for agent in self.agents}
+            }
+    
+    def _poll(self, agent):
+        """Poll one agent (worker thread)"""
+        try:
+            if agent.poll():
+                with self.lock:
+                    self.changed = True
+        finally:
+            agent.busy = False
+    
+    def _run(self):
+        """Poller thread running a round every interval"""
+        next_round = time.monotonic()
+        while self.running:
+            self.poll()
+            # Rounds are absolute; a late round is skipped rather than run back to back
+            next_round += self.interval
+            now = time.monotonic()
+            if next_round < now:
+                next_round = now
+            time.sleep(next_round - now)
+
+
+# Global instance, polling only in aggregator mode
+fleet_monitor = FleetMonitor()
@@ -0,0 +1,323 @@
+"""
+Self-instrumentation of the PS Monitor agent.
+Latency histograms and counters fed by the request handler, the scheduler, the
+collector cache and the database layer, and an on-demand sampling profiler.
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+
+from collections import Counter
+from functools import wraps
+
+# Upper bounds of the latency histogram buckets in milliseconds; one more bucket counts slower calls
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Bucket labels, the last one counting calls slower than every bound
+BUCKET_LABELS = tuple(str(bound) for bound in LATENCY_BUCKETS_MS) + ('+Inf',)
+
+# Allow capturing stacks through /api/internal/profile; off by default, as
+# stacks expose the agent internals and sampling has a cost
+PROFILER_ENABLED = os.environ.get('PS_MONITOR_PROFILER', '0') not in ('', '0')
+
+# Longest profile, and default seconds and milliseconds between two samples
+PROFILE_MAX_SECONDS = 60
+PROFILE_DEFAULT_SECONDS = 10
+PROFILE_DEFAULT_INTERVAL_MS = 10
+
+# Frames kept per stack, from the innermost one, and stacks returned by a profile
+PROFILE_MAX_DEPTH = 64
+PROFILE_TOP_STACKS = 50
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with fixed buckets.
+    
+    Recording a call is a binary search over LATENCY_BUCKETS_MS and a few
+    increments under a lock, so it can wrap every request and query. The
+    percentiles reported are the upper bound of the bucket holding them,
+    capped by the slowest call.
+    """
+    
+    __slots__ = ('counts', 'count', 'errors', 'sum_ms', 'max_ms', 'lock')
+    
+    def __init__(self):
+        """Initialize an empty histogram"""
+        self.counts = [0] * len(BUCKET_LABELS)
+        self.count = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.lock = threading.Lock()
+    
+    def observe(self, seconds, error=False):
+        """Record one call
+        
+        Args:
+            seconds (float): Duration of the call
+            error (bool, optional): The call failed
+        """
+        elapsed_ms = seconds * 1000
+        index = bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum_ms += elapsed_ms
+            if elapsed_ms > self.max_ms:
+                self.max_ms = elapsed_ms
+            if error:
+                self.errors += 1
+    
+    def snapshot(self):
+        """Get a consistent copy of the histogram
+        
+        Returns:
+            tuple: The count of each bucket, the call count and the sum of the
+                latencies in milliseconds
+        """
+        with self.lock:
+            return list(self.counts), self.count, self.sum_ms
+    
+    def get_stats(self, buckets=True):
+        """Get the histogram statistics
+        
+        Args:
+            buckets (bool, optional): Include the count of each bucket
+        
+        Returns:
+            dict: Call and error counts, average, maximum and percentile
+                latencies in milliseconds, and the bucket counts by upper bound
+        """
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+            errors = self.errors
+            sum_ms = self.sum_ms
+            max_ms = self.max_ms
+        
+        stats = {
+            'count': count,
+            'errors': errors,
+            'avg_ms': round(sum_ms / count, 3) if count else 0,
+            'max_ms': round(max_ms, 3),
+            'p50_ms': self._percentile(counts, count, max_ms, 0.50),
+            'p90_ms': self._percentile(counts, count, max_ms, 0.90),
+            'p99_ms': self._percentile(counts, count, max_ms, 0.99)
+        }
+        if buckets:
+            stats['buckets'] = dict(zip(BUCKET_LABELS, counts))
+        return stats
+    
+    @staticmethod
+    def _percentile(counts, count, max_ms, fraction):
+        """Get the upper bound of the bucket holding a percentile"""
+        if not count:
+            return 0
+        rank = fraction * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                break
+        bound = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else max_ms
+        return round(min(bound, max_ms), 3)
+
+
+class Instrumentation:
+    """
+    Registry of the agent latency histograms and counters.
+    
+    Histograms and counters are grouped by component (requests, database,
+    repository) and named within their group; names must come from a
+    bounded set, such as routes or statement kinds, never from request data.
+    """
+    
+    def __init__(self):
+        """Initialize an empty registry"""
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+    
+    def histogram(self, group, name):
+        """Get a histogram, created on first use
+        
+        Args:
+            group (str): The component
+            name (str): The histogram name within the group
+        
+        Returns:
+            LatencyHistogram: The histogram
+        """
+        try:
+            return self.histograms[group][name]
+        except KeyError:
+            with self.lock:
+                return self.histograms.setdefault(group, {}).setdefault(name, LatencyHistogram())
+    
+    def observe(self, group, name, seconds, error=False):
+        """Record one call in a histogram
+        
+        Args:
+            group (str): The component
+            name (str): The histogram name within the group
+            seconds (float): Duration of the call
+            error (bool, optional): The call failed
+        """
+        self.histogram(group, name).observe(seconds, error)
+    
+    def increment(self, group, name, value=1):
+        """Add to a counter
+        
+        Args:
+            group (str): The component
+            name (str): The counter name within the group
+            value (int, optional): The amount added
+        """
+        with self.lock:
+            self.counters.setdefault(group, Counter())[name] += value
+    
+    def get_histograms(self, group):
+        """Get the histograms of a group
+        
+        Args:
+            group (str): The component
+        
+        Returns:
+            dict: The histograms by name
+        """
+        with self.lock:
+            return dict(self.histograms.get(group, {}))
+    
+    def get_counters(self, group):
+        """Get the counters of a group
+        
+        Args:
+            group (str): The component
+        
+        Returns:
+            dict: The counter values by name
+        """
+        with self.lock:
+            return dict(self.counters.get(group, {}))
+    
+    def get_stats(self, group):
+        """Get the histograms and counters of a group
+        
+        Args:
+            group (str): The component
+        
+        Returns:
+            dict: The latency statistics by histogram name, and the counters
+        """
+        return {
+            'latency': {name: histogram.get_stats() for name, histogram in sorted(self.get_histograms(group).items())},
+            'counters': self.get_counters(group)
+        }
+
+
+def timed(group, name):
+    """Decorator recording the duration of every call in a histogram
+    
+    Calls raising an exception are counted as errors.
+    
+    Args:
+        group (str): The component
+        name (str): The histogram name within the group
+    """
+    def decorator(function):
+        histogram = instrumentation.histogram(group, name)
+        
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException:
+                histogram.observe(time.perf_counter() - started, error=True)
+                raise
+            histogram.observe(time.perf_counter() - started)
+            return result
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler of the agent threads.
+    
+    At a fixed interval, the current frame of every other thread is taken
+    from sys._current_frames() and its stack folded into one line
+    ('thread;outer.py:function;...;inner.py:function'), the format read by
+    flame graph tools. Idle threads are sampled too, waiting in their queue
+    or selector. Only one profile runs at a time.
+    """
+    
+    def __init__(self):
+        """Initialize the profiler"""
+        self.lock = threading.Lock()
+    
+    def is_running(self):
+        """Check if a profile is being captured"""
+        return self.lock.locked()
+    
+    def profile(self, seconds=PROFILE_DEFAULT_SECONDS, interval_ms=PROFILE_DEFAULT_INTERVAL_MS):
+        """Sample the stacks of all threads for a while
+        
+        Args:
+            seconds (float, optional): Duration of the profile
+            interval_ms (float, optional): Milliseconds between two samples
+        
+        Returns:
+            dict: Duration, number of samples, and the most frequent folded
+                stacks with their count, or None if a profile is already running
+        """
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            own_ident = threading.get_ident()
+            stacks = Counter()
+            samples = 0
+            started = time.monotonic()
+            deadline = started + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: self._thread_group(thread.name) for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident != own_ident:
+                        stacks[self._fold(names.get(ident, 'unknown'), frame)] += 1
+                samples += 1
+                time.sleep(interval_ms / 1000)
+            
+            total = sum(stacks.values())
+            return {
+                'seconds': round(time.monotonic() - started, 3),
+                'interval_ms': interval_ms,
+                'samples': samples,
+                'stacks': [{'stack': stack, 'count': count, 'percent': round(count * 100 / total, 2)}
+                           for stack, count in stacks.most_common(PROFILE_TOP_STACKS)]
+            }
+        finally:
+            self.lock.release()
+    
+    @staticmethod
+    def _fold(thread_name, frame):
+        """Fold the stack of a frame into one line, outermost frame first"""
+        functions = []
+        while frame is not None and len(functions) < PROFILE_MAX_DEPTH:
+            code = frame.f_code
+            functions.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+            frame = frame.f_back
+        functions.append(thread_name)
+        return ';'.join(reversed(functions))
+    
+    @staticmethod
+    def _thread_group(name):
+        """Get the name shared by the threads of a pool (HttpWorker-3 -> HttpWorker)"""
+        return name.rstrip('0123456789').rstrip('-_') or name
+
+
+# Global instances fed by every component of the agent
+instrumentation = Instrumentation()
+profiler = SamplingProfiler()
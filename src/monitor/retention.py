@@ -0,0 +1,146 @@
+"""
+Retention job for PS Monitor application.
+Removes expired samples incrementally, without long write locks.
+"""
+import logging
+import os
+import time
+
+from data.db.retention import RETENTION_POLICIES, RetentionRepository
+from monitor.task import ScheduledTask
+
+logger = logging.getLogger('Retention')
+
+# Seconds between two retention passes
+RETENTION_INTERVAL = int(os.environ.get('PS_MONITOR_RETENTION_INTERVAL', 3600))
+
+# Maximum rows removed by a single delete statement
+RETENTION_BATCH_SIZE = 500
+
+# Milliseconds of deletes per run before yielding to the other tasks
+RETENTION_SLICE_MS = 100
+
+# Seconds between two runs while a pass is in progress
+RETENTION_YIELD_SECONDS = 1
+
+# Maximum pages returned to the file system per run
+VACUUM_PAGES = 1000
+
+
+class RetentionJob(ScheduledTask):
+    """
+    Task deleting the samples older than the retention of their table.
+    
+    A pass lists the (table, mount or series) pairs to clean, then each run
+    deletes batches of at most RETENTION_BATCH_SIZE rows for up to
+    RETENTION_SLICE_MS before yielding the scheduler thread, so collectors
+    keep running and the database write lock is only held for one batch at a
+    time. Once everything is deleted, the freed pages are returned to the file
+    system in steps and the planner statistics are refreshed.
+    """
+    
+    name = 'retention'
+    interval = RETENTION_INTERVAL
+    budget_ms = RETENTION_SLICE_MS * 5
+    
+    def __init__(self):
+        """Initialize the job with no pass in progress"""
+        super().__init__()
+        self.pending = []
+        self.vacuum_pending = False
+        self.pass_started = None
+        
+        # Progress statistics
+        self.passes = 0
+        self.pass_deleted = 0
+        self.pass_batches = 0
+        self.total_deleted = 0
+        self.last_pass_deleted = 0
+        self.last_pass_seconds = None
+        self.free_pages = None
+    
+    def run(self):
+        """Run one slice of the current pass, starting a new pass when idle"""
+        if not self.in_progress():
+            self._start_pass()
+        
+        deadline = time.perf_counter() + RETENTION_SLICE_MS / 1000
+        while self.pending and time.perf_counter() < deadline:
+            policy, key_id, cutoff = self.pending[0]
+            deleted, remaining = RetentionRepository.delete_batch(policy, key_id, cutoff, RETENTION_BATCH_SIZE)
+            self.pass_deleted += deleted
+            self.pass_batches += 1
+            self.total_deleted += deleted
+            if not remaining:
+                self.pending.pop(0)
+        
+        if not self.pending and self.vacuum_pending and time.perf_counter() < deadline:
+            free_pages = RetentionRepository.incremental_vacuum(VACUUM_PAGES)
+            # No progress means auto_vacuum is not incremental on this file
+            done = free_pages == 0 or free_pages == self.free_pages
+            self.free_pages = free_pages
+            if done:
+                RetentionRepository.optimize()
+                self._finish_pass()
+    
+    def in_progress(self):
+        """Check if a pass is in progress
+        
+        Returns:
+            bool: True if deletes or vacuum steps are pending
+        """
+        return bool(self.pending) or self.vacuum_pending
+    
+    def next_delay(self):
+        """Get the number of seconds until the next run
+        
+        Returns:
+            float: A short yield while a pass is in progress, the current interval otherwise
+        """
+        # Come back soon while a pass is in progress, the scheduler runs other tasks meanwhile
+        if self.in_progress():
+            return RETENTION_YIELD_SECONDS
+        return self.current_interval
+    
+    def get_stats(self):
+        """Get the task statistics, with the progress of the retention passes
+        
+        Returns:
+            dict: Run cost statistics, pending work and counts of the deleted rows
+        """
+        stats = super().get_stats()
+        stats.update({
+            'in_progress': self.in_progress(),
+            'pending_keys': len(self.pending),
+            'passes': self.passes,
+            'pass_deleted': self.pass_deleted,
+            'pass_batches': self.pass_batches,
+            'total_deleted': self.total_deleted,
+            'last_pass_deleted': self.last_pass_deleted,
+            'last_pass_seconds': self.last_pass_seconds,
+            'free_pages': self.free_pages
+        })
+        return stats
+    
+    def _start_pass(self):
+        """List the keys of every table to clean"""
+        now = int(time.time())
+        self.pass_started = time.monotonic()
+        self.pass_deleted = RetentionRepository.delete_expired_latest(now)
+        self.pass_batches = 0
+        self.total_deleted += self.pass_deleted
+        self.pending = [(policy, key_id, now - policy.retention_days * 86400)
+                        for policy in RETENTION_POLICIES
+                        for key_id in RetentionRepository.get_keys(policy)]
+        self.vacuum_pending = True
+        self.free_pages = None
+    
+    def _finish_pass(self):
+        """Record the statistics of the completed pass"""
+        self.vacuum_pending = False
+        self.passes += 1
+        self.last_pass_deleted = self.pass_deleted
+        self.last_pass_seconds = round(time.monotonic() - self.pass_started, 3)
+        if self.pass_deleted > 0:
+            logger.info(f"Deleted {self.pass_deleted} expired records in {self.pass_batches} batches "
+                        f"over {self.last_pass_seconds}s")
@@ -0,0 +1,206 @@
+"""
+In-memory ring buffers for PS Monitor application.
+Keeps the recent samples of every series so recent history is served without
+a database query.
+"""
+import math
+import os
+import threading
+
+from array import array
+
+# Hours of samples kept in memory for each series
+BUFFER_HOURS = float(os.environ.get('PS_MONITOR_BUFFER_HOURS', 6))
+
+
+class RingBuffer:
+    """
+    Fixed capacity buffer of the latest samples of one series.
+    
+    Timestamps and each field are stored in preallocated typed arrays (one
+    column per field), so memory use is fixed and a range read is a binary
+    search plus array slices. Once full, the oldest sample is overwritten.
+    """
+    
+    def __init__(self, capacity, fields, field_types=None):
+        """Initialize an empty buffer
+        
+        Args:
+            capacity (int): Maximum number of samples
+            fields (tuple): Names of the sampled fields
+            field_types (dict, optional): Array typecode of each field, 'd' (float) when not set
+        """
+        field_types = field_types or {}
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self.timestamps = array('q', bytes(8 * capacity))
+        self.columns = {field: array(field_types.get(field, 'd'), bytes(8 * capacity)) for field in self.fields}
+        self.converters = {field: int if column.typecode == 'q' else float
+                           for field, column in self.columns.items()}
+        self.first = 0
+        self.size = 0
+        # Newest timestamp not held by the buffer; later samples are all kept
+        self.horizon = None
+        self.lock = threading.Lock()
+    
+    def append(self, timestamp, values):
+        """Add a sample, overwriting the oldest one when full
+        
+        Args:
+            timestamp (int): Sample time as Unix epoch seconds
+            values (dict): Field values; missing fields are stored as 0
+        
+        Returns:
+            bool: False if the sample is not newer than the latest one
+        """
+        with self.lock:
+            if self.size and timestamp <= self.timestamps[(self.first + self.size - 1) % self.capacity]:
+                return False
+            if self.horizon is None:
+                # Samples older than the first one may exist in the database only
+                self.horizon = timestamp - 1
+            
+            index = (self.first + self.size) % self.capacity
+            if self.size == self.capacity:
+                self.horizon = self.timestamps[index]
+                self.first = (self.first + 1) % self.capacity
+            else:
+                self.size += 1
+            
+            self.timestamps[index] = timestamp
+            for field, column in self.columns.items():
+                column[index] = self.converters[field](values.get(field) or 0)
+            return True
+    
+    def covers(self, start):
+        """Check if the buffer holds every sample from start onwards
+        
+        Args:
+            start (int): Start of the range as Unix epoch seconds
+        
+        Returns:
+            bool: True if no sample at or after start was evicted or missed
+        """
+        return self.horizon is not None and start > self.horizon
+    
+    def latest(self):
+        """Get the latest sample
+        
+        Returns:
+            tuple: (timestamp, {field: value}), or None if the buffer is empty
+        """
+        with self.lock:
+            if not self.size:
+                return None
+            index = (self.first + self.size - 1) % self.capacity
+            return self.timestamps[index], {field: column[index] for field, column in self.columns.items()}
+    
+    def range(self, start, end, fields=None):
+        """Get the samples of a time range
+        
+        Args:
+            start (int): Start of the range (inclusive) as Unix epoch seconds
+            end (int): End of the range (exclusive) as Unix epoch seconds
+            fields (tuple, optional): Fields to return, all by default
+        
+        Returns:
+            tuple: (timestamps, {field: values}) arrays in time order
+        """
+        with self.lock:
+            first = self._search(start)
+            last = self._search(end)
+            return (self._slice(self.timestamps, first, last),
+                    {field: self._slice(self.columns[field], first, last) for field in fields or self.fields})
+    
+    def get_size_bytes(self):
+        """Get the memory used by the sample arrays
+        
+        Returns:
+            int: Size in bytes
+        """
+        return sum(column.itemsize * self.capacity for column in self.columns.values()) + 8 * self.capacity
+    
+    def _search(self, timestamp):
+        """Get the position (from the oldest sample) of the first sample at or after timestamp"""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamps[(self.first + middle) % self.capacity] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def _slice(self, column, first, last):
+        """Copy the samples between two positions, unwrapping the ring"""
+        start = (self.first + first) % self.capacity
+        count = last - first
+        if start + count <= self.capacity:
+            return column[start:start + count]
+        return column[start:] + column[:start + count - self.capacity]
+
+
+class RingBufferStore:
+    """Ring buffers of all series, by metric and instance"""
+    
+    def __init__(self, hours=BUFFER_HOURS):
+        """Initialize an empty store
+        
+        Args:
+            hours (float, optional): Hours of samples kept for each series
+        """
+        self.seconds = hours * 3600
+        self.buffers = {}
+        self.lock = threading.Lock()
+    
+    def get_or_create(self, metric, instance, interval, fields, field_types=None):
+        """Get the buffer of a series, creating it when missing
+        
+        Args:
+            metric (str): The metric (collector) name
+            instance (str): The instance, '' for single instance metrics
+            interval (float): Seconds between two samples, sizing the buffer
+            fields (tuple): Names of the sampled fields
+            field_types (dict, optional): Array typecode of each field
+        
+        Returns:
+            RingBuffer: The buffer
+        """
+        key = (metric, instance)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            with self.lock:
+                buffer = self.buffers.get(key)
+                if buffer is None:
+                    capacity = max(1, math.ceil(self.seconds / interval))
+                    buffer = self.buffers[key] = RingBuffer(capacity, fields, field_types)
+        return buffer
+    
+    def get(self, metric, instance=''):
+        """Get the buffer of a series
+        
+        Args:
+            metric (str): The metric (collector) name
+            instance (str, optional): The instance, '' for single instance metrics
+        
+        Returns:
+            RingBuffer: The buffer, or None if the series was never sampled
+        """
+        return self.buffers.get((metric, instance))
+    
+    def get_stats(self):
+        """Get the store statistics
+        
+        Returns:
+            dict: Number of series, samples held and memory used
+        """
+        buffers = list(self.buffers.values())
+        return {
+            'series': len(buffers),
+            'samples': sum(buffer.size for buffer in buffers),
+            'bytes': sum(buffer.get_size_bytes() for buffer in buffers)
+        }
+
+
+# Global instance fed by the collectors and read by the API endpoints
+ring_buffers = RingBufferStore()
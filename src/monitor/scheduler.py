@@ -0,0 +1,182 @@
+"""
+Task scheduler for PS Monitor application.
+Runs every collector and maintenance task from a single thread driven by a timer wheel.
+"""
+import logging
+import math
+import threading
+import time
+
+from data.db.disk_usage_repository import disk_usage_writer
+from data.db.timeseries_repository import timeseries_writer
+from monitor.collectors import get_default_collectors
+from monitor.retention import RetentionJob
+
+logger = logging.getLogger('Scheduler')
+
+# Seconds per timer wheel slot, the scheduling granularity
+TICK_SECONDS = 1.0
+
+# Number of slots in the timer wheel; longer delays wrap around in rounds
+WHEEL_SLOTS = 64
+
+# Maximum factor an over budget task interval is stretched by
+MAX_BACKOFF = 8
+
+
+class TaskScheduler:
+    """
+    Scheduler running all periodic tasks (collectors, retention) from one thread.
+    
+    Tasks are kept in a hashed timer wheel: each slot holds the tasks due on
+    that tick, with the number of full wheel rounds left before they fire.
+    Adding or firing a task is O(1) whatever the number of tasks. The cost of
+    every run is measured; a task over its budget has its interval doubled (up
+    to MAX_BACKOFF times), and brought back once it is cheap again, so one
+    slow source cannot starve the others.
+    """
+    
+    def __init__(self, tick=TICK_SECONDS, slots=WHEEL_SLOTS):
+        """Initialize the scheduler
+        
+        Args:
+            tick (float, optional): Seconds per wheel slot
+            slots (int, optional): Number of wheel slots
+        """
+        self.tick = tick
+        self.wheel = [[] for _ in range(slots)]
+        self.position = 0
+        self.tasks = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.scheduler_thread = None
+    
+    def add(self, task):
+        """Register a task, first run on the next tick
+        
+        Args:
+            task (ScheduledTask): The task
+        """
+        with self.lock:
+            self.tasks[task.name] = task
+            self._schedule(task, 0)
+    
+    def start(self):
+        """Start the scheduler thread"""
+        if self.scheduler_thread and self.scheduler_thread.is_alive():
+            logger.warning("Scheduler thread is already running")
+            return
+        
+        self.running = True
+        self.scheduler_thread = threading.Thread(target=self._run, name='Scheduler', daemon=True)
+        self.scheduler_thread.start()
+        logger.info(f"Scheduler started with {len(self.tasks)} tasks")
+    
+    def stop(self, timeout=10):
+        """Stop the scheduler thread
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait for a running task
+        """
+        self.running = False
+        if self.scheduler_thread and self.scheduler_thread.is_alive():
+            self.scheduler_thread.join(timeout)
+        logger.info("Scheduler stopped")
+    
+    def get_stats(self):
+        """Get the statistics of every task
+        
+        Returns:
+            dict: Task statistics by name
+        """
+        return {name: task.get_stats() for name, task in self.tasks.items()}
+    
+    def _schedule(self, task, delay):
+        """Put a task in the wheel slot due after delay seconds; the caller holds the lock"""
+        ticks = max(1, math.ceil(delay / self.tick))
+        rounds, offset = divmod(ticks - 1, len(self.wheel))
+        slot = (self.position + offset + 1) % len(self.wheel)
+        self.wheel[slot].append([rounds, task])
+    
+    def _run(self):
+        """Scheduler thread advancing the wheel one slot per tick"""
+        next_tick = time.monotonic()
+        while self.running:
+            # Ticks are absolute, so a slow run is caught up instead of drifting
+            next_tick += self.tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            
+            with self.lock:
+                self.position = (self.position + 1) % len(self.wheel)
+                due = []
+                waiting = []
+                for entry in self.wheel[self.position]:
+                    if entry[0] > 0:
+                        entry[0] -= 1
+                        waiting.append(entry)
+                    else:
+                        due.append(entry[1])
+                self.wheel[self.position] = waiting
+            
+            for task in due:
+                if not self.running:
+                    return
+                self._execute(task)
+                with self.lock:
+                    self._schedule(task, task.next_delay())
+    
+    def _execute(self, task):
+        """Run a task, recording its cost and adjusting its interval"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            task.run()
+        except Exception as e:
+            failed = True
+            task.errors += 1
+            logger.error(f"Error running task {task.name}: {e}")
+        elapsed = time.perf_counter() - start
+        elapsed_ms = elapsed * 1000
+        task.latency.observe(elapsed, failed)
+        
+        task.runs += 1
+        task.last_run = time.time()
+        task.last_ms = elapsed_ms
+        task.max_ms = max(task.max_ms, elapsed_ms)
+        task.total_ms += elapsed_ms
+        
+        if elapsed_ms > task.budget_ms:
+            task.over_budget += 1
+            backoff = min(task.current_interval * 2, task.interval * MAX_BACKOFF)
+            if backoff != task.current_interval:
+                logger.warning(f"Task {task.name} took {elapsed_ms:.1f}ms (budget {task.budget_ms}ms), "
+                               f"interval raised to {backoff}s")
+            task.current_interval = backoff
+        elif task.current_interval > task.interval:
+            task.current_interval = max(task.interval, task.current_interval / 2)
+
+
+# Global instance running the tasks of the agent
+scheduler = TaskScheduler()
+
+# Writers fed by the collectors
+writers = [disk_usage_writer, timeseries_writer]
+
+
+def start_monitoring():
+    """Start the database writers, the collectors and the retention job"""
+    for writer in writers:
+        writer.start()
+    for collector in get_default_collectors():
+        scheduler.add(collector)
+    scheduler.add(RetentionJob())
+    scheduler.start()
+
+
+def stop_monitoring():
+    """Stop the collectors and write the pending samples"""
+    scheduler.stop()
+    for writer in writers:
+        writer.stop()
@@ -0,0 +1,68 @@
+"""
+Scheduled task base class for PS Monitor application.
+Every periodic job run by the scheduler (collectors, retention) is a task.
+"""
+from monitor.instrumentation import LatencyHistogram
+
+
+class ScheduledTask:
+    """
+    Base class of the periodic tasks run by the scheduler.
+    
+    Subclasses set a name, an interval and a cost budget, and implement run().
+    The scheduler records the cost of every run in the task statistics.
+    """
+    
+    # Name of the task, unique within the scheduler
+    name = None
+    
+    # Seconds between two runs
+    interval = 60
+    
+    # Milliseconds a run may take before the scheduler backs off
+    budget_ms = 100
+    
+    def __init__(self):
+        """Initialize the task statistics"""
+        self.current_interval = self.interval
+        self.runs = 0
+        self.errors = 0
+        self.over_budget = 0
+        self.last_run = None
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+        self.latency = LatencyHistogram()
+    
+    def run(self):
+        """Run the task once"""
+        raise NotImplementedError
+    
+    def next_delay(self):
+        """Get the number of seconds until the next run
+        
+        Returns:
+            float: The delay, the current interval by default
+        """
+        return self.current_interval
+    
+    def get_stats(self):
+        """Get the task statistics
+        
+        Returns:
+            dict: Interval, run count and run cost statistics, and the run
+                latency histogram
+        """
+        return {
+            'interval': self.interval,
+            'current_interval': self.current_interval,
+            'budget_ms': self.budget_ms,
+            'runs': self.runs,
+            'errors': self.errors,
+            'over_budget': self.over_budget,
+            'last_run': self.last_run,
+            'last_ms': round(self.last_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'avg_ms': round(self.total_ms / self.runs, 3) if self.runs else 0,
+            'latency': self.latency.get_stats()
+        }
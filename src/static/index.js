@@ -1,38 +1,125 @@
 $(function() {
-    // Load system information
-    $.getJSON('/api/system/info')
-        .done(function(data) {
-            let html = '<table class="table table-bordered table-striped mt-2">';
-            html += '<thead><tr class="table-primary"><th colspan="2" class="text-center">OS</th></tr></thead><tbody>';
-            html += `<tr><td>Name</td><td>${data.os.name}</td></tr>`;
-            html += '<tr class="table-primary"><th colspan="2" class="text-center">Platform</th></tr>';
-            $.each(data.platform, function(key, value) {
-                html += `<tr><td>${key.charAt(0).toUpperCase() + key.slice(1)}</td><td>${value}</td></tr>`;
-            });
-            html += '</tbody></table>';
-            $('#info').html(html);
-        })
-        .fail(function() {
-            $('#info').html('<div class="alert alert-danger text-center">Error loading system information.</div>');
+    // Latest metrics received from the snapshot or the stream, updated with each delta
+    let metrics = null;
+    let streaming = false;
+
+    // First paint from a single snapshot request, then follow the live stream
+    loadMetrics();
+
+    if (window.EventSource) {
+        const stream = new EventSource('/api/stream');
+        stream.addEventListener('snapshot', function(event) {
+            streaming = true;
+            metrics = JSON.parse(event.data);
+            displayMetrics(metrics);
         });
+        stream.addEventListener('delta', function(event) {
+            const delta = JSON.parse(event.data);
+            mergeDelta(metrics, delta);
+            displayMetrics(delta);
+        });
+        stream.onerror = function() {
+            // The browser reconnects by itself unless the stream is not available at all
+            if (stream.readyState === EventSource.CLOSED) {
+                streaming = false;
+                loadMetrics();
+            }
+        };
+    }
+
+    // Function to load all metrics at once with the snapshot endpoint
+    function loadMetrics() {
+        $.getJSON('/api/snapshot?fields=system,disk,disk_io,memory,cpu,network,processes')
+            .done(function(data) {
+                // The stream snapshot may have arrived first and is at least as recent
+                if (!streaming) {
+                    metrics = data;
+                    displayMetrics(metrics);
+                }
+            })
+            .fail(function() {
+                $('#info').html('<div class="alert alert-danger text-center">Error loading system information.</div>');
+                $('#disk-usage').html('<div class="alert alert-danger text-center">Error loading disk information.</div>');
+                $('#memory-usage').html('<div class="alert alert-danger text-center">Error loading memory information.</div>');
+                $('#cpu-usage').html('<div class="alert alert-danger text-center">Error loading CPU information.</div>');
+                $('#network-usage').html('<div class="alert alert-danger text-center">Error loading network information.</div>');
+                $('#processes').html('<div class="alert alert-danger text-center">Error loading process information.</div>');
+            });
+    }
+
+    // Element and name of every section, to report the sections that could not be collected
+    const sections = {
+        system: ['#info', 'system'],
+        disk: ['#disk-usage', 'disk'],
+        disk_io: ['#disk-io', 'disk I/O'],
+        memory: ['#memory-usage', 'memory'],
+        cpu: ['#cpu-usage', 'CPU'],
+        network: ['#network-usage', 'network'],
+        processes: ['#processes', 'process']
+    };
+
+    // Function to redraw the sections present in the changed fields
+    function displayMetrics(changed) {
+        if (changed.system && !displaySectionError('system')) {
+            displaySystemInfo(metrics.system);
+        }
+        if (changed.disk && !displaySectionError('disk')) {
+            displayDiskUsageTable({ disks: Object.values(metrics.disk) });
+        }
+        if (changed.disk_io && !displaySectionError('disk_io')) {
+            displayDiskIOTable(Object.values(metrics.disk_io));
+        }
+        if (changed.memory && !displaySectionError('memory')) {
+            displayMemoryUsageTable(metrics.memory);
+        }
+        if (changed.cpu && !displaySectionError('cpu')) {
+            displayCpuUsage(metrics.cpu);
+        }
+        if (changed.network && !displaySectionError('network')) {
+            displayNetworkUsageTable(Object.values(metrics.network));
+        }
+        if (changed.processes && !displaySectionError('processes')) {
+            displayProcessTable(metrics.processes);
+        }
+    }
+
+    // Function to display the error of a section that could not be collected
+    function displaySectionError(field) {
+        const data = metrics[field];
+        if (!$.isPlainObject(data) || typeof data.error !== 'string') {
+            return false;
+        }
+        const section = sections[field];
+        $(section[0]).html(`<div class="alert alert-danger text-center">Error loading ${section[1]} information: ` +
+                           `${escapeHtml(data.error)}</div>`);
+        return true;
+    }
 
-    // Load and display disk usage information
-    $.getJSON('/api/disk/usage')
-        .done(function(data) {
-            displayDiskUsageTable(data);
-        })
-        .fail(function() {
-            $('#disk-usage').html('<div class="alert alert-danger text-center">Error loading disk information.</div>');
+    // Function to apply the changed fields to the current metrics (null means removed)
+    function mergeDelta(target, delta) {
+        $.each(delta, function(key, value) {
+            if (value === null) {
+                delete target[key];
+            } else if ($.isPlainObject(value) && $.isPlainObject(target[key])) {
+                mergeDelta(target[key], value);
+            } else {
+                target[key] = value;
+            }
         });
+    }
 
-    // Load and display memory usage information
-    $.getJSON('/api/memory/usage')
-        .done(function(data) {
-            displayMemoryUsageTable(data);
-        })
-        .fail(function() {
-            $('#memory-usage').html('<div class="alert alert-danger text-center">Error loading memory information.</div>');
+    // Function to display system information
+    function displaySystemInfo(data) {
+        let html = '<table class="table table-bordered table-striped mt-2">';
+        html += '<thead><tr class="table-primary"><th colspan="2" class="text-center">OS</th></tr></thead><tbody>';
+        html += `<tr><td>Name</td><td>${data.os.name}</td></tr>`;
+        html += '<tr class="table-primary"><th colspan="2" class="text-center">Platform</th></tr>';
+        $.each(data.platform, function(key, value) {
+            html += `<tr><td>${key.charAt(0).toUpperCase() + key.slice(1)}</td><td>${value}</td></tr>`;
         });
+        html += '</tbody></table>';
+        $('#info').html(html);
+    }
 
     // Function to format bytes into readable format
     function formatBytes(bytes, decimals = 2) {
@@ -62,7 +149,7 @@ $(function() {
         data.disks.forEach(function(disk) {
             html += '<tr>';
             html += `<td>${disk.device}</td>`;
-            html += `<td>${disk.mountpoint}</td>`;
+            html += `<td>${disk.mountpoint}${disk.stale ? ' <span class="badge bg-warning text-dark">stale</span>' : ''}</td>`;
             html += `<td>${formatBytes(disk.total)}</td>`;
             html += `<td>${formatBytes(disk.used)}</td>`;
             html += `<td>${formatBytes(disk.free)}</td>`;
@@ -78,6 +165,34 @@ $(function() {
         $('#disk-usage').html(html);
     }
     
+    // Function to display the I/O rates of the block devices
+    function displayDiskIOTable(devices) {
+        if (devices.length === 0) {
+            $('#disk-io').empty();
+            return;
+        }
+
+        let html = '<table class="table table-bordered table-striped mt-2">';
+        html += '<thead><tr class="table-success">';
+        html += '<th>Device</th><th>Mount Points</th><th>Read/s</th><th>Write/s</th><th>IOPS (r/w)</th><th>Await ms (r/w)</th><th>Utilization</th>';
+        html += '</tr></thead><tbody>';
+
+        devices.forEach(function(device) {
+            html += '<tr>';
+            html += `<td>${device.device}</td>`;
+            html += `<td>${device.mountpoints.join(', ')}</td>`;
+            html += `<td>${formatBytes(device.read_bytes_per_sec)}</td>`;
+            html += `<td>${formatBytes(device.write_bytes_per_sec)}</td>`;
+            html += `<td>${device.read_iops} / ${device.write_iops}</td>`;
+            html += `<td>${device.read_await_ms} / ${device.write_await_ms}</td>`;
+            html += `<td>${usageBar(device.utilization, 'bg-success', 20)}</td>`;
+            html += '</tr>';
+        });
+
+        html += '</tbody></table>';
+        $('#disk-io').html(html);
+    }
+    
     // Function to display memory usage table
     function displayMemoryUsageTable(data) {
         if (!data || data.error) {
@@ -124,4 +239,109 @@ $(function() {
         html += '</tbody></table>';
         $('#memory-usage').html(html);
     }
+
+    // Function to render a utilization percentage as a progress bar
+    function usageBar(percent, color, height) {
+        let html = `<div class="progress" style="height: ${height}px;">`;
+        html += `<div class="progress-bar ${percent > 90 ? 'bg-danger' : percent > 70 ? 'bg-warning' : color}" `;
+        html += `role="progressbar" style="width: ${percent}%;" `;
+        html += `aria-valuenow="${percent}" aria-valuemin="0" aria-valuemax="100">${height >= 20 ? percent + '%' : ''}</div>`;
+        html += '</div>';
+        return html;
+    }
+
+    // Function to display CPU utilization, load averages and per-core usage
+    function displayCpuUsage(data) {
+        if (!data || data.error) {
+            $('#cpu-usage').html('<div class="alert alert-warning text-center">No CPU information available.' +
+                                 (data && data.error ? ` Error: ${data.error}` : '') + '</div>');
+            return;
+        }
+
+        let html = usageBar(data.percent_used, 'bg-dark', 20);
+        html += '<table class="table table-bordered table-striped mt-3">';
+        html += '<thead><tr class="table-dark">';
+        html += '<th>User</th><th>System</th><th>I/O Wait</th><th>Steal</th><th>Load (1, 5, 15 min)</th>';
+        html += '</tr></thead><tbody><tr>';
+        html += `<td>${data.user}%</td><td>${data.system}%</td><td>${data.iowait}%</td><td>${data.steal}%</td>`;
+        html += `<td>${data.load_1}, ${data.load_5}, ${data.load_15}</td>`;
+        html += '</tr></tbody></table>';
+
+        if (data.cores && data.cores.names.length > 1) {
+            html += '<div class="row g-2">';
+            data.cores.names.forEach(function(name, index) {
+                const percent = data.cores.percent_used[index];
+                html += `<div class="col-3 small" title="${name}: ${percent}%">${name}${usageBar(percent, 'bg-secondary', 8)}</div>`;
+            });
+            html += '</div>';
+        }
+        $('#cpu-usage').html(html);
+    }
+
+    // Function to display the traffic of the network interfaces
+    function displayNetworkUsageTable(interfaces) {
+        if (interfaces.length === 0) {
+            $('#network-usage').html('<div class="alert alert-warning text-center">No network information available.</div>');
+            return;
+        }
+
+        let html = '<table class="table table-bordered table-striped mt-2">';
+        html += '<thead><tr class="table-warning">';
+        html += '<th>Interface</th><th>Received/s</th><th>Sent/s</th><th>Packets/s (rx/tx)</th><th>Errors/s</th><th>Drops/s</th><th>Utilization</th>';
+        html += '</tr></thead><tbody>';
+
+        interfaces.forEach(function(iface) {
+            html += '<tr>';
+            html += `<td>${escapeHtml(iface.interface)}${iface.speed_mbps ? ` <span class="badge bg-secondary">${iface.speed_mbps} Mb/s</span>` : ''}</td>`;
+            html += `<td>${formatBytes(iface.rx_bytes_per_sec)}</td>`;
+            html += `<td>${formatBytes(iface.tx_bytes_per_sec)}</td>`;
+            html += `<td>${iface.rx_packets_per_sec} / ${iface.tx_packets_per_sec}</td>`;
+            html += `<td>${(iface.rx_errors_per_sec + iface.tx_errors_per_sec).toFixed(2)}</td>`;
+            html += `<td>${(iface.rx_drops_per_sec + iface.tx_drops_per_sec).toFixed(2)}</td>`;
+            html += `<td>${iface.utilization === null ? 'n/a' : usageBar(iface.utilization, 'bg-warning', 20)}</td>`;
+            html += '</tr>';
+        });
+
+        html += '</tbody></table>';
+        $('#network-usage').html(html);
+    }
+
+    // Function to escape text from the monitored host (process names, command lines)
+    function escapeHtml(text) {
+        return $('<div>').text(text).html();
+    }
+
+    // Function to display the top processes table
+    function displayProcessTable(data) {
+        if (!data || data.error) {
+            $('#processes').html('<div class="alert alert-warning text-center">No process information available.' +
+                                 (data && data.error ? ` Error: ${escapeHtml(data.error)}` : '') + '</div>');
+            return;
+        }
+
+        // Processes are keyed by pid; deltas do not preserve their order
+        const processes = Object.values(data.processes).sort(function(a, b) {
+            return b.cpu_percent - a.cpu_percent;
+        });
+
+        let html = `<p class="mb-2">${data.count} processes, ${data.running} running, ${data.threads} threads</p>`;
+        html += '<table class="table table-bordered table-striped table-sm mt-2">';
+        html += '<thead><tr class="table-secondary">';
+        html += '<th>PID</th><th>Name</th><th>User</th><th>State</th><th>CPU %</th><th>Memory</th>';
+        html += '</tr></thead><tbody>';
+
+        processes.forEach(function(process) {
+            html += '<tr>';
+            html += `<td>${process.pid}</td>`;
+            html += `<td title="${escapeHtml(process.cmdline)}">${escapeHtml(process.name)}</td>`;
+            html += `<td>${escapeHtml(process.user)}</td>`;
+            html += `<td>${process.state}</td>`;
+            html += `<td>${process.cpu_percent.toFixed(1)}</td>`;
+            html += `<td>${formatBytes(process.rss)}</td>`;
+            html += '</tr>';
+        });
+
+        html += '</tbody></table>';
+        $('#processes').html(html);
+    }
 });
@@ -0,0 +1,49 @@
+"""
+HTTP caching helpers for the PS Monitor web server.
+
+Entity tags and compression shared by the API responses and the static assets.
+"""
+import gzip
+import hashlib
+
+# Responses smaller than this many bytes are not worth compressing
+GZIP_MIN_SIZE = 1024
+
+
+def compute_etag(body):
+    """Compute the entity tag of a response body
+    
+    Args:
+        body (bytes): The response body
+    
+    Returns:
+        str: The quoted entity tag
+    """
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def gzip_etag(etag):
+    """Get the entity tag of the gzip representation of a body
+    
+    Args:
+        etag (str): The quoted entity tag of the uncompressed body
+    
+    Returns:
+        str: The quoted entity tag
+    """
+    return etag[:-1] + '-gzip"'
+
+
+def compress(body, level=6):
+    """Gzip compress a response body
+    
+    The header timestamp is left empty so equal bodies give equal bytes.
+    
+    Args:
+        body (bytes): The response body
+        level (int, optional): Compression level, from 1 (fastest) to 9 (smallest)
+    
+    Returns:
+        bytes: The compressed body
+    """
+    return gzip.compress(body, compresslevel=level, mtime=0)
@@ -6,14 +6,205 @@ handling the server lifecycle and request processing.
 """
 import logging
 import os
+import queue
+import select
 import socketserver
+import threading
 
 from web.request_handler import RequestHandler
+from web.static_assets import static_assets
 
 logger = logging.getLogger('HttpServer')
 
 HTTP_PORT = int(os.environ.get('PS_MONITOR_PORT', 8000))
 
+# Concurrency mode: 'threaded' (bounded worker pool) or 'single' (one request at a time)
+HTTP_MODE = os.environ.get('PS_MONITOR_HTTP_MODE', 'threaded')
+HTTP_WORKERS = int(os.environ.get('PS_MONITOR_HTTP_WORKERS', 16))
+HTTP_QUEUE_SIZE = int(os.environ.get('PS_MONITOR_HTTP_QUEUE_SIZE', 128))
+
+# Response sent to connections that arrive while the pending queue is full
+OVERLOADED_RESPONSE = (
+    b'HTTP/1.1 503 Service Unavailable\r\n'
+    b'Content-Type: text/plain\r\n'
+    b'Content-Length: 20\r\n'
+    b'Retry-After: 1\r\n'
+    b'Connection: close\r\n'
+    b'\r\n'
+    b'Server overloaded.\r\n'
+)
+
+
+class DetachableRequestsMixin:
+    """
+    Mixin letting a handler take over its connection.
+    
+    A detached connection is not closed when its handler returns; its new owner
+    (e.g. the metric stream) becomes responsible for closing it.
+    """
+    
+    def detach_request(self, request):
+        """Keep the connection open after its handler returns."""
+        with self.detached_lock:
+            self.detached.add(request)
+    
+    def shutdown_request(self, request):
+        """Close the connection unless it was detached."""
+        with self.detached_lock:
+            if request in self.detached:
+                self.detached.discard(request)
+                return
+        super().shutdown_request(request)
+
+
+class SingleThreadedHTTPServer(DetachableRequestsMixin, socketserver.TCPServer):
+    """TCP server that handles one connection at a time."""
+    
+    allow_reuse_address = True
+    
+    def __init__(self, server_address, handler_class):
+        """
+        Initialize the server.
+        
+        Args:
+            server_address (tuple): Host and port to bind to.
+            handler_class: The request handler class.
+        """
+        self.detached = set()
+        self.detached_lock = threading.Lock()
+        super().__init__(server_address, handler_class)
+    
+    def get_stats(self):
+        """Get the server concurrency statistics
+        
+        Returns:
+            dict: Server mode, worker and queue information
+        """
+        return {
+            'mode': 'single',
+            'workers': 1,
+            'active': 0,
+            'queue_depth': 0,
+            'queue_capacity': 0,
+            'rejected': 0
+        }
+    
+    def has_pending_requests(self):
+        """Check if connections are waiting to be accepted."""
+        readable, _, _ = select.select([self.socket], [], [], 0)
+        return bool(readable)
+
+
+class ThreadPoolHTTPServer(DetachableRequestsMixin, socketserver.TCPServer):
+    """
+    TCP server that dispatches connections to a bounded pool of worker threads.
+    
+    Accepted connections wait in a bounded queue until a worker is free. When the
+    queue is full, new connections are answered with 503 and closed right away,
+    so a burst of clients cannot grow memory or latency without limit.
+    """
+    
+    allow_reuse_address = True
+    
+    def __init__(self, server_address, handler_class, workers=HTTP_WORKERS, queue_size=HTTP_QUEUE_SIZE):
+        """
+        Initialize the server and start its worker threads.
+        
+        Args:
+            server_address (tuple): Host and port to bind to.
+            handler_class: The request handler class.
+            workers (int, optional): Number of worker threads.
+            queue_size (int, optional): Maximum number of connections waiting for a worker.
+        """
+        self.request_queue_size = queue_size
+        self.detached = set()
+        self.detached_lock = threading.Lock()
+        super().__init__(server_address, handler_class)
+        
+        self.workers = workers
+        self.pending = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.rejected = 0
+        self.threads = []
+        
+        for index in range(workers):
+            thread = threading.Thread(target=self._worker, name=f'HttpWorker-{index}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def process_request(self, request, client_address):
+        """Queue the connection for a worker, or reject it if the queue is full."""
+        try:
+            self.pending.put_nowait((request, client_address))
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            self._reject(request)
+    
+    def _reject(self, request):
+        """Answer an overload response and close the connection."""
+        try:
+            request.settimeout(1)
+            request.sendall(OVERLOADED_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+    
+    def _worker(self):
+        """Worker thread loop processing queued connections."""
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            
+            request, client_address = item
+            with self.lock:
+                self.active += 1
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self.lock:
+                    self.active -= 1
+    
+    def has_pending_requests(self):
+        """Check if connections are waiting for a worker, with every worker busy.
+        
+        A connection only queued for the instant before an idle worker takes it
+        does not count, so idle keep-alive connections are not closed for it.
+        """
+        with self.lock:
+            return self.active >= self.workers and not self.pending.empty()
+    
+    def get_stats(self):
+        """Get the server concurrency statistics
+        
+        Returns:
+            dict: Server mode, worker and queue information
+        """
+        with self.lock:
+            return {
+                'mode': 'threaded',
+                'workers': self.workers,
+                'active': self.active,
+                'queue_depth': self.pending.qsize(),
+                'queue_capacity': self.pending.maxsize,
+                'rejected': self.rejected
+            }
+    
+    def server_close(self):
+        """Stop the worker threads and close the listening socket."""
+        super().server_close()
+        for _ in self.threads:
+            try:
+                self.pending.put_nowait(None)
+            except queue.Full:
+                break
+
+
 class HttpServer:
     """
     Server class for the PS Monitor application.
@@ -21,26 +212,38 @@ class HttpServer:
     Handles server lifecycle including setup, startup, and shutdown.
     """
     
-    def __init__(self, host="", port=HTTP_PORT):
+    def __init__(self, host="", port=HTTP_PORT, mode=HTTP_MODE, workers=HTTP_WORKERS, queue_size=HTTP_QUEUE_SIZE):
         """
         Initialize the server with host and port.
         
         Args:
             host (str): Host address to bind to. Empty string means all interfaces.
             port (int, optional): Port to listen on. Defaults to the configured PORT.
+            mode (str, optional): Concurrency mode, either 'threaded' or 'single'.
+            workers (int, optional): Number of worker threads in threaded mode.
+            queue_size (int, optional): Maximum number of connections waiting for a worker.
         """
         self.host = host
         self.port = port
+        self.mode = mode
+        self.workers = workers
+        self.queue_size = queue_size
         self.httpd = None
     
     def create_server(self):
         """
-        Create the TCPServer instance.
+        Create the TCPServer instance for the configured concurrency mode.
         
         Returns:
             socketserver.TCPServer: The configured server instance.
         """
-        return socketserver.TCPServer((self.host, self.port), RequestHandler)
+        if self.mode == 'single':
+            return SingleThreadedHTTPServer((self.host, self.port), RequestHandler)
+        
+        if self.mode != 'threaded':
+            logger.warning(f"Unknown HTTP mode '{self.mode}', using 'threaded'")
+        return ThreadPoolHTTPServer((self.host, self.port), RequestHandler,
+                                    workers=self.workers, queue_size=self.queue_size)
     
     def run(self, startup_callback=None):
         """Run the server and handle the server lifecycle.
@@ -49,9 +252,12 @@ class HttpServer:
             startup_callback (callable, optional): Callback function to be called after server startup.
                 The callback will receive the startup time in milliseconds as an argument.
         """
+        static_assets.start()
         self.httpd = self.create_server()
-
-        logger.info(f"Server running at http://localhost:{self.port}")
+        
+        stats = self.httpd.get_stats()
+        logger.info(f"Server running at http://localhost:{self.port} "
+                    f"(mode: {stats['mode']}, workers: {stats['workers']}, queue: {stats['queue_capacity']})")
         
         # Call the startup callback with the startup time if provided
         if startup_callback:
@@ -5,44 +5,123 @@ This module defines the HTTP request handler for the PS Monitor application,
 which processes API requests and serves static files.
 """
 import http.server
+import json
 import os
+import select
+import time
+
+from urllib.parse import parse_qs, urlsplit
 
 from api.system_info import handle_system_info_request
+from api.cpu_usage import handle_cpu_usage_request
 from api.disk_usage import handle_disk_usage_request
+from api.disk_history import handle_disk_history_request
+from api.disk_io import handle_disk_io_request
+from api.fleet import handle_fleet_agents_request, handle_fleet_disk_top_request, handle_fleet_snapshot_request
 from api.memory_usage import handle_memory_usage_request
+from api.network_usage import handle_network_usage_request
+from api.processes import handle_processes_request
+from api.internal_stats import handle_internal_stats_request, handle_profile_request
+from api.metric_stream import handle_stream_request
+from api.metrics import handle_metrics_request
+from api.snapshot import handle_snapshot_request
+from monitor.instrumentation import instrumentation
+from web.http_cache import GZIP_MIN_SIZE, compress, compute_etag, gzip_etag
+from web.static_assets import static_assets
+
+# Seconds an idle persistent connection is kept open waiting for the next request
+KEEP_ALIVE_TIMEOUT = int(os.environ.get('PS_MONITOR_KEEP_ALIVE_TIMEOUT', 5))
+
+# Seconds between two checks for waiting connections while a persistent connection is idle
+IDLE_POLL_INTERVAL = 0.1
+
+# Cache-Control of static assets requested with their current content fingerprint (?v=...)
+FINGERPRINTED_CACHE_CONTROL = 'public, max-age=31536000, immutable'
 
-STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+# Handlers of the API endpoints by path
+API_ROUTES = {
+    '/api/system/info': handle_system_info_request,
+    '/api/disk/usage': handle_disk_usage_request,
+    '/api/disk/history': handle_disk_history_request,
+    '/api/disk/io': handle_disk_io_request,
+    '/api/memory/usage': handle_memory_usage_request,
+    '/api/cpu/usage': handle_cpu_usage_request,
+    '/api/network/usage': handle_network_usage_request,
+    '/api/processes': handle_processes_request,
+    '/api/snapshot': handle_snapshot_request,
+    '/api/stream': handle_stream_request,
+    '/api/fleet/agents': handle_fleet_agents_request,
+    '/api/fleet/snapshot': handle_fleet_snapshot_request,
+    '/api/fleet/disk/top': handle_fleet_disk_top_request,
+    '/api/internal/stats': handle_internal_stats_request,
+    '/api/internal/profile': handle_profile_request,
+}
 
 
-class RequestHandler(http.server.SimpleHTTPRequestHandler):
+class RequestHandler(http.server.BaseHTTPRequestHandler):
     """
     Handler for HTTP requests to the PS Monitor web server.
     
-    Handles API endpoint requests and serves static files from the configured directory.
+    Handles API endpoint requests and serves static files from the in-memory asset table.
+    Connections are persistent (HTTP/1.1 keep-alive) until they stay idle for
+    KEEP_ALIVE_TIMEOUT seconds or the server has other connections waiting,
+    whether they are idle or sending a response.
     """
     
-    def __init__(self, *args, **kwargs):
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE_TIMEOUT
+    disable_nagle_algorithm = True
+    
+    def handle(self):
         """
-        Initialize the handler with the static directory.
+        Handle the requests of a connection until it is closed.
         
-        Args:
-            *args: Variable length argument list.
-            **kwargs: Arbitrary keyword arguments.
+        Between two requests, the connection is closed as soon as it is idle
+        and other connections are waiting for a worker.
         """
-        super().__init__(*args, directory=STATIC_DIR, **kwargs)
-
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self._wait_for_request():
+            self.handle_one_request()
+    
     def do_GET(self):
         """
         Handle GET requests.
         
         Routes requests to appropriate handlers based on path:
         - API endpoints (/api/...)
+        - Prometheus metrics (/metrics)
         - Static resources (/static/...)
         - Root path (/)
         - Other paths
+        
+        The latency and status of every request are recorded by route.
+        """
+        started = time.perf_counter()
+        self.status = None
+        try:
+            if self._is_api_request():
+                self._handle_api_request()
+            elif self._is_metrics_path():
+                handle_metrics_request(self)
+            elif self._is_static_resource():
+                self._handle_static_resource()
+            elif self._is_root_path():
+                self._handle_root_path()
+            else:
+                self._handle_default_request()
+        finally:
+            status = self.status
+            instrumentation.observe('requests', self._get_route(), time.perf_counter() - started,
+                                    error=status is None or status >= 500)
+            instrumentation.increment('requests', f'{status // 100}xx' if status else 'no_response')
+    
+    def do_HEAD(self):
+        """
+        Handle HEAD requests, for static resources only.
         """
         if self._is_api_request():
-            self._handle_api_request()
+            self.send_error(405, "Method not allowed")
         elif self._is_static_resource():
             self._handle_static_resource()
         elif self._is_root_path():
@@ -50,10 +129,169 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
         else:
             self._handle_default_request()
     
+    def send_response(self, code, message=None):
+        """
+        Send the status line, keeping the status for the request statistics.
+        """
+        self.status = code
+        super().send_response(code, message)
+    
+    def end_headers(self):
+        """
+        Finish the response headers.
+        
+        Asks the client to close the connection when other connections are waiting
+        for a worker, so persistent connections cannot starve the queue.
+        """
+        if not self.close_connection and self.server.has_pending_requests():
+            self.send_header('Connection', 'close')
+        super().end_headers()
+    
+    def log_error(self, format, *args):
+        """Log an error, skipping idle persistent connections timing out."""
+        if format.startswith('Request timed out'):
+            return
+        super().log_error(format, *args)
+    
+    def send_json(self, data, status=200):
+        """
+        Send a JSON response.
+        
+        Args:
+            data: JSON serializable response data.
+            status (int, optional): HTTP status code.
+        """
+        self.send_body(json.dumps(data).encode('utf-8'), 'application/json', status)
+    
+    def send_body(self, body, content_type, status=200, cache_control='no-cache'):
+        """
+        Send a response body with an explicit Content-Length.
+        
+        Successful responses carry an ETag computed from the body; when it matches
+        the If-None-Match request header, a 304 Not Modified is sent without the
+        body. Bodies of at least GZIP_MIN_SIZE bytes are gzip compressed for
+        clients accepting it.
+        
+        Args:
+            body (bytes): The response body.
+            content_type (str): The Content-Type header value.
+            status (int, optional): HTTP status code.
+            cache_control (str, optional): The Cache-Control header value of
+                successful responses; 'no-cache' lets clients cache but revalidate.
+        """
+        if status != 200:
+            self._send_headers(status, content_type, len(body))
+            self.wfile.write(body)
+            return
+        
+        etag = compute_etag(body)
+        gzipped = len(body) >= GZIP_MIN_SIZE and self._accepts_gzip()
+        if self._etag_matches(etag):
+            # A 304 carries the entity tag of the representation the 200 would have sent
+            self._send_not_modified(gzip_etag(etag) if gzipped else etag, cache_control)
+        elif gzipped:
+            body = compress(body)
+            self._send_headers(status, content_type, len(body), gzip_etag(etag), cache_control, 'gzip')
+            self.wfile.write(body)
+        else:
+            self._send_headers(status, content_type, len(body), etag, cache_control)
+            self.wfile.write(body)
+    
+    def send_asset(self, asset, cache_control='no-cache'):
+        """
+        Send a static asset, with the same caching rules as send_body.
+        
+        The precompressed variant is sent to clients accepting gzip. Assets not
+        held in memory are sent from their file with sendfile.
+        
+        Args:
+            asset (StaticAsset): The asset.
+            cache_control (str, optional): The Cache-Control header value.
+        """
+        head = self.command == 'HEAD'
+        gzipped = asset.gzip_body is not None and self._accepts_gzip()
+        if self._etag_matches(asset.etag):
+            self._send_not_modified(asset.gzip_etag if gzipped else asset.etag, cache_control)
+        elif gzipped:
+            self._send_headers(200, asset.content_type, len(asset.gzip_body), asset.gzip_etag, cache_control, 'gzip')
+            if not head:
+                self.wfile.write(asset.gzip_body)
+        else:
+            f = None
+            if asset.body is None and not head:
+                # Opened before the headers are sent, to check the file still has the loaded size
+                f = static_assets.open_file(asset)
+                if f is None:
+                    self.send_error(500, "Static file changed while being served")
+                    return
+            self._send_headers(200, asset.content_type, asset.size, asset.etag, cache_control)
+            if head:
+                return
+            if f is None:
+                self.wfile.write(asset.body)
+            else:
+                # Zero-copy from the page cache to the socket
+                with f:
+                    self.connection.sendfile(f, 0, asset.size)
+    
+    def _send_headers(self, status, content_type, length, etag=None, cache_control=None, encoding=None):
+        """Send the status line and the headers of a response with a body."""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(length))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if etag:
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+    
+    def _send_not_modified(self, etag, cache_control):
+        """Send a 304 Not Modified response."""
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+    
+    def _wait_for_request(self):
+        """
+        Wait for the next request of a persistent connection.
+        
+        Returns:
+            bool: A request arrived (or the client closed the connection); False if
+                the connection stayed idle for KEEP_ALIVE_TIMEOUT seconds or other
+                connections are waiting for a worker.
+        """
+        # A request already read into the buffer would not wake up select
+        self.connection.settimeout(0)
+        try:
+            if self.rfile.peek(1):
+                return True
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+        
+        deadline = time.monotonic() + self.timeout
+        while not self.server.has_pending_requests():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.connection], [], [], min(remaining, IDLE_POLL_INTERVAL))
+            if readable:
+                return True
+        return False
+    
     def _is_api_request(self):
         """Check if the request is for an API endpoint."""
         return self.path.startswith('/api/')
     
+    def _is_metrics_path(self):
+        """Check if the request is for the Prometheus metrics."""
+        return self.path.split('?', 1)[0] == '/metrics'
+    
     def _is_static_resource(self):
         """Check if the request is for a static resource."""
         return self.path.startswith('/static/')
@@ -62,28 +300,75 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
         """Check if the request is for the root path."""
         return self.path == '/'
     
+    def _get_route(self):
+        """Get the route of the request, one of a bounded set of names for the statistics."""
+        if self._is_api_request():
+            path = self.path.split('?', 1)[0]
+            return path if path in API_ROUTES else '/api/*'
+        if self._is_metrics_path():
+            return '/metrics'
+        if self._is_static_resource():
+            return '/static/*'
+        if self._is_root_path():
+            return '/'
+        return 'other'
+    
     def _handle_api_request(self):
         """Handle API endpoint requests."""
-        if self.path == '/api/system/info':
-            handle_system_info_request(self)
-        elif self.path == '/api/disk/usage':
-            handle_disk_usage_request(self)
-        elif self.path == '/api/memory/usage':
-            handle_memory_usage_request(self)
-        else:
+        # Route on the path only; handlers parse their own query parameters
+        handler = API_ROUTES.get(self.path.split('?', 1)[0])
+        if handler is None:
             self.send_error(404, "API endpoint not found")
+            return
+        
+        handler(self)
     
     def _handle_static_resource(self):
         """Handle static resource requests."""
-        # Rewrite path to remove /static prefix
-        self.path = self.path[7:]  # Remove '/static/' prefix
-        super().do_GET()
+        # Remove the /static prefix
+        self._send_static_file(self.path[7:])
     
     def _handle_root_path(self):
         """Handle root path requests."""
-        self.path = '/index.html'
-        super().do_GET()
+        self._send_static_file('/index.html')
     
     def _handle_default_request(self):
         """Handle all other requests."""
-        super().do_GET()
+        self._send_static_file(self.path)
+    
+    def _send_static_file(self, path):
+        """
+        Send a file of the static directory.
+        
+        Files requested with their current fingerprint (?v=...) never change
+        under the same URL and are cached for a year; others, including
+        requests with the fingerprint of an older version, are revalidated
+        with their ETag.
+        
+        Args:
+            path (str): The URL path, relative to the static directory.
+        """
+        url = urlsplit(path)
+        asset = static_assets.get(url.path)
+        if asset is None:
+            self.send_error(404, "File not found")
+            return
+        
+        fingerprinted = parse_qs(url.query).get('v', [None])[0] == asset.fingerprint
+        self.send_asset(asset, FINGERPRINTED_CACHE_CONTROL if fingerprinted else 'no-cache')
+    
+    def _etag_matches(self, etag):
+        """Check if the If-None-Match request header matches an entity tag of any encoding."""
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        tags = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+        return '*' in tags or etag in tags or gzip_etag(etag) in tags
+    
+    def _accepts_gzip(self):
+        """Check if the Accept-Encoding request header allows gzip."""
+        for coding in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = coding.partition(';')
+            if name.strip().lower() in ('gzip', '*'):
+                return params.replace(' ', '').lower() not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+        return False
@@ -0,0 +1,205 @@
+"""
+Static asset table for the PS Monitor web server.
+
+Loads the static directory in memory at startup, with each file ready to be
+sent as is: content type, entity tag and precompressed gzip variant.
+"""
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from web.http_cache import GZIP_MIN_SIZE, compress, compute_etag, gzip_etag
+
+logger = logging.getLogger('StaticAssets')
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+
+# Files of at least this many bytes are not kept in memory but sent with sendfile
+SENDFILE_MIN_SIZE = 256 * 1024
+
+# Reload assets when their files change, for frontend development
+STATIC_DEV = os.environ.get('PS_MONITOR_STATIC_DEV', '').lower() in ('1', 'true', 'yes')
+
+# Seconds between two checks of the static files in development mode
+DEV_POLL_INTERVAL = 1
+
+# Static asset URLs in HTML pages, fingerprinted with the asset entity tag
+STATIC_URL_PATTERN = re.compile(rb'(["\'])/static/([\w.\-/]+)\1')
+
+
+class StaticAsset:
+    """A static file ready to be sent"""
+    
+    __slots__ = ('file_path', 'content_type', 'size', 'etag', 'body', 'gzip_body', 'gzip_etag', 'fingerprint')
+    
+    def __init__(self, file_path, content_type, size, etag, body, gzip_body):
+        """Initialize the asset
+        
+        Args:
+            file_path (str): Path of the file
+            content_type (str): The Content-Type header value
+            size (int): Size of the uncompressed body in bytes
+            etag (str): The quoted entity tag of the uncompressed body
+            body (bytes): The uncompressed body, or None if sent from the file
+            gzip_body (bytes): The gzip compressed body, or None if not worth it
+        """
+        self.file_path = file_path
+        self.content_type = content_type
+        self.size = size
+        self.etag = etag
+        self.body = body
+        self.gzip_body = gzip_body
+        self.gzip_etag = gzip_etag(etag)
+        # Value of the ?v= parameter of the asset URLs in HTML pages
+        self.fingerprint = etag.strip('"')
+
+
+class StaticAssetTable:
+    """
+    In-memory table of the static assets, by URL path.
+    
+    Requests are served from the table without touching the file system, except
+    for files of at least SENDFILE_MIN_SIZE bytes whose content is sent from the
+    file with sendfile. HTML pages are loaded last, with their /static/ URLs
+    fingerprinted (?v=...) so the referenced assets can be cached for good.
+    """
+    
+    def __init__(self, directory=STATIC_DIR, dev_mode=STATIC_DEV):
+        """Initialize an empty table
+        
+        Args:
+            directory (str, optional): The static directory
+            dev_mode (bool, optional): Reload the assets when their files change
+        """
+        self.directory = directory
+        self.dev_mode = dev_mode
+        self.assets = {}
+        self.mtimes = {}
+        self.watcher_thread = None
+    
+    def start(self):
+        """Load the static directory, and watch it for changes in development mode"""
+        self.load()
+        if self.dev_mode and self.watcher_thread is None:
+            self.watcher_thread = threading.Thread(target=self._watch, name='StaticAssetWatcher', daemon=True)
+            self.watcher_thread.start()
+            logger.info(f"Watching {self.directory} for changes")
+    
+    def get(self, path):
+        """Get an asset
+        
+        Args:
+            path (str): The URL path, relative to the static directory
+        
+        Returns:
+            StaticAsset: The asset, or None if there is no such file
+        """
+        return self.assets.get(path)
+    
+    def open_file(self, asset):
+        """Open the file of an asset sent with sendfile, checking it was not replaced since it was loaded
+        
+        The response length is the size measured at load time, so a file of
+        another size would hang or truncate the response. The table is then
+        reloaded, so the next request gets the new file.
+        
+        Args:
+            asset (StaticAsset): The asset
+        
+        Returns:
+            file: The open file, or None if it changed or is gone
+        """
+        try:
+            f = open(asset.file_path, 'rb')
+        except OSError:
+            f = None
+        else:
+            if os.fstat(f.fileno()).st_size == asset.size:
+                return f
+            f.close()
+        
+        logger.warning(f"{asset.file_path} changed since it was loaded, reloading the static assets")
+        self.load()
+        return None
+    
+    def load(self):
+        """Load every file of the static directory, replacing the current table"""
+        start = time.perf_counter()
+        mtimes = self._scan()
+        assets = {}
+        pages = []
+        for path, file_path in self._files():
+            content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+            if content_type == 'text/html':
+                pages.append((path, file_path, content_type))
+            else:
+                assets[path] = self._load_asset(file_path, content_type)
+        
+        for path, file_path, content_type in pages:
+            assets[path] = self._load_asset(file_path, content_type, assets)
+        
+        self.assets = assets
+        self.mtimes = mtimes
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Loaded {len(assets)} static assets in {elapsed_ms:.1f}ms")
+    
+    def _load_asset(self, file_path, content_type, assets=None):
+        """Load one file, fingerprinting the static URLs of HTML pages from the given assets"""
+        with open(file_path, 'rb') as f:
+            body = f.read()
+        
+        if assets is not None:
+            def fingerprint(match):
+                asset = assets.get('/' + match.group(2).decode())
+                if asset is None:
+                    return match.group(0)
+                quote = match.group(1)
+                return quote + b'/static/' + match.group(2) + b'?v=' + asset.fingerprint.encode() + quote
+            body = STATIC_URL_PATTERN.sub(fingerprint, body)
+        
+        gzip_body = None
+        if len(body) >= GZIP_MIN_SIZE:
+            gzip_body = compress(body, level=9)
+            if len(gzip_body) > len(body) * 0.9:
+                # Already compressed formats (images, fonts) gain nothing
+                gzip_body = None
+        
+        # Large files are sent from disk; HTML pages are rewritten, so always held in memory
+        in_memory = len(body) < SENDFILE_MIN_SIZE or assets is not None
+        return StaticAsset(file_path, content_type, len(body), compute_etag(body),
+                           body if in_memory else None, gzip_body)
+    
+    def _files(self):
+        """Yield the URL path and file path of every static file"""
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                file_path = os.path.join(root, name)
+                path = '/' + os.path.relpath(file_path, self.directory).replace(os.sep, '/')
+                yield path, file_path
+    
+    def _scan(self):
+        """Get the modification time of every static file"""
+        mtimes = {}
+        for _, file_path in self._files():
+            try:
+                mtimes[file_path] = os.stat(file_path).st_mtime_ns
+            except OSError:
+                pass
+        return mtimes
+    
+    def _watch(self):
+        """Background thread reloading the table when a static file changes"""
+        while True:
+            time.sleep(DEV_POLL_INTERVAL)
+            try:
+                if self._scan() != self.mtimes:
+                    self.load()
+            except Exception as e:
+                logger.error(f"Error reloading static assets: {e}")
+
+
+# Global instance, loaded when the HTTP server starts
+static_assets = StaticAssetTable()